@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class AdaptiveChunkSize:
+    """
+    Picks the next batch size from observed latency and errors (AIMD):
+    grows additively while batches are fast and succeed, halves on an error
+    or when a batch takes longer than `target_latency` seconds.
+    """
+    def __init__(self, initial=100, minimum=5, maximum=100, step=10, target_latency=10.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.step = step
+        self.target_latency = target_latency
+        self.size = max(minimum, min(maximum, initial))
+        self.errors = 0
+        self.batches = 0
+
+    def record(self, latency, ok):
+        """Updates the chunk size after a batch finished."""
+        self.batches += 1
+        if not ok:
+            self.errors += 1
+            self.size = max(self.minimum, self.size // 2)
+        elif latency > self.target_latency:
+            self.size = max(self.minimum, int(self.size * 0.75))
+        else:
+            self.size = min(self.maximum, self.size + self.step)
+        return self.size
+
+    @property
+    def error_rate(self):
+        return self.errors / self.batches if self.batches else 0.0
+
+
+class RequestCoalescer:
+    """
+    Gathers single lookups into batch requests. Callers submit one key each and
+    get a Future; a batch is sent as soon as `max_size` keys are pending or the
+    oldest has waited `window` seconds, with up to `max_in_flight` batches at once.
+    `send_batch(keys)` returns {key: result}; keys missing from it resolve to None.
+    The sizes of the sent batches are kept in `batch_sizes`.
+    """
+    def __init__(self, send_batch, max_size=100, window=0.02, max_in_flight=4):
+        self.send_batch = send_batch
+        self.max_size = max(1, max_size)
+        self.window = window
+        self.batch_sizes = []
+        self._pending = deque()  # (key, future, submitted)
+        self._closed = False
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._thread = threading.Thread(target=self._dispatch, name="coalescer", daemon=True)
+        self._thread.start()
+
+    def submit(self, key):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("RequestCoalescer is closed")
+            self._pending.append((key, future, time.monotonic()))
+            # wake the dispatcher to start the window or send a full batch
+            if len(self._pending) == 1 or len(self._pending) >= self.max_size:
+                self._cond.notify()
+        return future
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending:
+                        waited = time.monotonic() - self._pending[0][2]
+                        if len(self._pending) >= self.max_size or waited >= self.window or self._closed:
+                            break
+                        self._cond.wait(self.window - waited)
+                    elif self._closed:
+                        return
+                    else:
+                        self._cond.wait()
+                batch = [self._pending.popleft() for _ in range(min(self.max_size, len(self._pending)))]
+            self.batch_sizes.append(len(batch))
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch):
+        try:
+            results = self.send_batch([key for key, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for key, future, _ in batch:
+            future.set_result(results.get(key))
+
+    def close(self):
+        """Sends what is still pending and waits for all batches to finish."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        sizes = sorted(self.batch_sizes)
+        if not sizes:
+            return {"batches": 0, "items": 0, "mean": 0.0, "min": 0, "p50": 0, "max": 0, "full": 0}
+        return {
+            "batches": len(sizes), "items": sum(sizes), "mean": sum(sizes) / len(sizes),
+            "min": sizes[0], "p50": sizes[len(sizes) // 2], "max": sizes[-1],
+            "full": sum(1 for s in sizes if s == self.max_size),
+        }
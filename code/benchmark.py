@@ -0,0 +1,255 @@
+"""
+End-to-end throughput benchmark against the offline stub server (stub_server.py).
+
+Runs generation, verification and scoring at several input sizes and reports
+throughput and p50/p99 latency per stage. Results are saved as JSON (tagged with
+the git commit) so runs can be compared between commits:
+
+    python benchmark.py --sizes 1000,10000,100000
+    python benchmark.py --sizes 1000 --compare ../logs/benchmark_<...>.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from stub_server import StubConfig, endpoint_env, start_stub_server
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+@contextlib.contextmanager
+def _timed_calls(module, name, samples):
+    """Temporarily wraps module.name to record the latency of every call."""
+    original = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    setattr(module, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+
+def _stage_result(stage, size, items, seconds, samples):
+    samples = np.asarray(samples if samples else [seconds], dtype=np.float64)
+    return {
+        "stage": stage,
+        "size": size,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "items_per_sec": round(items / seconds, 2) if seconds > 0 else None,
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 3),
+        "calls": int(samples.size),
+    }
+
+
+def _time_cli(command, repeats):
+    """Wall-clock seconds of `python loqate_verify.py <command>` runs (startup included)."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(Path(__file__).parent / "loqate_verify.py"), command, "--log_level", "ERROR"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_size(size, args, utils, metrics, constants):
+    """Runs all stages for one input size. Returns a list of stage results."""
+    results = []
+    countries = constants.COUNTRY_PREFIXES
+
+    # the pro-email partial file would otherwise be reused across sizes
+    if constants.PRO_EMAILS_PARTIAL_PATH.exists():
+        constants.PRO_EMAILS_PARTIAL_PATH.unlink()
+
+    # 1) generation
+    num_standard = size // 2
+    num_pro = min(size // 20, args.max_pro)
+    phones_per_country = max(1, (size - num_standard - num_pro) // len(countries))
+    samples = []
+    with _timed_calls(utils, "get_professional_fake_email", samples):
+        start = time.perf_counter()
+        gen_data = utils.generate_data(
+            num_standard=num_standard, num_pro=num_pro,
+            phones_per_country=phones_per_country, pro_concurrency=args.concurrency,
+            pro_rate=args.pro_rate,
+        )
+        seconds = time.perf_counter() - start
+    phones = [p for key in ("scraped_real_phones_by_country", "scraped_inactive_phones_by_country", "fake_phones_by_country")
+              for sub in gen_data[key].values() for p in sub]
+    emails = gen_data["std_emails"] + gen_data["pro_emails"]
+    results.append(_stage_result("generate", size, len(emails) + len(phones), seconds, samples))
+
+    # synthetic-only generation (no Mail.tm / scraping), as used for large corpora
+    import synthetic
+    start = time.perf_counter()
+    synthetic.generate_synthetic_data(num_standard, phones_per_country, seed=args.seed)
+    seconds = time.perf_counter() - start
+    results.append(_stage_result("synthetic", size, num_standard + phones_per_country * len(countries), seconds, []))
+
+    # 2) verification
+    samples = []
+    with _timed_calls(utils, "_submit_email_chunk", samples):
+        start = time.perf_counter()
+        email_results = utils.verify_emails_batch(emails)
+        seconds = time.perf_counter() - start
+    results.append(_stage_result("verify_emails", size, len(emails), seconds, samples))
+
+    samples = []
+    with _timed_calls(utils, "verify_phone_individual", samples):
+        start = time.perf_counter()
+        phone_results = utils.verify_phones_concurrent(phones, concurrency=args.concurrency, batch_size=1)
+        seconds = time.perf_counter() - start
+    results.append(_stage_result("verify_phones", size, len(phones), seconds, samples))
+
+    # the same lookups coalesced into batch requests
+    samples = []
+    with _timed_calls(utils, "_submit_phone_batch", samples):
+        start = time.perf_counter()
+        utils.verify_phones_concurrent(phones, concurrency=args.concurrency, batch_size=args.phone_batch_size)
+        seconds = time.perf_counter() - start
+    results.append(_stage_result("verify_phones_batched", size, len(phones), seconds, samples))
+
+    # 3) scoring
+    all_results = email_results + phone_results
+    manual_phones_by_country = {code: [] for code in countries}
+    samples = []
+    start = time.perf_counter()
+    for _ in range(args.score_repeats):
+        t0 = time.perf_counter()
+        index = metrics.build_label_index(gen_data, [], [], manual_phones_by_country, countries)
+        metrics.compute_metrics(all_results, index)
+        samples.append(time.perf_counter() - t0)
+    seconds = time.perf_counter() - start
+    results.append(_stage_result("score", size, len(all_results) * args.score_repeats, seconds, samples))
+
+    # metric intervals alone: every row of the table, --bootstrap_resamples resamples
+    counts = metrics.MetricsAccumulator(countries)
+    counts.add(all_results, index)
+    start = time.perf_counter()
+    counts.table({"resamples": args.bootstrap_resamples})
+    seconds = time.perf_counter() - start
+    results.append(_stage_result("bootstrap", size, len(all_results), seconds, []))
+
+    # 4) offline CLI stages on the saved artifacts, startup included
+    import inputs
+    import records
+    inputs.save_generated_data(gen_data)
+    records.write_results(all_results, constants.OUT_PATH, ("jsonl",))
+    for command in ("score", "report"):
+        samples = _time_cli(command, args.cli_repeats)
+        results.append(_stage_result(f"cli_{command}", size, len(all_results), min(samples), samples))
+    return results
+
+
+def print_report(rows, baseline=None):
+    base = {(r["stage"], r["size"]): r for r in (baseline or {}).get("results", [])}
+    print(f"\n{'stage':<23}{'size':>8}{'items':>9}{'sec':>10}{'items/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'vs base':>10}")
+    for r in rows:
+        ref = base.get((r["stage"], r["size"]))
+        speedup = ""
+        if ref and ref.get("items_per_sec") and r["items_per_sec"]:
+            speedup = f"{r['items_per_sec'] / ref['items_per_sec']:.2f}x"
+        print(f"{r['stage']:<23}{r['size']:>8}{r['items']:>9}{r['seconds']:>10.3f}{r['items_per_sec'] or 0:>12.1f}"
+              f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{speedup:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput benchmark against the offline stub services")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated input sizes")
+    parser.add_argument("--concurrency", type=int, default=32, help="Lookups / account creations in flight")
+    parser.add_argument("--pro_rate", type=float, default=500.0, help="Mail.tm account creations per second")
+    parser.add_argument("--max_pro", type=int, default=500, help="Cap on pro (Mail.tm) emails per size")
+    parser.add_argument("--score_repeats", type=int, default=5, help="Scoring repetitions per size")
+    parser.add_argument("--phone_batch_size", type=int, default=100, help="Phones per batch request of the batched phone stage")
+    parser.add_argument("--bootstrap_resamples", type=int, default=10000, help="Resamples of the bootstrap stage")
+    parser.add_argument("--cli_repeats", type=int, default=3, help="Runs of the offline score / report commands per size")
+    parser.add_argument("--latency_ms", type=float, default=20.0, help="Stub base latency")
+    parser.add_argument("--jitter_ms", type=float, default=10.0, help="Stub latency jitter")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Stub 500 rate")
+    parser.add_argument("--rate_limit_rate", type=float, default=0.0, help="Stub 429 rate")
+    parser.add_argument("--seed", type=int, default=0, help="Stub RNG seed")
+    parser.add_argument("--out", default=None, help="Where to save the JSON report")
+    parser.add_argument("--compare", default=None, help="Earlier JSON report to compare against")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+    )
+    server, base_url = start_stub_server(config, seed=args.seed)
+    data_dir = tempfile.mkdtemp(prefix="loqate_bench_")
+
+    # point the pipeline at the stub before it is imported (constants read the environment once)
+    os.environ.update(endpoint_env(base_url))
+    os.environ["LOQATE_DATA_PATH"] = data_dir
+    os.environ.setdefault("LOQATE_API_KEY", "benchmark")
+    import constants
+    import metrics
+    import utils
+    from log_setup import setup_logging, shutdown_logging
+
+    # pipeline output is only shown with --verbose
+    setup_logging(level="INFO" if args.verbose else "ERROR")
+    print(f"[Benchmark] Stub server at {base_url}, data in {data_dir}")
+    rows = []
+    try:
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            print(f"[Benchmark] Running size {size}...")
+            rows.extend(run_size(size, args, utils, metrics, constants))
+    finally:
+        server.shutdown()
+        shutdown_logging()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(rows, baseline)
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "config": vars(args),
+        "results": rows,
+    }
+    out = Path(args.out) if args.out else PROJECT_ROOT / "logs" / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\n[Benchmark] Report saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from log_setup import get_logger
+
+logger = get_logger("cache")
+
+# defaults: keep entries for 30 days, at most 500k entries on disk
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 500_000
+
+
+def normalize_key_input(value):
+    """Normalizes an input (email/phone) the same way the metrics do."""
+    return str(value).lower().strip()
+
+
+class ResultCache:
+    """
+    On-disk (SQLite) cache for verification results.
+    Entries are keyed by endpoint URL + normalized input, expire after a TTL,
+    and the least recently used entries are evicted above `max_entries`.
+    Access times of hits are written in batches of `touch_batch` (and before an
+    eviction or on close), not with one commit per hit.
+    """
+    def __init__(self, path, ttl=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES, touch_batch=1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                input TEXT NOT NULL,
+                record TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        purged = self.purge_expired()
+        if purged:
+            logger.info(f"[Cache] {purged} expired entries purged from {path}")
+
+    @staticmethod
+    def make_key(endpoint, value):
+        raw = f"{endpoint}\n{normalize_key_input(value)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, endpoint, value):
+        """Returns the cached record for this input, or None on a miss / expired entry."""
+        key = self.make_key(endpoint, value)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT record, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._count -= 1
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touches()
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, endpoint, value, record):
+        """Stores a record for this input and evicts LRU entries above the size cap."""
+        key = self.make_key(endpoint, value)
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone()
+            if not exists:
+                self._count += 1
+            self._touched.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, endpoint, input, record, created, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, endpoint, normalize_key_input(value), json.dumps(dict(record)), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touches(self):
+        if self._touched:
+            self._conn.executemany("UPDATE results SET last_access = ? WHERE key = ?", [(t, k) for k, t in self._touched.items()])
+            self._touched = {}
+
+    def _delete_expired(self):
+        cur = self._conn.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,))
+        self._count -= cur.rowcount
+        return cur.rowcount
+
+    def _evict(self):
+        """Above the size cap, drops the expired entries first, then the least recently used."""
+        if self._count <= self.max_entries:
+            return
+        self._flush_touches()
+        self._delete_expired()
+        excess = self._count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+            self._count -= excess
+
+    def purge_expired(self):
+        """Deletes all entries older than the TTL."""
+        with self._lock:
+            purged = self._delete_expired()
+            self._conn.commit()
+            return purged
+
+    def print_stats(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total > 0 else 0
+        logger.info(f"\n--- Cache: {self.path} ---")
+        logger.info(f"Hits: {self.hits} | Misses: {self.misses} | Hit rate: {hit_rate:.2%} | Evictions: {self.evictions}")
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            self._conn.close()
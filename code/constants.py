@@ -1,28 +1,10 @@
 import os
-import dotenv
 from pathlib import Path
 
 # configurations
 PROJECT_ROOT = Path(__file__).parent.parent
-
-DATA_PATH = PROJECT_ROOT / "data"
-DATA_PATH.mkdir(parents=True, exist_ok=True)
-
-OUT_PATH = DATA_PATH / "verification_results.json"
-
+ENV_PATH = PROJECT_ROOT / ".env"
 LOGS_PATH = PROJECT_ROOT / "logs"
-LOGS_PATH.mkdir(parents=True, exist_ok=True)
-
-# load environment variables from .env file
-dotenv.load_dotenv(PROJECT_ROOT / ".env")
-LOQATE_API_KEY = os.getenv("LOQATE_API_KEY")
-
-# API endpoints
-URL_EMAIL_BATCH = "https://api.addressy.com/EmailValidation/Batch/Validate/v1.20/json3.ws"
-URL_PHONE_INDIVIDUAL = "https://api.addressy.com/PhoneNumberValidation/Interactive/Validate/v2.20/json3.ws"
-MAILTM_BASE_URL = "https://api.mail.tm"
-URL_PUBLIC_SMS_SOURCE = "https://receive-smss.com/"  # Source for real, active numbers
-URL_PUBLIC_SMS_SOURCE_FALLBACK = "https://receive-smss.com/inactive-numbers/"
 
 # phone verification country prefixes
 COUNTRY_PREFIXES = {
@@ -45,4 +27,73 @@ COUNTRY_PREFIXES = {
     "SE": "+46", # Sweden
     "ZA": "+27", # South Africa
     "MX": "+52", # Mexico
-}
\ No newline at end of file
+}
+
+_env_loaded = False
+
+
+def load_env():
+    """Loads the .env file into the environment (once; python-dotenv is only imported here)."""
+    global _env_loaded
+    if not _env_loaded:
+        import dotenv
+        dotenv.load_dotenv(ENV_PATH)
+        _env_loaded = True
+
+
+def _data_file(name):
+    return lambda: _setting("DATA_PATH") / name
+
+
+# settings read from the environment (.env included), resolved on first use,
+# so importing this module has no side effects
+_SETTINGS = {
+    "LOQATE_API_KEY": lambda: os.getenv("LOQATE_API_KEY"),
+
+    # data directory can be overridden (e.g. to keep benchmark runs out of data/)
+    "DATA_PATH": lambda: Path(os.getenv("LOQATE_DATA_PATH", PROJECT_ROOT / "data")),
+    "OUT_PATH": _data_file("verification_results.json"),
+    "METRICS_PATH": _data_file("verification_metrics.json"),
+    "CACHE_PATH": _data_file("verification_cache.sqlite"),
+    "JOURNAL_PATH": _data_file("verification_journal.jsonl"),
+    "MAILTM_DOMAINS_PATH": _data_file("mailtm_domains.json"),
+    "PRO_EMAILS_PARTIAL_PATH": _data_file("input_pro_emails.partial.txt"),
+    "NUMBER_POOL_PATH": _data_file("number_pool.json"),
+    # per-domain summary of email results, kept across runs
+    "DOMAIN_INDEX_PATH": _data_file("email_domains.json"),
+    # results and metrics of every run, for cross-run queries (history command)
+    "HISTORY_PATH": _data_file("verification_history.sqlite"),
+    # per-stratum accuracy intervals of an adaptive run
+    "STRATA_PATH": _data_file("verification_strata.json"),
+    # optional extra disposable domains for the pre-validation tier, one per line
+    "DISPOSABLE_DOMAINS_PATH": _data_file("disposable_domains.txt"),
+
+    # API endpoints (overridable via environment, e.g. to point at stub_server.py)
+    "URL_EMAIL_BATCH": lambda: os.getenv("URL_EMAIL_BATCH", "https://api.addressy.com/EmailValidation/Batch/Validate/v1.20/json3.ws"),
+    "URL_PHONE_INDIVIDUAL": lambda: os.getenv("URL_PHONE_INDIVIDUAL", "https://api.addressy.com/PhoneNumberValidation/Interactive/Validate/v2.20/json3.ws"),
+    # optional batch phone endpoint; phones are looked up one by one when unset
+    "URL_PHONE_BATCH": lambda: os.getenv("URL_PHONE_BATCH", ""),
+    "MAILTM_BASE_URL": lambda: os.getenv("MAILTM_BASE_URL", "https://api.mail.tm"),
+    "URL_PUBLIC_SMS_SOURCE": lambda: os.getenv("URL_PUBLIC_SMS_SOURCE", "https://receive-smss.com/"),  # Source for real, active numbers
+    "URL_PUBLIC_SMS_SOURCE_FALLBACK": lambda: os.getenv("URL_PUBLIC_SMS_SOURCE_FALLBACK", "https://receive-smss.com/inactive-numbers/"),
+}
+
+
+def _setting(name):
+    if name not in globals():
+        load_env()
+        globals()[name] = _SETTINGS[name]()
+    return globals()[name]
+
+
+def __getattr__(name):
+    # PEP 562: `from constants import DATA_PATH` resolves the setting on first access
+    if name in _SETTINGS:
+        return _setting(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def ensure_dirs():
+    """Creates the data and logs directories (done by the stages that write to them)."""
+    _setting("DATA_PATH").mkdir(parents=True, exist_ok=True)
+    LOGS_PATH.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+from records import EmailResult
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def email_domain(email):
+    return str(email).rpartition("@")[2].lower().strip()
+
+
+class EmailDomainIndex:
+    """
+    Persistent per-domain summary of email verification results (JSON on disk).
+    Once enough samples of a domain agree, its other addresses get a record with
+    the domain's properties instead of being looked up (domain-level mode).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.domains = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.domains = json.load(f)
+
+    def add(self, record):
+        """Adds one API email record to its domain's summary."""
+        domain = email_domain(record.get("Domain") or record.get("Input", ""))
+        if not domain:
+            return
+        with self._lock:
+            entry = self.domains.get(domain)
+            if entry is None:
+                entry = self.domains[domain] = {"samples": 0, "valid": 0, "disposable": False, "statuses": {}, "first_seen": _now()}
+            entry["samples"] += 1
+            entry["valid"] += record.get("IsValid") == "Yes"
+            entry["disposable"] = entry["disposable"] or bool(record.get("IsDisposable"))
+            status = str(record.get("Status"))
+            entry["statuses"][status] = entry["statuses"].get(status, 0) + 1
+            entry["last_seen"] = _now()
+
+    def samples(self, domain):
+        entry = self.domains.get(domain)
+        return entry["samples"] if entry else 0
+
+    def consensus(self, domain, min_samples):
+        """
+        Returns the domain's entry if at least `min_samples` samples were seen and
+        all of them agree on status and validity, otherwise None.
+        """
+        entry = self.domains.get(domain)
+        if entry is None or entry["samples"] < min_samples:
+            return None
+        if len(entry["statuses"]) != 1 or entry["valid"] not in (0, entry["samples"]):
+            return None
+        return entry
+
+    def inferred_record(self, email, min_samples):
+        """
+        Builds a record for `email` from its domain's consensus, or returns None.
+        Only domain properties are inherited: whether a mailbox exists is not one,
+        so Status/IsSystemMailbox stay unset and IsValid is unknown, except on a
+        disposable domain, where every address is invalid.
+        """
+        domain = email_domain(email)
+        entry = self.consensus(domain, min_samples)
+        if entry is None:
+            return None
+        return EmailResult(
+            Input=email,
+            IsValid="No" if entry["disposable"] else "Unknown",
+            Account=str(email).rpartition("@")[0],
+            Domain=domain,
+            IsDisposable=entry["disposable"],
+            DomainLevel=True,
+        )
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.domains, f, indent=2)
+        os.replace(tmp_path, self.path)
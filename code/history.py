@@ -0,0 +1,215 @@
+"""
+Run history: every run's results and metrics in one indexed SQLite store
+(data/verification_history.sqlite), so drift across runs - per-country metric
+trends, inputs whose verdict flipped - is a query instead of a re-parse of old
+logs and result files. Queries stream rows from SQLite, nothing is loaded whole.
+"""
+import json
+import sqlite3
+from datetime import datetime
+
+from calling_codes import lookup_country
+from log_setup import get_logger
+from normalize import normalize_phone
+
+logger = get_logger("history")
+
+# rows inserted per executemany call while ingesting
+INGEST_BATCH = 10000
+
+# metric columns of the metrics table, each with its confidence interval
+METRICS = ("accuracy", "precision", "recall", "f1")
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    ingested TEXT NOT NULL,
+    results INTEGER NOT NULL,
+    note TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL,
+    input TEXT NOT NULL,
+    type TEXT,
+    country TEXT,
+    source TEXT,
+    ground_truth TEXT,
+    verdict TEXT,
+    record TEXT NOT NULL,
+    PRIMARY KEY (run_id, input)
+);
+CREATE INDEX IF NOT EXISTS idx_results_input ON results (input, run_id);
+CREATE INDEX IF NOT EXISTS idx_results_country ON results (country, run_id);
+CREATE INDEX IF NOT EXISTS idx_results_source ON results (source, run_id);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id TEXT NOT NULL,
+    grp TEXT NOT NULL,
+    label TEXT NOT NULL,
+    country TEXT,
+    domain TEXT,
+    total INTEGER, tp INTEGER, tn INTEGER, fp INTEGER, fn INTEGER,
+    {", ".join(f"{m} REAL, {m}_low REAL, {m}_high REAL" for m in METRICS)}
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_run ON metrics (run_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_country ON metrics (country, run_id);
+"""
+
+
+def _normalize(value):
+    return str(value).lower().strip()
+
+
+def _verdict(row):
+    value = row.get("IsValid")
+    return None if value is None else str(value).lower()
+
+
+class HistoryStore:
+    """SQLite store of past runs: one row per run, per result and per metrics row."""
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(str(path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def ingest_run(self, run_id, results, table=(), labels=None, note=None):
+        """
+        Stores one run (replacing an earlier ingest of the same run_id).
+        `results` is streamed in batches; `labels` (a LabelIndex) gives each
+        input's source and country, otherwise phones are placed by calling code.
+        """
+        from metrics import SOURCE_NAMES
+
+        def rows():
+            for row in results:
+                key = _normalize(row.get("Input", ""))
+                label = labels.label(key) if labels is not None else None
+                if label is not None:
+                    source, country = SOURCE_NAMES[label[0]], labels.countries[label[1]]
+                else:
+                    source = None
+                    country = lookup_country(normalize_phone(row.get("Input", ""))) if row.get("Type") == "Phone" else None
+                yield (
+                    run_id, key, row.get("Type"), None if country == "Unknown" else country, source,
+                    row.get("GroundTruth"), _verdict(row), json.dumps(dict(row))
+                )
+
+        with self._conn:
+            for name in ("results", "metrics", "runs"):
+                self._conn.execute(f"DELETE FROM {name} WHERE run_id = ?", (run_id,))
+            count = 0
+            batch = []
+            for values in rows():
+                batch.append(values)
+                if len(batch) >= INGEST_BATCH:
+                    self._insert_results(batch)
+                    count += len(batch)
+                    batch = []
+            self._insert_results(batch)
+            count += len(batch)
+
+            columns = ["total", "tp", "tn", "fp", "fn"]
+            for m in METRICS:
+                columns += [m, f"{m}_low", f"{m}_high"]
+            self._conn.executemany(
+                f"INSERT INTO metrics (run_id, grp, label, country, domain, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 5))})",
+                [
+                    (run_id, row["group"], row["label"], row.get("country"), row.get("domain"))
+                    + tuple(row[c] for c in columns[:5])
+                    + tuple(v for m in METRICS for v in (row[m], *row.get(f"{m}_ci", (None, None))))
+                    for row in table
+                ],
+            )
+            self._conn.execute(
+                "INSERT INTO runs (run_id, ingested, results, note) VALUES (?, ?, ?, ?)",
+                (run_id, datetime.now().isoformat(timespec="seconds"), count, note),
+            )
+        logger.info(f"[History] Run {run_id}: {count} results and {len(table)} metrics rows stored in {self.path}")
+        return count
+
+    def _insert_results(self, batch):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO results (run_id, input, type, country, source, ground_truth, verdict, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+
+    def runs(self):
+        """(run_id, ingested, results, note) of every run, oldest first."""
+        return self._conn.execute("SELECT run_id, ingested, results, note FROM runs ORDER BY run_id").fetchall()
+
+    def trends(self, country=None, metric="accuracy"):
+        """
+        Yields (country, run_id, total, value, low, high) per run for the country
+        rows (and OVERALL, as country "ALL"), grouped by country, oldest run first.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        query = (
+            f"SELECT COALESCE(country, 'ALL'), run_id, total, {metric}, {metric}_low, {metric}_high FROM metrics "
+            "WHERE (grp = 'COUNTRY' OR grp = 'OVERALL')"
+        )
+        params = ()
+        if country:
+            query += " AND country = ?"
+            params = (country,)
+        yield from self._conn.execute(query + " ORDER BY COALESCE(country, 'ALL'), run_id", params)
+
+    def flips(self, run_a, run_b, country=None):
+        """Yields (input, type, country, source, verdict_a, verdict_b) for inputs whose verdict differs between two runs."""
+        query = (
+            "SELECT a.input, a.type, COALESCE(b.country, a.country), COALESCE(b.source, a.source), a.verdict, b.verdict "
+            "FROM results a JOIN results b ON b.run_id = ? AND b.input = a.input "
+            "WHERE a.run_id = ? AND a.verdict IS NOT b.verdict"
+        )
+        params = (run_b, run_a)
+        if country:
+            query += " AND a.country = ?"
+            params += (country,)
+        yield from self._conn.execute(query + " ORDER BY a.country, a.input", params)
+
+    def close(self):
+        self._conn.close()
+
+
+def print_runs(store):
+    logger.info(f"--- Run history: {store.path} ---")
+    for run_id, ingested, results, note in store.runs():
+        logger.info(f"   {run_id:<28}{results:>9} results   ingested {ingested}{f'   ({note})' if note else ''}")
+
+
+def print_trends(store, country=None, metric="accuracy"):
+    logger.info(f"--- {metric.capitalize()} per country and run ---")
+    current = None
+    for ctry, run_id, total, value, low, high in store.trends(country, metric):
+        if ctry != current:
+            logger.info(f"\n{ctry}:")
+            current = ctry
+        interval = "" if low is None else f" [{low:.2%}, {high:.2%}]"
+        logger.info(f"   {run_id:<28} n={total:<7} {value:.2%}{interval}")
+    if current is None:
+        logger.info("No metrics stored yet.")
+
+
+def print_flips(store, run_a=None, run_b=None, country=None, limit=50):
+    """Summarises the verdict flips between two runs (default: the last two) per country and lists up to `limit`."""
+    if run_a is None or run_b is None:
+        run_ids = [r[0] for r in store.runs()]
+        if len(run_ids) < 2:
+            logger.info("[History] Fewer than two runs stored, nothing to compare.")
+            return
+        run_a, run_b = run_a or run_ids[-2], run_b or run_ids[-1]
+
+    logger.info(f"--- Verdict flips: {run_a} -> {run_b} ---")
+    per_country = {}
+    shown = 0
+    for value, kind, ctry, source, before, after in store.flips(run_a, run_b, country):
+        key = ctry or kind or "?"
+        per_country[key] = per_country.get(key, 0) + 1
+        if shown < limit:
+            logger.info(f"   {value:<40}{key:<8}{source or '':<18}{before} -> {after}")
+            shown += 1
+    total = sum(per_country.values())
+    if total > shown:
+        logger.info(f"   ... {total - shown} more")
+    logger.info(f"\n{total} inputs flipped: " + (", ".join(f"{k} {n}" for k, n in sorted(per_country.items())) or "none"))
@@ -0,0 +1,374 @@
+import atexit
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation import INSTRUMENTATION
+from log_setup import get_logger
+
+logger = get_logger("http")
+
+# default number of keep-alive connections kept open per host
+DEFAULT_POOL_SIZE = 16
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Returns a shared requests.Session with a keep-alive connection pool.
+    One session is kept per pool size, so repeated calls reuse the same
+    TCP/TLS connections instead of opening a new one per request.
+    The sessions are closed at exit unless close_sessions() ran first.
+    """
+    with _sessions_lock:
+        session = _sessions.get(pool_size)
+        if session is None:
+            if not _sessions:
+                atexit.register(close_sessions)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[pool_size] = session
+        return session
+
+
+def close_sessions():
+    """Closes all pooled sessions (e.g. at the end of a run)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+    atexit.unregister(close_sessions)
+
+
+# status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# per-endpoint request deadlines in seconds, by stage (see configure_endpoints)
+DEFAULT_TIMEOUT = 30.0
+TIMEOUTS = {
+    "verify_emails_batch": 30.0,
+    "verify_phones_batch": 30.0,
+    "verify_phone_individual": 10.0,
+}
+
+
+def timeout_for(stage):
+    return TIMEOUTS.get(stage, DEFAULT_TIMEOUT)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending while an endpoint's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Pauses an endpoint that keeps failing. After `threshold` failures in a row
+    the circuit opens and requests fail fast (CircuitOpenError) for `cooldown`
+    seconds instead of being sent; then a single probe request goes through. A
+    successful probe closes the circuit, a failed one re-opens it with a doubled
+    cooldown (up to `max_cooldown`).
+    """
+    def __init__(self, name, threshold=5, cooldown=5.0, max_cooldown=30.0):
+        self.name = name
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._open_until = None
+        self._probe = None  # id of the probe in flight
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._open_until is not None
+
+    def acquire(self):
+        """
+        Called before sending. Returns None while the circuit is closed, or a probe id
+        once the cooldown is over (one probe at a time; pass it to record and release).
+        Raises CircuitOpenError right away while the circuit is open and no probe is due.
+        """
+        with self._lock:
+            if self._open_until is None:
+                return None
+            if time.monotonic() < self._open_until or self._probe is not None:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name}: circuit open")
+            self._probes += 1
+            self._probe = self._probes
+            return self._probe
+
+    def release(self, probe):
+        """Ends a probe whatever its outcome (a 429, an unexpected error), so the next one can go."""
+        with self._lock:
+            if probe is not None and probe == self._probe:
+                self._probe = None
+
+    def record(self, ok, probe=None):
+        """Counts a request's outcome; `probe` is the id acquire() returned for it."""
+        with self._lock:
+            if ok:
+                if self._open_until is not None:
+                    logger.info(f"   [Circuit] {self.name} closed again.")
+                self.failures = 0
+                self.cooldown = self.base_cooldown
+                self._open_until = None
+                self._probe = None
+                return
+            self.failures += 1
+            if probe is not None and probe == self._probe:
+                # the probe failed: stay open, for longer
+                self._probe = None
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            elif self._open_until is not None or self.failures < self.threshold:
+                # already open: a late failure of a request sent before it opened
+                return
+            self._open_until = time.monotonic() + self.cooldown
+            self.opened += 1
+            logger.warning(f"   [Circuit] {self.name} open after {self.failures} failures, pausing it for {self.cooldown:.1f}s.")
+
+
+class Hedger:
+    """
+    Hedged calls: if a call has not returned after the `quantile` latency of the
+    recent calls (p95 by default), the same call is sent again and whichever
+    finishes first wins. Hedges are capped at `max_share` of all calls, so a slow
+    endpoint is not hit twice as hard. Only for idempotent calls.
+    """
+    def __init__(self, stage, quantile=0.95, min_samples=20, window=500, max_share=0.1, max_workers=256):
+        self.stage = stage
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_share = max_share
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{stage}")
+
+    def delay(self):
+        """Seconds after which a call is hedged (None until enough latencies were seen)."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(self.quantile * len(latencies)))]
+
+    def _timed(self, fn):
+        start = time.perf_counter()
+        result = fn()
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return result
+
+    def call(self, fn, credits=0):
+        """Runs fn() and returns its result, hedging it once if it is slow."""
+        with self._lock:
+            self.calls += 1
+        delay = self.delay()
+        if delay is None:
+            return self._timed(fn)
+        first = self._executor.submit(self._timed, fn)
+        done, _ = wait([first], timeout=delay)
+        with self._lock:
+            allowed = not done and self.hedges < self.max_share * self.calls
+            if allowed:
+                self.hedges += 1
+        if not allowed:
+            return first.result()
+
+        INSTRUMENTATION.count_hedge(self.stage, credits)
+        second = self._executor.submit(self._timed, fn)
+        done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        if winner.exception() is not None and pending:
+            # the other call may still succeed
+            winner = pending.pop()
+        if winner is second:
+            with self._lock:
+                self.hedge_wins += 1
+        return winner.result()
+
+
+# one circuit breaker and (optionally) one hedger per endpoint stage
+BREAKER_SETTINGS = {"threshold": 5, "cooldown": 5.0}
+HEDGE_QUANTILE = 0.95
+_breakers = {}
+_hedgers = {}
+_registry_lock = threading.Lock()
+
+
+def configure_endpoints(timeouts=None, breaker_threshold=None, breaker_cooldown=None, hedge_quantile=None):
+    """
+    Sets the per-endpoint deadlines ({stage: seconds}), the circuit breaker settings
+    and the hedging quantile (0 disables hedging) for the following requests.
+    """
+    if timeouts:
+        TIMEOUTS.update(timeouts)
+    if breaker_threshold is not None:
+        BREAKER_SETTINGS["threshold"] = breaker_threshold
+    if breaker_cooldown is not None:
+        BREAKER_SETTINGS["cooldown"] = breaker_cooldown
+    global HEDGE_QUANTILE
+    if hedge_quantile is not None:
+        HEDGE_QUANTILE = hedge_quantile
+    with _registry_lock:
+        _breakers.clear()
+        _hedgers.clear()
+
+
+def stop_hedging():
+    """Turns hedging off for the following requests (the hedgers' stats are kept)."""
+    global HEDGE_QUANTILE
+    HEDGE_QUANTILE = 0
+
+
+def breaker_for(stage):
+    with _registry_lock:
+        breaker = _breakers.get(stage)
+        if breaker is None:
+            breaker = _breakers[stage] = CircuitBreaker(stage, **BREAKER_SETTINGS)
+        return breaker
+
+
+def hedger_for(stage):
+    """The stage's Hedger, or None if hedging is off."""
+    if not HEDGE_QUANTILE:
+        return None
+    with _registry_lock:
+        hedger = _hedgers.get(stage)
+        if hedger is None:
+            hedger = _hedgers[stage] = Hedger(stage, quantile=HEDGE_QUANTILE)
+        return hedger
+
+
+def print_endpoint_stats():
+    """Logs the circuit breaker and hedging activity of the run."""
+    with _registry_lock:
+        breakers, hedgers = list(_breakers.values()), list(_hedgers.values())
+    for breaker in breakers:
+        if breaker.opened:
+            logger.info(f"[Circuit] {breaker.name}: opened {breaker.opened} times, {breaker.rejected} requests failed fast")
+    for hedger in hedgers:
+        if hedger.calls:
+            logger.info(f"[Hedge] {hedger.stage}: {hedger.hedges} of {hedger.calls} calls hedged, {hedger.hedge_wins} won by the hedge")
+
+
+def parse_retry_after(value):
+    """Parses a Retry-After header (seconds or HTTP date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def request_with_retry(session, method, url, retries=4, backoff=1.0, max_backoff=60.0, timeout=None, stage=None, **kwargs):
+    """
+    Sends a request and retries on connection errors, 429 and 5xx responses.
+    Waits for Retry-After when the server sends it, otherwise backs off
+    exponentially with jitter. Returns the last response (raises on the last
+    connection error). Retries are counted under `stage` in the instrumentation.
+    `timeout` defaults to the stage's deadline (TIMEOUTS); failures and timeouts
+    feed the stage's circuit breaker. While the circuit is open, CircuitOpenError is
+    raised right away (it is not retried), so a dead endpoint fails fast.
+    """
+    if timeout is None:
+        timeout = timeout_for(stage)
+    breaker = breaker_for(stage) if stage is not None else None
+    for attempt in range(retries + 1):
+        probe = breaker.acquire() if breaker is not None else None
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            if breaker is not None:
+                breaker.record(False, probe)
+            if attempt == retries:
+                raise
+            delay = min(max_backoff, backoff * 2 ** attempt)
+        else:
+            if breaker is not None and response.status_code != 429:
+                # throttling is handled by backing off, not by the breaker
+                breaker.record(response.status_code < 500, probe)
+            if response.status_code not in RETRYABLE_STATUS or attempt == retries:
+                return response
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = min(max_backoff, backoff * 2 ** attempt)
+            logger.info(f"   [HTTP] {response.status_code} from {url}. Retrying in {delay:.1f}s ({attempt + 1}/{retries})...")
+        finally:
+            if probe is not None:
+                breaker.release(probe)
+        if stage is not None:
+            INSTRUMENTATION.count_retry(stage)
+        time.sleep(delay * random.uniform(1.0, 1.25))
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket rate limiter shared by concurrent workers.
+    On a 429 the rate is halved and all workers pause (for Retry-After if
+    given); every success lets the rate recover towards `max_rate`.
+    """
+    def __init__(self, rate=4.0, max_rate=None, min_rate=0.25, burst=1):
+        self.rate = rate
+        self.max_rate = max_rate or rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                    self._last = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait_for = (1 - self._tokens) / self.rate
+                else:
+                    wait_for = self._paused_until - now
+            time.sleep(wait_for)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate * 1.05)
+
+    def on_throttled(self, retry_after=None):
+        """Slows everyone down after a 429."""
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._last = self._paused_until
+            self._tokens = 0
@@ -0,0 +1,93 @@
+"""
+Saved input datasets (data/input_*.json) and the manual inputs from .env.
+Kept free of Faker / requests, so the offline stages (score, merge) can
+rebuild the labels of a run without paying for the generation stack.
+"""
+import json
+import os
+
+import constants
+from calling_codes import detect_country
+from log_setup import get_logger
+from metrics import build_label_index
+
+logger = get_logger("inputs")
+
+# gen_data key -> file in the data directory
+INPUT_FILES = {
+    "std_emails": "input_standard_emails.json",
+    "pro_emails": "input_pro_emails.json",
+    "scraped_real_phones_by_country": "input_real_scraped_phones.json",
+    "scraped_inactive_phones_by_country": "input_inactive_scraped_phones.json",
+    "fake_phones_by_country": "input_fake_phones.json",
+}
+
+
+def save_list_to_json(data_list, filename):
+    """Helper to save a simple list to a JSON file."""
+    if not data_list:
+        return
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(data_list, f, indent=4)
+    logger.info(f"[File] Saved {len(data_list)} items to {filename}")
+
+
+def load_json_file(filepath):
+    if os.path.exists(filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            return json.load(f)
+    else:
+        logger.warning(f"[Warning] File not found: {filepath}. Using empty data.")
+        return {}
+
+
+def save_generated_data(gen_data):
+    for key, name in INPUT_FILES.items():
+        path = constants.DATA_PATH / name
+        if not gen_data[key] and path.exists():
+            # empty datasets are not written, so drop the one of an earlier generation
+            path.unlink()
+        save_list_to_json(gen_data[key], path)
+    # the partial file only matters until the pro emails are saved
+    if constants.PRO_EMAILS_PARTIAL_PATH.exists():
+        constants.PRO_EMAILS_PARTIAL_PATH.unlink()
+
+
+def load_generated_data():
+    # missing files are empty datasets (email lists, phones by country)
+    return {key: load_json_file(constants.DATA_PATH / name) or ([] if key.endswith("emails") else {}) for key, name in INPUT_FILES.items()}
+
+
+def manual_inputs():
+    """Returns the real emails and phones listed in .env (REAL_EMAILS / REAL_PHONES)."""
+    constants.load_env()
+    real_emails = [e.strip() for e in os.getenv("REAL_EMAILS", "").split(",") if e.strip()]
+    real_phones = [p.strip() for p in os.getenv("REAL_PHONES", "").split(",") if p.strip()]
+    return real_emails, real_phones
+
+
+def label_from_ground_truth(index, records):
+    """
+    Labels the records the index does not know (e.g. rows of an --input file)
+    from their GroundTruth field, as the streaming mode does.
+    """
+    for row in records:
+        value = str(row.get("Input", ""))
+        truth = row.get("GroundTruth")
+        if truth not in ("Real", "Fake") or value.lower().strip() in index.labels:
+            continue
+        real = "real" if truth == "Real" else "fake"
+        if row.get("Type") == "Email":
+            index.add([value], f"input_{real}_email")
+        else:
+            index.add([value], f"input_{real}_phone", detect_country(value))
+
+
+def build_run_labels(gen_data, real_emails, real_phones):
+    """LabelIndex of a run on the generated data; manual phones are bucketed by calling code."""
+    manual_phones_by_country = {code: [] for code in constants.COUNTRY_PREFIXES}
+    for p in real_phones:
+        code = detect_country(p)
+        if code in manual_phones_by_country:
+            manual_phones_by_country[code].append(p)
+    return build_label_index(gen_data, real_emails, real_phones, manual_phones_by_country, constants.COUNTRY_PREFIXES)
@@ -0,0 +1,240 @@
+"""
+Hot-path instrumentation: per-stage latency histograms, request / error / retry
+counters, credits spent and items per second.
+
+A module-level registry (INSTRUMENTATION) is fed by the pipeline; it can be
+exported as JSON or Prometheus text, and custom collectors can subscribe via
+add_hook(fn), where fn receives an event dict for every observation.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from log_setup import get_logger
+
+logger = get_logger("instrumentation")
+
+# latency histogram bucket upper bounds (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus-style, upper bounds inclusive)."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Estimates a quantile from the buckets (upper bound of the matching bucket)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class StageStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.items = 0
+        self.credits = 0
+        self.cache_hits = 0
+        self.local_hits = 0
+        self.first = None
+        self.last = None
+
+    def to_dict(self):
+        elapsed = (self.last - self.first) if self.first is not None else 0.0
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "items": self.items,
+            "credits": self.credits,
+            "cache_hits": self.cache_hits,
+            "local_hits": self.local_hits,
+            "elapsed_seconds": round(elapsed, 4),
+            "items_per_sec": round(self.items / elapsed, 2) if elapsed > 0 else None,
+            "latency": {
+                "count": self.latency.count,
+                "sum": round(self.latency.sum, 6),
+                "mean": round(self.latency.sum / self.latency.count, 6) if self.latency.count else 0.0,
+                "p50": self.latency.quantile(0.5),
+                "p95": self.latency.quantile(0.95),
+                "p99": self.latency.quantile(0.99),
+                "buckets": dict(zip([str(b) for b in self.latency.buckets] + ["+Inf"], self.latency.counts)),
+            },
+        }
+
+
+class Instrumentation:
+    """Thread-safe registry of per-stage statistics with pluggable hooks."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.hooks = []
+
+    def _stage(self, stage):
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats()
+        return stats
+
+    def _emit(self, event):
+        for hook in list(self.hooks):
+            try:
+                hook(event)
+            except Exception as e:
+                logger.warning(f"[Instrumentation] Hook {hook} failed: {e}")
+
+    def total_credits(self):
+        """Credits spent so far, over all stages."""
+        with self._lock:
+            return sum(stats.credits for stats in self.stages.values())
+
+    def observe(self, stage, latency, items=1, error=False, credits=0):
+        """Records one request of a stage."""
+        now = time.monotonic()
+        with self._lock:
+            stats = self._stage(stage)
+            stats.latency.observe(latency)
+            stats.requests += 1
+            stats.items += items
+            stats.credits += credits
+            if error:
+                stats.errors += 1
+            if stats.first is None:
+                stats.first = now - latency
+            stats.last = now
+        self._emit({"stage": stage, "event": "request", "latency": latency, "items": items, "error": error, "credits": credits})
+
+    def count_retry(self, stage):
+        with self._lock:
+            self._stage(stage).retries += 1
+        self._emit({"stage": stage, "event": "retry"})
+
+    def count_hedge(self, stage, credits=0):
+        """Counts a hedged duplicate request (and the credits it may cost)."""
+        with self._lock:
+            stats = self._stage(stage)
+            stats.hedges += 1
+            stats.credits += credits
+        self._emit({"stage": stage, "event": "hedge", "credits": credits})
+
+    def count_cache_hit(self, stage, items=1):
+        with self._lock:
+            self._stage(stage).cache_hits += items
+        self._emit({"stage": stage, "event": "cache_hit", "items": items})
+
+    def count_local_hit(self, stage, items=1):
+        """Counts inputs answered by the local pre-validation tier (no API call)."""
+        with self._lock:
+            self._stage(stage).local_hits += items
+        self._emit({"stage": stage, "event": "local_hit", "items": items})
+
+    @contextmanager
+    def timed(self, stage, items=1, credits=0):
+        """Times a block as one request; an exception counts as an error and is re-raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.observe(stage, time.perf_counter() - start, items=0, error=True)
+            raise
+        self.observe(stage, time.perf_counter() - start, items=items, credits=credits)
+
+    def add_hook(self, fn):
+        self.hooks.append(fn)
+
+    def remove_hook(self, fn):
+        if fn in self.hooks:
+            self.hooks.remove(fn)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return {stage: stats.to_dict() for stage, stats in sorted(self.stages.items())}
+
+    def to_prometheus(self, prefix="loqate"):
+        """Renders all stages in the Prometheus text exposition format."""
+        with self._lock:
+            stages = sorted(self.stages.items())
+        lines = []
+        counters = [
+            ("requests_total", "requests", "Requests sent per stage"),
+            ("errors_total", "errors", "Failed requests per stage"),
+            ("retries_total", "retries", "Retries per stage"),
+            ("hedges_total", "hedges", "Hedged duplicate requests per stage"),
+            ("items_total", "items", "Items processed per stage"),
+            ("credits_total", "credits", "Paid API credits spent per stage"),
+            ("cache_hits_total", "cache_hits", "Items served from the cache per stage"),
+            ("local_hits_total", "local_hits", "Items rejected by local pre-validation per stage"),
+        ]
+        for name, attr, help_text in counters:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for stage, stats in stages:
+                lines.append(f'{prefix}_{name}{{stage="{stage}"}} {getattr(stats, attr)}')
+
+        name = f"{prefix}_request_latency_seconds"
+        lines.append(f"# HELP {name} Request latency per stage")
+        lines.append(f"# TYPE {name} histogram")
+        for stage, stats in stages:
+            cumulative = 0
+            for bound, count in zip(list(stats.latency.buckets) + ["+Inf"], stats.latency.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {stats.latency.sum}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {stats.latency.count}')
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self):
+        logger.info("\n--- Instrumentation ---")
+        for stage, s in self.to_dict().items():
+            lat = s["latency"]
+            rate = f"{s['items_per_sec']:.1f}/s" if s["items_per_sec"] else "n/a"
+            logger.info(f"{stage}: {s['requests']} req | {s['errors']} err | {s['retries']} retries | {s['hedges']} hedges | "
+                  f"{s['items']} items ({rate}) | {s['credits']} credits | {s['cache_hits']} cache hits | {s['local_hits']} local | "
+                  f"p50 <= {lat['p50']}s | p99 <= {lat['p99']}s")
+
+    def write(self, json_path, prom_path):
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=4)
+        with open(prom_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        logger.info(f"[File] Instrumentation saved to {json_path} and {prom_path}")
+
+
+# default registry used by the pipeline
+INSTRUMENTATION = Instrumentation()
+
+
+def add_hook(fn):
+    """Subscribes a custom collector to every instrumentation event."""
+    INSTRUMENTATION.add_hook(fn)
+
+
+def remove_hook(fn):
+    INSTRUMENTATION.remove_hook(fn)
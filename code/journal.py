@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+from log_setup import get_logger
+from records import record_from_dict
+
+logger = get_logger("journal")
+
+
+class ResultJournal:
+    """
+    Append-only JSONL journal of verified records.
+    Every record is written and flushed as soon as it arrives, so a crash or
+    Ctrl-C loses at most the line being written. Iterating the journal streams
+    the records back from disk as typed records, so it can be passed wherever a results list is
+    expected (metrics, save_final_results) without loading it into memory.
+    """
+    def __init__(self, path, resume=False, fsync_every=100):
+        self.path = path
+        self.fsync_every = fsync_every
+        self._lock = threading.Lock()
+        self._since_fsync = 0
+        self._count = 0
+
+        if resume and os.path.exists(path):
+            self._count = sum(1 for _ in self)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() > 0:
+            # terminate a torn last line so new records start on their own line
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def append(self, record):
+        line = json.dumps(dict(record), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._count += 1
+            self._since_fsync += 1
+            if self._since_fsync >= self.fsync_every:
+                os.fsync(self._file.fileno())
+                self._since_fsync = 0
+
+    def __iter__(self):
+        """Streams records from disk (a torn last line from a crash is skipped)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield record_from_dict(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"[Journal] Skipping corrupt line in {self.path}")
+
+    def __len__(self):
+        return self._count
+
+    def done_inputs(self):
+        """Returns the normalized inputs that already have a record."""
+        return {str(row.get("Input", "")).lower().strip() for row in self}
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
@@ -0,0 +1,175 @@
+"""
+Non-blocking logging for the pipeline.
+
+All modules log to children of the "loqate" logger. setup_logging() routes
+them through a queue to a background listener thread, which writes to the
+console and to a log file in batches, so logging never blocks the hot loops.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+ROOT_LOGGER = "loqate"
+
+_listener = None
+
+
+def get_logger(name):
+    """Returns the pipeline logger for a module (a child of the "loqate" logger)."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class BatchedFileHandler(logging.Handler):
+    """
+    Buffers formatted records and writes them to the file in batches:
+    when `batch_size` lines are pending, and at least every `flush_interval` seconds.
+    """
+    def __init__(self, filename, batch_size=500, flush_interval=1.0):
+        super().__init__()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._file = open(filename, "a", encoding="utf-8")
+        self._buffer = []
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self.lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.batch_size:
+                self._write()
+
+    def _write(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+            self._buffer.clear()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self._file.closed:
+                self._write()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self.lock:
+            self._file.close()
+        super().close()
+
+
+class ProgressReporter:
+    """
+    Logs a one-line progress summary (done/total, rate, ETA) at a fixed rate
+    from a background thread, instead of one line per item.
+    With total=None (streamed input of unknown length) only done and rate are shown.
+    """
+    def __init__(self, label, total, interval=5.0, logger=None):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.logger = logger or get_logger("progress")
+        self.done = 0
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if interval and interval > 0 and (total is None or total > 0):
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def advance(self, n=1):
+        with self._lock:
+            self.done += n
+
+    def _report(self):
+        elapsed = time.monotonic() - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        if self.total is None:
+            self.logger.info(f"[Progress] {self.label}: {self.done} done | {rate:.1f}/s")
+            return
+        eta = (self.total - self.done) / rate if rate > 0 else float("inf")
+        pct = self.done / self.total if self.total else 1.0
+        self.logger.info(f"[Progress] {self.label}: {self.done}/{self.total} ({pct:.1%}) | {rate:.1f}/s | ETA {eta:.0f}s")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._report()
+
+    def close(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._report()
+
+
+def setup_logging(log_file=None, level="INFO", json_logs=False):
+    """
+    Configures the "loqate" logger: records are put on a queue and written by a
+    background listener to the console (plain messages) and, if given, to
+    `log_file` in batches (structured JSON lines with json_logs=True).
+    """
+    global _listener
+    shutdown_logging()
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    handlers = [console]
+    if log_file is not None:
+        file_handler = BatchedFileHandler(log_file)
+        if json_logs:
+            file_handler.setFormatter(JsonFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers.clear()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return root
+
+
+def shutdown_logging():
+    """Drains the queue and closes the handlers."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -1,80 +1,237 @@
+"""
+Loqate verification pipeline, as stages that can be run separately:
+
+    python loqate_verify.py generate   # build the input datasets (synthetic, Mail.tm, scraping)
+    python loqate_verify.py verify     # verify the saved inputs (or --input) against Loqate
+    python loqate_verify.py score      # re-score saved results, no API calls
+    python loqate_verify.py report     # print the saved metrics report
+    python loqate_verify.py merge      # merge the shards of a sharded verify
+    python loqate_verify.py history    # query past runs: metric trends, verdict flips
+
+Without a command, the flags of all stages are accepted and generate (with
+--generate_new_data) and verify run in one go, as before.
+Heavy dependencies are imported inside the stages that use them, so the
+offline commands (score, report, history) start without loading requests or the generators.
+"""
 import argparse
 import os
 import sys
 from datetime import datetime
-from utils import (
-    generate_data, 
-    verify_emails_batch, 
-    verify_phone_individual, 
-    save_list_to_json, 
-    calculate_metrics_subset, 
-    save_final_results, 
-    detect_country,
-    load_json_file
-)
-from constants import COUNTRY_PREFIXES, DATA_PATH, OUT_PATH, LOGS_PATH
-
-class DualLogger:
+
+import constants
+from cache import DEFAULT_MAX_ENTRIES
+from log_setup import get_logger, setup_logging, shutdown_logging
+
+logger = get_logger("main")
+
+COMMANDS = ("generate", "verify", "score", "report", "merge", "history")
+
+
+def _log_file(name, timestamp, json_logs=False, shard=None):
+    from shard import shard_path
+    return shard_path(constants.LOGS_PATH / f"{name}_{timestamp}.{'jsonl' if json_logs else 'log'}", shard)
+
+
+def phone_options(args):
+    """Options of the phone lookups: micro-batching and retries (utils.verify_phones_concurrent)."""
+    return {
+        "batch_size": args.phone_batch_size, "batch_window": args.phone_batch_window_ms / 1000,
+        "unprocessed_retries": args.unprocessed_retries,
+    }
+
+
+def configure_endpoints(args):
+    """Applies the per-endpoint deadlines, hedging and circuit breaker settings."""
+    from http_client import configure_endpoints
+
+    configure_endpoints(
+        timeouts={
+            "verify_emails_batch": args.email_timeout,
+            "verify_phones_batch": args.phone_batch_timeout,
+            "verify_phone_individual": args.phone_timeout,
+        },
+        breaker_threshold=args.breaker_threshold, breaker_cooldown=args.breaker_cooldown,
+        hedge_quantile=args.hedge_quantile
+    )
+
+
+def ci_options(args):
+    """Options of the metric confidence intervals (metrics.metric_intervals)."""
+    return {"method": args.ci_method, "resamples": args.bootstrap_resamples, "confidence": args.confidence}
+
+
+def record_history(run_id, results, table, labels=None, note=None):
+    """Adds a finished run to the run-history store."""
+    from history import HistoryStore
+
+    store = HistoryStore(constants.HISTORY_PATH)
+    try:
+        store.ingest_run(run_id, results, table, labels, note)
+    finally:
+        store.close()
+
+
+def finish_run(final_results, accumulator, cache, timestamp, prevalidator=None, domain_index=None, formats=("json", "csv"), shard=None, ci=None, labels=None, history=True):
     """
-    Writes output to both the console (stdout) and a log file.
+    Prints and saves the metrics (and their mergeable state), the final results,
+    cache/pre-validation stats and instrumentation. A shard writes to its own files;
+    shards are added to the run history by merge, other runs here.
     """
-    def __init__(self, filename):
-        self.terminal = sys.stdout
-        self.logfile = open(filename, "a", encoding="utf-8")
+    from http_client import close_sessions, print_endpoint_stats
+    from instrumentation import INSTRUMENTATION
+    from report import print_metrics_table, save_metrics_table
+    from shard import shard_path, state_path
+    from utils import save_final_results
 
-    def write(self, message):
-        self.terminal.write(message)
-        self.logfile.write(message)
+    metrics_table = accumulator.table(ci)
+    print_metrics_table(metrics_table)
+    save_metrics_table(metrics_table, shard_path(constants.METRICS_PATH, shard))
 
-    def flush(self):
-        # for compatibility with flush() calls
-        self.terminal.flush()
-        self.logfile.flush()
+    # save results, then the state that records which files they went to
+    written = []
+    if final_results:
+        out_path = shard_path(constants.OUT_PATH, shard)
+        written = save_final_results(final_results, out_path, formats) or []
+        logger.info(f"\n[Done] Results saved to {out_path}")
+    accumulator.save(state_path(constants.METRICS_PATH, shard), written)
 
-def main():
-    # setup logging
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_filename = LOGS_PATH / f"loqate_run_{timestamp}.log"
-    
-    # redirect all print statements to the DualLogger
-    sys.stdout = DualLogger(log_filename)
+    if history and shard is None:
+        record_history(timestamp, final_results, metrics_table, labels)
 
-    print(f"--- Starting Verification Run: {timestamp} ---")
-    print(f"--- Logs will be saved to: {log_filename} ---")
+    if cache is not None:
+        cache.print_stats()
+        cache.close()
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--standard", type=int, default=2, help="Standard emails count")
-    parser.add_argument("--pro", type=int, default=2, help="Professional emails count")
-    parser.add_argument("--phones_per_country", type=int, default=2, help="Fakes per country")
-    parser.add_argument("--generate_new_data", action="store_true", help="Generate new data even if existing data is present")
-    args = parser.parse_args()
+    print_endpoint_stats()
+    close_sessions()
+
+    if prevalidator is not None:
+        prevalidator.print_stats()
+
+    if domain_index is not None:
+        domain_index.save()
+        logger.info(f"[File] {len(domain_index.domains)} email domains indexed in {constants.DOMAIN_INDEX_PATH}")
+
+    INSTRUMENTATION.print_summary()
+    INSTRUMENTATION.write(
+        shard_path(constants.LOGS_PATH / f"loqate_run_{timestamp}_stats.json", shard),
+        shard_path(constants.LOGS_PATH / f"loqate_run_{timestamp}_stats.prom", shard)
+    )
+
+
+def run_generate(args):
+    """Generates the input datasets and saves them to the data directory."""
+    from inputs import save_generated_data
 
-    if args.generate_new_data:
-        print("[Info] Generating new data as per --generate_new_data flag.")
-        # generate & save
+    email_domains = [d.strip() for d in args.email_domains.split(",") if d.strip()] if args.email_domains else None
+    if args.synthetic_only:
+        from synthetic import generate_synthetic_data
+        logger.info(f"[Info] Generating synthetic data (seed {args.seed}).")
+        gen_data = generate_synthetic_data(args.standard, args.phones_per_country, seed=args.seed, email_domains=email_domains)
+    else:
+        from utils import generate_data
+        logger.info("[Info] Generating new data.")
         gen_data = generate_data(
-            num_standard=args.standard, 
-            num_pro=args.pro, 
-            phones_per_country=args.phones_per_country
+            num_standard=args.standard,
+            num_pro=args.pro,
+            phones_per_country=args.phones_per_country,
+            pro_concurrency=args.pro_concurrency,
+            seed=args.seed,
+            email_domains=email_domains
         )
-        
-        save_list_to_json(gen_data["std_emails"], DATA_PATH / "input_standard_emails.json")
-        save_list_to_json(gen_data["pro_emails"], DATA_PATH / "input_pro_emails.json")
-        save_list_to_json(gen_data["scraped_real_phones_by_country"], DATA_PATH / "input_real_scraped_phones.json")
-        save_list_to_json(gen_data["scraped_inactive_phones_by_country"], DATA_PATH / "input_inactive_scraped_phones.json")
-        save_list_to_json(gen_data["fake_phones_by_country"], DATA_PATH / "input_fake_phones.json")
+    save_generated_data(gen_data)
+    return gen_data
+
+
+def verify_input_file(args, cache, timestamp, shard=None):
+    """
+    Streaming mode: verifies the contacts of --input (CSV / JSONL / stdin) chunk by chunk.
+    Records are journaled as they arrive and metrics are accumulated per chunk,
+    so memory stays bounded whatever the input size.
+    """
+    from domain_index import EmailDomainIndex
+    from journal import ResultJournal
+    from log_setup import ProgressReporter
+    from prevalidate import PreValidator
+    from shard import in_shard, shard_path
+    from streaming import read_contacts, score_journaled, verify_stream
+    from utils import save_list_to_json
+
+    logger.info(f"[Stream] Reading contacts from {'stdin' if args.input == '-' else args.input}")
+    contacts = read_contacts(args.input, fmt=args.input_format, input_column=args.input_column, truth_column=args.truth_column)
+    if shard is not None:
+        contacts = ((c, t) for c, t in contacts if in_shard(c, shard))
+
+    journal_path = shard_path(constants.JOURNAL_PATH, shard)
+    journal = ResultJournal(journal_path, resume=args.resume)
+    resumed = None
+    if args.resume:
+        done = journal.done_inputs()
+        logger.info(f"[Resume] {len(done)} inputs already verified in {journal_path}, skipping them.")
+        contacts = ((c, t) for c, t in contacts if c.lower().strip() not in done)
+        # the journaled rows count towards the metrics of the resumed run
+        resumed = score_journaled(journal, constants.COUNTRY_PREFIXES, chunk_size=args.stream_chunk_size)
+
+    progress = ProgressReporter("verify", None, interval=args.progress)
+    prevalidator = None if args.no_prevalidation else PreValidator()
+    domain_index = EmailDomainIndex(constants.DOMAIN_INDEX_PATH)
+
+    def record_result(row):
+        journal.append(row)
+        progress.advance()
+
+    unverified_emails = []
+    try:
+        accumulator = verify_stream(
+            contacts, constants.COUNTRY_PREFIXES, chunk_size=args.stream_chunk_size, cache=cache,
+            on_result=record_result, email_batches_in_flight=args.email_batches_in_flight,
+            concurrency=args.concurrency, unverified=unverified_emails, prevalidator=prevalidator,
+            domain_index=domain_index, domain_samples=args.domain_level, phone_options=phone_options(args)
+        )
+    finally:
+        progress.close()
+        journal.close()
+    save_list_to_json(unverified_emails, shard_path(constants.DATA_PATH / "unverified_emails.json", shard))
+    if resumed is not None:
+        accumulator.merge(resumed)
+
+    finish_run(
+        journal, accumulator, cache, timestamp, prevalidator, domain_index, args.output_formats.split(","), shard,
+        ci_options(args), history=not args.no_history
+    )
+
+
+def run_verify(args, timestamp, shard=None, gen_data=None):
+    """Verifies the generated inputs (loaded from disk unless given) or the --input file."""
+    from cache import ResultCache
+    from domain_index import EmailDomainIndex
+    from inputs import build_run_labels, load_generated_data, manual_inputs
+    from journal import ResultJournal
+    from log_setup import ProgressReporter
+    from metrics import MetricsAccumulator
+    from prevalidate import PreValidator
+    from shard import filter_shard, shard_generated_data, shard_path
+    from utils import save_list_to_json, verify_emails_batch, verify_emails_by_domain, verify_phones_concurrent
+
+    if shard is not None:
+        logger.info(f"[Shard] Verifying shard {shard[0]} of {shard[1]}.")
+    configure_endpoints(args)
+
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(constants.CACHE_PATH, ttl=args.cache_ttl_days * 24 * 3600, max_entries=args.cache_max_entries)
+
+    if args.input:
+        verify_input_file(args, cache, timestamp, shard)
+        return
+
+    if gen_data is None:
+        logger.info("[Info] Loading existing generated data from disk.")
+        gen_data = load_generated_data()
+
+    # a shard keeps its deterministic slice of the inputs (all of them if unsharded)
+    gen_data = shard_generated_data(gen_data, shard)
 
-    else:
-        print("[Info] Loading existing generated data from disk.")
-        # load existing
-        gen_data = {
-            "std_emails": load_json_file(DATA_PATH / "input_standard_emails.json"),
-            "pro_emails": load_json_file(DATA_PATH / "input_pro_emails.json"),
-            "scraped_real_phones_by_country": load_json_file(DATA_PATH / "input_real_scraped_phones.json"),
-            "scraped_inactive_phones_by_country": load_json_file(DATA_PATH / "input_inactive_scraped_phones.json"),
-            "fake_phones_by_country": load_json_file(DATA_PATH / "input_fake_phones.json"),
-        }
-    
     # flatten fake phones list for verification
     active_scraped_phones = [p for sublist in gen_data["scraped_real_phones_by_country"].values() for p in sublist]
     inactive_scraped_phones = [p for sublist in gen_data["scraped_inactive_phones_by_country"].values() for p in sublist]
@@ -82,79 +239,379 @@ def main():
     all_generated_phones = [p for sublist in gen_data["fake_phones_by_country"].values() for p in sublist]
 
     # load real data
-    real_emails = [e.strip() for e in os.getenv("REAL_EMAILS", "").split(",") if e.strip()]
-    real_phones_manual = [p.strip() for p in os.getenv("REAL_PHONES", "").split(",") if p.strip()]
-    
-    # bucket manual phones
-    manual_phones_by_country = {code: [] for code in COUNTRY_PREFIXES}
-    for p in real_phones_manual:
-        code = detect_country(p)
-        if code in manual_phones_by_country: manual_phones_by_country[code].append(p)
+    real_emails, real_phones_manual = (filter_shard(values, shard) for values in manual_inputs())
 
     all_emails = gen_data["std_emails"] + gen_data["pro_emails"] + real_emails
     all_phones = all_scraped_phones + all_generated_phones + real_phones_manual
-    
-    final_results = []
-    final_results.extend(verify_emails_batch(all_emails))
-
-    print(f"\n[Phone] Verifying {len(all_phones)} numbers...")
-    for p in all_phones:
-        res = verify_phone_individual(p)
-        if res: final_results.append(res)
-
-    # tag ground truth
-    # sets for fast lookup
-    total_real_inputs = set([str(x).lower().strip() for x in (real_emails + real_phones_manual + active_scraped_phones)])
-    total_fake_inputs = set([str(x).lower().strip() for x in (gen_data["std_emails"] + gen_data["pro_emails"] + all_generated_phones + inactive_scraped_phones)])
-    
-    for row in final_results:
-        val = str(row.get('Input', '')).lower().strip()
-        if val in total_real_inputs:
-            row['GroundTruth'] = 'Real'
-        elif val in total_fake_inputs:
-            row['GroundTruth'] = 'Fake'
+
+    # labels (source, country, ground truth) for every input, built once
+    labels = build_run_labels(gen_data, real_emails, real_phones_manual)
+
+    # every record is tagged and journaled as soon as it arrives
+    journal_path = shard_path(constants.JOURNAL_PATH, shard)
+    journal = ResultJournal(journal_path, resume=args.resume)
+
+    sampler = None
+    if args.adaptive:
+        from sampling import AdaptiveSampler, strata_from_labels
+        sampler = AdaptiveSampler(
+            strata_from_labels(all_emails + all_phones, labels), target=args.target_precision,
+            confidence=args.confidence, min_per_stratum=args.min_per_stratum, seed=args.sampling_seed
+        )
+        if args.resume:
+            logger.info(f"[Resume] {sampler.resume(journal)} inputs already verified in {journal_path}.")
+    elif args.resume:
+        done = journal.done_inputs()
+        logger.info(f"[Resume] {len(done)} inputs already verified in {journal_path}, skipping them.")
+        all_emails = [e for e in all_emails if str(e).lower().strip() not in done]
+        all_phones = [p for p in all_phones if str(p).lower().strip() not in done]
+
+    # progress is summarised at a fixed rate instead of one line per item
+    progress = ProgressReporter("verify", None if sampler else len(all_emails) + len(all_phones), interval=args.progress)
+    # built after generation, so freshly fetched Mail.tm domains are included; the
+    # domains of the generated fakes are exempt, as their verdicts are what is benchmarked
+    own_domains = {str(e).rpartition("@")[2].lower() for e in gen_data["std_emails"] + gen_data["pro_emails"]}
+    prevalidator = None if args.no_prevalidation else PreValidator(exempt_domains=own_domains)
+    domain_index = EmailDomainIndex(constants.DOMAIN_INDEX_PATH)
+
+    def record_result(row):
+        row['GroundTruth'] = labels.ground_truth(row.get('Input', ''))
+        journal.append(row)
+        if sampler is not None:
+            sampler.record(row)
+        progress.advance()
+
+    unverified_emails = []
+    email_kwargs = dict(
+        cache=cache, max_in_flight=args.email_batches_in_flight, unverified=unverified_emails,
+        on_result=record_result, prevalidator=prevalidator
+    )
+
+    def verify_inputs(emails, phones):
+        if emails:
+            if args.domain_level > 0:
+                verify_emails_by_domain(emails, domain_index, samples=args.domain_level, **email_kwargs)
+            else:
+                verify_emails_batch(emails, domain_index=domain_index, **email_kwargs)
+        if phones:
+            logger.info(f"\n[Phone] Verifying {len(phones)} numbers ({args.concurrency} in flight)...")
+            verify_phones_concurrent(
+                phones, concurrency=args.concurrency, cache=cache, on_result=record_result, prevalidator=prevalidator,
+                **phone_options(args)
+            )
+
+    try:
+        if sampler is not None:
+            import http_client
+            from instrumentation import INSTRUMENTATION
+            from sampling import run_adaptive
+
+            email_set = {str(e).lower().strip() for e in all_emails}
+
+            def verify_round(batch):
+                emails = [v for v in batch if str(v).lower().strip() in email_set]
+                verify_inputs(emails, [v for v in batch if str(v).lower().strip() not in email_set])
+
+            def low_budget():
+                # hedged duplicates near the limit would spend credits the budget no longer has
+                if http_client.HEDGE_QUANTILE:
+                    logger.info("[Adaptive] Budget nearly spent, hedging turned off.")
+                    http_client.stop_hedging()
+
+            run_adaptive(
+                sampler, verify_round, args.round_size, args.credit_budget, INSTRUMENTATION.total_credits,
+                on_low_budget=low_budget
+            )
         else:
-            row['GroundTruth'] = 'Unknown'
+            verify_inputs(all_emails, all_phones)
+        save_list_to_json(unverified_emails, shard_path(constants.DATA_PATH / "unverified_emails.json", shard))
+    finally:
+        progress.close()
+        journal.close()
+
+    # metrics and outputs are streamed from the journal
+    final_results = journal
 
-    # calculate metrics
-    # ground truth buckets
+    if sampler is not None:
+        # metrics cover the sampled inputs only
+        labels = sampler.label_index(constants.COUNTRY_PREFIXES)
+        sampler.print_summary()
+        sampler.save(shard_path(constants.STRATA_PATH, shard))
+
+    # calculate metrics for all subsets and countries in one pass
     # real = manual real + scraped real
-    # fake = generared standard + generated pro + generated phones + scraped fake (inactive) phones
-    
-    # 1) overall
-    total_real = real_emails + real_phones_manual + active_scraped_phones
-    total_fake = gen_data["std_emails"] + gen_data["pro_emails"] + all_generated_phones + inactive_scraped_phones
-    calculate_metrics_subset(final_results, total_real, total_fake, label="OVERALL")
-
-    # 2) emails
-    print("\n--- EMAIL METRICS ---")
-    calculate_metrics_subset(final_results, [], gen_data["std_emails"], label="EMAILS (Standard Fakes)")
-    calculate_metrics_subset(final_results, [], gen_data["pro_emails"], label="EMAILS (Pro Fakes)")
-
-    # 3) phones overall
-    phones_real = real_phones_manual + active_scraped_phones
-    phones_fake = all_generated_phones + inactive_scraped_phones
-    calculate_metrics_subset(final_results, phones_real, phones_fake, label="PHONES (Global)")
-    calculate_metrics_subset(final_results, active_scraped_phones, inactive_scraped_phones, label="PHONES (Scraped Only)")
-    calculate_metrics_subset(final_results, active_scraped_phones, [], label="PHONES (Active Scraped Only)")
-    calculate_metrics_subset(final_results, [], inactive_scraped_phones, label="PHONES (Inactive Scraped Only)")
-
-    # 4) phones per country
-    print("\n--- PHONE METRICS PER COUNTRY ---")
-    for code in COUNTRY_PREFIXES:
-        # real = manual for this country + scraped for this country
-        c_real = manual_phones_by_country.get(code, []) + gen_data["scraped_real_phones_by_country"].get(code, [])
-        # fake = generated for this country
-        c_fake = gen_data["fake_phones_by_country"].get(code, []) + gen_data["scraped_inactive_phones_by_country"].get(code, [])
-        
-        if c_real or c_fake:
-            lbl = f"Phone: {code} ({len(c_real)} Real, {len(c_fake)} Fake)"
-            calculate_metrics_subset(final_results, c_real, c_fake, label=lbl)
-
-    # save results
-    if final_results:
-        save_final_results(final_results, OUT_PATH)
-        print(f"\n[Done] Results saved to {OUT_PATH}")
+    # fake = generated standard + generated pro + generated phones + scraped fake (inactive) phones
+    accumulator = MetricsAccumulator(constants.COUNTRY_PREFIXES)
+    accumulator.add(final_results, labels)
+    finish_run(
+        final_results, accumulator, cache, timestamp, prevalidator, domain_index, args.output_formats.split(","), shard,
+        ci_options(args), labels, not args.no_history
+    )
+
+
+def run_score(args):
+    """
+    Re-scores a saved results file without any API call. Inputs are labelled from
+    the saved datasets and .env; rows of other inputs (e.g. from --input runs)
+    are labelled from their GroundTruth column.
+    """
+    from inputs import build_run_labels, label_from_ground_truth, load_generated_data, manual_inputs
+    from metrics import MetricsAccumulator
+    from records import read_results
+    from report import print_metrics_table, save_metrics_table
+    from shard import find_results_file, state_path
+
+    try:
+        path = args.results or find_results_file(constants.OUT_PATH, metrics_path=constants.METRICS_PATH)
+    except ValueError as e:
+        logger.error(f"[Error] {e}")
+        return
+    if path is None:
+        logger.error(f"[Error] No results file found next to {constants.OUT_PATH}, run verify first.")
+        return
+    results = list(read_results(path))
+    logger.info(f"[Score] {len(results)} records read from {path}")
+
+    real_emails, real_phones = manual_inputs()
+    labels = build_run_labels(load_generated_data(), real_emails, real_phones)
+    label_from_ground_truth(labels, results)
+
+    accumulator = MetricsAccumulator(constants.COUNTRY_PREFIXES)
+    accumulator.add(results, labels)
+    table = accumulator.table(ci_options(args))
+    print_metrics_table(table)
+    save_metrics_table(table, constants.METRICS_PATH)
+    # a file from elsewhere is not recorded as this run's results
+    own = os.path.dirname(os.path.abspath(path)) == os.path.abspath(constants.OUT_PATH.parent)
+    accumulator.save(state_path(constants.METRICS_PATH), [path] if own else None)
+
+
+def run_report(args):
+    """Prints the saved metrics report."""
+    from report import load_metrics_table, print_metrics_table
+
+    path = args.metrics or constants.METRICS_PATH
+    try:
+        table = load_metrics_table(path)
+    except FileNotFoundError:
+        logger.error(f"[Error] No metrics at {path}, run verify or score first.")
+        return
+    logger.info(f"--- Metrics report: {path} ---")
+    print_metrics_table(table)
+
+
+def run_merge(args, timestamp):
+    from records import read_results
+    from report import load_metrics_table
+    from shard import find_results_file, merge_shards
+
+    try:
+        merge_shards(
+            constants.OUT_PATH, constants.METRICS_PATH, args.output_formats.split(","),
+            allow_partial=args.allow_partial_merge, ci=ci_options(args)
+        )
+    except ValueError as e:
+        logger.error(f"[Error] {e}")
+        return
+    results_path = find_results_file(constants.OUT_PATH, metrics_path=constants.METRICS_PATH)
+    if not args.no_history and results_path is not None:
+        record_history(timestamp, read_results(results_path), load_metrics_table(constants.METRICS_PATH), note="merged shards")
+
+
+def run_history(args):
+    """Queries the run-history store, or ingests a saved results file into it."""
+    from history import HistoryStore, print_flips, print_runs, print_trends
+
+    store = HistoryStore(constants.HISTORY_PATH)
+    try:
+        if args.ingest:
+            from records import read_results
+            from report import load_metrics_table
+
+            table = load_metrics_table(args.metrics) if args.metrics else []
+            # run ids sort by time; a backfilled file is dated by its modification time
+            run_id = args.run_id or datetime.fromtimestamp(os.path.getmtime(args.ingest)).strftime("%Y%m%d_%H%M%S")
+            store.ingest_run(run_id, read_results(args.ingest), table, note=f"ingested from {args.ingest}")
+        elif args.trends:
+            print_trends(store, args.country, args.metric)
+        elif args.flips:
+            print_flips(store, args.run_a, args.run_b, args.country, args.limit)
+        else:
+            print_runs(store)
+    finally:
+        store.close()
+
+
+def _add_generate_args(parser):
+    parser.add_argument("--standard", type=int, default=2, help="Standard emails count")
+    parser.add_argument("--pro", type=int, default=2, help="Professional emails count")
+    parser.add_argument("--phones_per_country", type=int, default=2, help="Fakes per country")
+    parser.add_argument("--pro_concurrency", type=int, default=4, help="Number of Mail.tm accounts created concurrently")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the synthetic emails / phones (same seed, same dataset)")
+    parser.add_argument("--synthetic_only", action="store_true", help="Only generate synthetic data (no Mail.tm inboxes or scraping), e.g. for large benchmark corpora")
+    parser.add_argument("--email_domains", default=None, help="Comma-separated domains for the synthetic emails (default: random unregistered domains)")
+
+
+def _add_verify_args(parser):
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of phone lookups kept in flight")
+    parser.add_argument("--email_batches_in_flight", type=int, default=4, help="Number of email batches kept in flight")
+    parser.add_argument("--phone_batch_size", type=int, default=100, help="Phones per batch request if URL_PHONE_BATCH is set (1 = individual lookups)")
+    parser.add_argument("--phone_batch_window_ms", type=float, default=20, help="Longest a phone lookup waits for its batch to fill (ms)")
+    parser.add_argument("--email_timeout", type=float, default=30, help="Deadline of an email batch request (s)")
+    parser.add_argument("--phone_timeout", type=float, default=10, help="Deadline of a phone lookup (s)")
+    parser.add_argument("--phone_batch_timeout", type=float, default=30, help="Deadline of a phone batch request (s)")
+    parser.add_argument("--hedge_quantile", type=float, default=0.95, help="Send a duplicate phone lookup once one takes longer than this latency quantile (0 disables hedging)")
+    parser.add_argument("--unprocessed_retries", type=int, default=2, help="Retries of phone lookups answered with RequestProcessed: False")
+    parser.add_argument("--breaker_threshold", type=int, default=5, help="Failures in a row that open an endpoint's circuit breaker")
+    parser.add_argument("--breaker_cooldown", type=float, default=5, help="Seconds an open circuit pauses its endpoint (doubles while it keeps failing)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the result journal of an interrupted run")
+    parser.add_argument("--no_cache", action="store_true", help="Do not read or write the on-disk result cache")
+    parser.add_argument("--cache_ttl_days", type=float, default=30, help="Days before a cached result expires")
+    parser.add_argument("--cache_max_entries", type=int, default=DEFAULT_MAX_ENTRIES, help="Max cached results (LRU eviction)")
+    parser.add_argument("--domain_level", type=int, default=0, help="Verify only this many sample emails per domain and let the rest inherit the domain verdict (0 = off)")
+    parser.add_argument("--no_prevalidation", action="store_true", help="Send every input to the API (skip the local pre-validation tier)")
+    parser.add_argument("--progress", type=float, default=5.0, help="Seconds between progress summaries (0 disables them)")
+    parser.add_argument("--input", default=None, help="CSV / JSONL file of contacts to verify ('-' for stdin), streamed in chunks")
+    parser.add_argument("--input_format", choices=["csv", "jsonl"], default=None, help="Format of --input (default: from the extension, csv for stdin)")
+    parser.add_argument("--input_column", default="Input", help="Column holding the email / phone in --input")
+    parser.add_argument("--truth_column", default="GroundTruth", help="Column holding the ground truth (real/fake) in --input")
+    parser.add_argument("--stream_chunk_size", type=int, default=10000, help="Rows of --input held in memory at once")
+    parser.add_argument("--shard", default=None, help="Verify only shard i of N (e.g. 0/4) of the inputs, into per-shard files")
+    parser.add_argument("--adaptive", action="store_true", help="Verify in rounds, sampling (country, source) strata until their accuracy intervals reach --target_precision")
+    parser.add_argument("--target_precision", type=float, default=0.05, help="Adaptive: target half-width of each stratum's accuracy interval")
+    parser.add_argument("--credit_budget", type=int, default=None, help="Adaptive: stop once this many API credits are spent")
+    parser.add_argument("--round_size", type=int, default=200, help="Adaptive: inputs verified per round")
+    parser.add_argument("--min_per_stratum", type=int, default=5, help="Adaptive: inputs sampled from every stratum before allocating by interval width")
+    parser.add_argument("--sampling_seed", type=int, default=None, help="Adaptive: seed of the sampling order")
+
+
+def _add_metrics_args(parser):
+    parser.add_argument("--ci_method", choices=["bootstrap", "wilson"], default="bootstrap", help="Confidence intervals of the metrics: bootstrap, or Wilson for accuracy / precision / recall")
+    parser.add_argument("--bootstrap_resamples", type=int, default=2000, help="Bootstrap resamples per metric interval")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the metric intervals (and of the adaptive strata)")
+
+
+def _add_output_args(parser):
+    parser.add_argument("--output_formats", default="json,csv", help="Comma-separated result formats: json, csv, jsonl, parquet, arrow (parquet/arrow need pyarrow)")
+    parser.add_argument("--no_history", action="store_true", help="Do not add the run to the run-history store")
+
+
+def _add_log_args(parser):
+    parser.add_argument("--log_level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Console / log file verbosity (DEBUG shows every item)")
+    parser.add_argument("--json_logs", action="store_true", help="Write the log file as JSON lines")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Loqate email / phone verification benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Generate the input datasets")
+    _add_generate_args(generate)
+    _add_log_args(generate)
+
+    verify = commands.add_parser("verify", help="Verify the saved inputs (or --input) and score them")
+    _add_verify_args(verify)
+    _add_metrics_args(verify)
+    _add_output_args(verify)
+    _add_log_args(verify)
+
+    score = commands.add_parser("score", help="Re-score a saved results file (no API calls)")
+    score.add_argument("--results", default=None, help="Results file (json, csv, jsonl, parquet, arrow; default: the last run's)")
+    _add_metrics_args(score)
+    _add_log_args(score)
+
+    report = commands.add_parser("report", help="Print the saved metrics report")
+    report.add_argument("--metrics", default=None, help="Metrics file (default: the last run's)")
+    _add_log_args(report)
+
+    merge = commands.add_parser("merge", help="Merge the per-shard results and metrics of a sharded verify")
+    merge.add_argument("--allow_partial_merge", action="store_true", help="Merge even if some shards have not finished")
+    _add_metrics_args(merge)
+    _add_output_args(merge)
+    _add_log_args(merge)
+
+    history = commands.add_parser("history", help="Query past runs: per-country metric trends and verdict flips")
+    query = history.add_mutually_exclusive_group()
+    query.add_argument("--trends", action="store_true", help="Per-country metric of every stored run")
+    query.add_argument("--flips", action="store_true", help="Inputs whose verdict changed between two runs (default: the last two)")
+    query.add_argument("--ingest", default=None, help="Add a saved results file (json, csv, jsonl, parquet, arrow) as a run")
+    history.add_argument("--country", default=None, help="Only this country (e.g. GB)")
+    history.add_argument("--metric", choices=["accuracy", "precision", "recall", "f1"], default="accuracy", help="Metric shown by --trends")
+    history.add_argument("--run_a", default=None, help="--flips: earlier run id")
+    history.add_argument("--run_b", default=None, help="--flips: later run id")
+    history.add_argument("--limit", type=int, default=50, help="--flips: inputs listed (all are counted)")
+    history.add_argument("--metrics", default=None, help="--ingest: metrics file of that run")
+    history.add_argument("--run_id", default=None, help="--ingest: id of the run (default: the file's modification time)")
+    _add_log_args(history)
+    return parser
+
+
+def build_legacy_parser():
+    """All-in-one flags (no command): optional generation, then verification."""
+    parser = argparse.ArgumentParser(
+        description=f"Generates (with --generate_new_data) and verifies in one run. Stages: {', '.join(COMMANDS)} (see <command> -h)."
+    )
+    _add_generate_args(parser)
+    parser.add_argument("--generate_new_data", action="store_true", help="Generate new data even if existing data is present")
+    _add_verify_args(parser)
+    _add_metrics_args(parser)
+    _add_output_args(parser)
+    _add_log_args(parser)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        parser = build_parser()
+        args = parser.parse_args(argv)
+    else:
+        parser = build_legacy_parser()
+        args = parser.parse_args(argv)
+        args.command = None
+
+    shard = None
+    if getattr(args, "shard", None):
+        from shard import parse_shard
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if getattr(args, "generate_new_data", False):
+            # every shard has to partition the same inputs
+            parser.error("--shard uses the saved inputs; generate them once in an unsharded run first")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if args.command in ("score", "report", "history"):
+        # offline commands only print (score also rewrites the metrics files)
+        setup_logging(level=args.log_level)
+    else:
+        # setup logging: records go through a queue to a background writer
+        constants.ensure_dirs()
+        log_filename = _log_file("loqate_run", timestamp, args.json_logs, shard)
+        setup_logging(log_filename, level=args.log_level, json_logs=args.json_logs)
+        logger.info(f"--- Starting {args.command or 'Verification'} Run: {timestamp} ---")
+        logger.info(f"--- Logs will be saved to: {log_filename} ---")
+
+    try:
+        if args.command == "generate":
+            run_generate(args)
+        elif args.command == "verify":
+            run_verify(args, timestamp, shard)
+        elif args.command == "score":
+            run_score(args)
+        elif args.command == "report":
+            run_report(args)
+        elif args.command == "merge":
+            run_merge(args, timestamp)
+        elif args.command == "history":
+            run_history(args)
+        else:
+            gen_data = run_generate(args) if args.generate_new_data else None
+            run_verify(args, timestamp, shard, gen_data)
+    finally:
+        shutdown_logging()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
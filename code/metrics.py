@@ -0,0 +1,501 @@
+import json
+import os
+from itertools import islice, repeat
+from operator import attrgetter
+from statistics import NormalDist
+import numpy as np
+from log_setup import get_logger
+# re-exported: the table printing lives in report.py so `report` does not need numpy
+from report import print_metrics_table, save_metrics_table
+
+logger = get_logger("metrics")
+
+# input sources and their ground truth (True = Real)
+SOURCES = {
+    "real_email": True,        # manual inputs (.env)
+    "manual_phone": True,      # manual inputs (.env)
+    "scraped_active": True,    # scraped active numbers
+    "std_email": False,        # Faker emails
+    "pro_email": False,        # disposable Mail.tm inboxes
+    "generated_phone": False,  # structured fake numbers
+    "scraped_inactive": False, # scraped inactive numbers
+    "input_real_email": True,  # input file rows labelled real
+    "input_fake_email": False, # input file rows labelled fake
+    "input_real_phone": True,
+    "input_fake_phone": False,
+}
+SOURCE_NAMES = list(SOURCES)
+SOURCE_CODES = {name: i for i, name in enumerate(SOURCE_NAMES)}
+SOURCE_IS_REAL = np.array([SOURCES[name] for name in SOURCE_NAMES], dtype=np.int64)
+
+EMAIL_SOURCES = ("real_email", "std_email", "pro_email", "input_real_email", "input_fake_email")
+SOURCE_IS_EMAIL = np.array([name in EMAIL_SOURCES for name in SOURCE_NAMES], dtype=bool)
+PHONE_SOURCES = ("manual_phone", "scraped_active", "generated_phone", "scraped_inactive", "input_real_phone", "input_fake_phone")
+
+# the fixed (non-country) subsets reported for every run: (group, label, sources)
+SUBSETS = [
+    ("OVERALL", "OVERALL", SOURCE_NAMES),
+    ("EMAIL", "EMAILS (Standard Fakes)", ("std_email",)),
+    ("EMAIL", "EMAILS (Pro Fakes)", ("pro_email",)),
+    ("EMAIL", "EMAILS (Input File)", ("input_real_email", "input_fake_email")),
+    ("PHONE", "PHONES (Global)", PHONE_SOURCES),
+    ("PHONE", "PHONES (Scraped Only)", ("scraped_active", "scraped_inactive")),
+    ("PHONE", "PHONES (Active Scraped Only)", ("scraped_active",)),
+    ("PHONE", "PHONES (Inactive Scraped Only)", ("scraped_inactive",)),
+    ("PHONE", "PHONES (Input File)", ("input_real_phone", "input_fake_phone")),
+]
+
+# rows tagged per vectorized pass (bounds memory when scoring a streamed journal)
+TAG_CHUNK = 100000
+
+# most frequent email domains reported in the per-domain breakdown
+TOP_DOMAINS = 50
+
+# confidence intervals of the reported metrics: bootstrap (all four metrics) or
+# wilson (closed form for accuracy / precision / recall, bootstrap for F1)
+CI_METHODS = ("bootstrap", "wilson")
+METRIC_NAMES = ("accuracy", "precision", "recall", "f1")
+DEFAULT_RESAMPLES = 2000
+# fixed seed, so re-scoring the same results gives the same intervals
+BOOTSTRAP_SEED = 0
+
+# prediction codes
+PRED_UNKNOWN, PRED_INVALID, PRED_VALID = -1, 0, 1
+# "unknown" is a verdict but not a prediction (domain-level rows, whose mailbox was not checked)
+_PREDICTIONS = {
+    "yes": PRED_VALID, "true": PRED_VALID, "no": PRED_INVALID, "false": PRED_INVALID, "maybe": PRED_INVALID,
+    "unknown": PRED_UNKNOWN,
+}
+
+
+def _normalize(value):
+    return str(value).lower().strip()
+
+
+def _columns(rows, *fields):
+    """
+    Reads the given fields of every row into lists, one C-level map per field
+    (dict.get for dict rows, attrgetter for typed records; other rows use row.get).
+    Missing fields read as None.
+    """
+    kinds = set(map(type, rows))
+    if all(issubclass(kind, dict) for kind in kinds):
+        return [list(map(dict.get, rows, repeat(field))) for field in fields]
+    if all(hasattr(kind, field) for kind in kinds for field in fields):
+        return [list(map(attrgetter(field), rows)) for field in fields]
+    return [[row.get(field) for row in rows] for field in fields]
+
+
+def _factorize(values, keys_of):
+    """
+    Factorizes a column: the distinct values are numbered with C-level set / dict
+    passes, and `keys_of` maps the list of distinct values to their keys (values
+    with equal keys share a code).
+    Returns (codes, uniques) with uniques[codes[i]] == the key of values[i].
+    """
+    distinct = list(set(values))
+    table = dict(zip(distinct, range(len(distinct))))
+    codes = np.fromiter(map(table.__getitem__, values), dtype=np.int64, count=len(values))
+    keys = keys_of(distinct)
+    if len(set(keys)) == len(keys):
+        return codes, keys
+    positions = {}
+    merged = np.fromiter(map(positions.setdefault, keys, range(len(keys))), dtype=np.int64, count=len(keys))
+    # renumber the first occurrence of every key 0..n-1
+    first, renumbered = np.unique(merged, return_inverse=True)
+    return renumbered[codes], [keys[i] for i in first.tolist()]
+
+
+class LabelIndex:
+    """
+    Maps every normalized input to its labels: source (and thus ground truth) and country.
+    Built once from the input lists; real sources win if an input appears twice.
+    `labels` holds each pair packed into one int (source * len(countries) + country),
+    so tagging reads a whole column of them with a single np.fromiter.
+    """
+    def __init__(self, countries):
+        self.countries = list(countries) + ["Unknown"]
+        self.country_codes = {c: i for i, c in enumerate(self.countries)}
+        self.labels = {}
+        self.input_counts = np.zeros((len(SOURCE_NAMES), len(self.countries)), dtype=np.int64)
+
+    def add(self, inputs, source, country="Unknown"):
+        src = SOURCE_CODES[source]
+        ctry = self.country_codes.get(country, self.country_codes["Unknown"])
+        for value in inputs:
+            if not value:
+                continue
+            key = _normalize(value)
+            if key in self.labels:
+                continue
+            self.labels[key] = src * len(self.countries) + ctry
+            self.input_counts[src, ctry] += 1
+
+    def label(self, key):
+        """(source, country) codes of a normalized input, or None if it is not labelled."""
+        code = self.labels.get(key)
+        return None if code is None else divmod(code, len(self.countries))
+
+    def ground_truth(self, value):
+        """Returns 'Real', 'Fake' or 'Unknown' for an input."""
+        label = self.label(_normalize(value))
+        if label is None:
+            return "Unknown"
+        return "Real" if SOURCE_IS_REAL[label[0]] else "Fake"
+
+    def tag(self, results):
+        """
+        Tags every result once. Returns int arrays (source, country, prediction);
+        rows whose input is not in the index get source -1.
+        """
+        return self.tag_columns(*_columns(results, "Input", "IsValid"))
+
+    def tag_columns(self, inputs, verdicts):
+        """tag() for the Input and IsValid columns, already read (see _columns)."""
+        labels = self.labels
+        codes = np.fromiter(map(labels.get, inputs, repeat(-1)), dtype=np.int64, count=len(inputs))
+        # inputs are usually stored normalized already; only the misses are normalized
+        misses = np.flatnonzero(codes < 0)
+        if len(misses):
+            retried = map(labels.get, map(_normalize, map(inputs.__getitem__, misses.tolist())), repeat(-1))
+            codes[misses] = np.fromiter(retried, dtype=np.int64, count=len(misses))
+        src, ctry = np.divmod(codes, len(self.countries))
+        src[codes < 0] = -1
+
+        codes, parsed = _factorize(verdicts, lambda distinct: [str(v).lower() for v in distinct])
+        pred = np.array([_PREDICTIONS.get(v, PRED_UNKNOWN) for v in parsed], dtype=np.int64)[codes]
+        unexpected = np.array([v not in _PREDICTIONS for v in parsed], dtype=bool)[codes]
+        for i in np.flatnonzero(unexpected & (src >= 0)):
+            logger.warning(f"   [Warning] Unknown IsValid value for {inputs[i]}: {verdicts[i]}")
+        return src, ctry, pred
+
+
+def build_label_index(gen_data, real_emails, real_phones_manual, manual_phones_by_country, countries):
+    """Builds the LabelIndex for a run from the generated/loaded data and the manual inputs."""
+    index = LabelIndex(countries)
+    # real sources first, so they win on duplicates
+    index.add(real_emails, "real_email")
+    for code, phones in manual_phones_by_country.items():
+        index.add(phones, "manual_phone", code)
+    # manual phones outside the supported countries
+    index.add(real_phones_manual, "manual_phone")
+    for code, phones in gen_data["scraped_real_phones_by_country"].items():
+        index.add(phones, "scraped_active", code)
+    index.add(gen_data["std_emails"], "std_email")
+    index.add(gen_data["pro_emails"], "pro_email")
+    for code, phones in gen_data["fake_phones_by_country"].items():
+        index.add(phones, "generated_phone", code)
+    for code, phones in gen_data["scraped_inactive_phones_by_country"].items():
+        index.add(phones, "scraped_inactive", code)
+    return index
+
+
+def confusion_counts(src, ctry, pred, n_countries):
+    """
+    Fills the confusion counts for every (source, country) cell in one pass.
+    Returns an array of shape (sources, countries, truth, prediction).
+    """
+    keep = (src >= 0) & (pred >= 0)
+    src, ctry, pred = src[keep], ctry[keep], pred[keep]
+    truth = SOURCE_IS_REAL[src]
+    cell = ((src * n_countries + ctry) * 2 + truth) * 2 + pred
+    counts = np.bincount(cell, minlength=len(SOURCE_NAMES) * n_countries * 4)
+    return counts.reshape(len(SOURCE_NAMES), n_countries, 2, 2)
+
+
+def _subset_masks(index):
+    """Returns (rows, masks) where masks[k] selects the (source, country) cells of subset k."""
+    n_countries = len(index.countries)
+    rows, masks = [], []
+    for group, label, sources in SUBSETS:
+        mask = np.zeros((len(SOURCE_NAMES), n_countries), dtype=np.int64)
+        mask[[SOURCE_CODES[s] for s in sources], :] = 1
+        rows.append({"group": group, "label": label, "country": None})
+        masks.append(mask)
+
+    phone_codes = [SOURCE_CODES[s] for s in PHONE_SOURCES]
+    real_phone_codes = [c for c in phone_codes if SOURCE_IS_REAL[c]]
+    fake_phone_codes = [c for c in phone_codes if not SOURCE_IS_REAL[c]]
+    for code, i in index.country_codes.items():
+        if code == "Unknown":
+            continue
+        n_real = int(index.input_counts[real_phone_codes, i].sum())
+        n_fake = int(index.input_counts[fake_phone_codes, i].sum())
+        if not (n_real or n_fake):
+            continue
+        mask = np.zeros((len(SOURCE_NAMES), n_countries), dtype=np.int64)
+        mask[phone_codes, i] = 1
+        rows.append({"group": "COUNTRY", "label": f"Phone: {code} ({n_real} Real, {n_fake} Fake)", "country": code})
+        masks.append(mask)
+    return rows, np.stack(masks)
+
+
+def metrics_from_counts(tp, tn, fp, fn):
+    """Vectorized accuracy / precision / recall / F1 (0 where undefined)."""
+    tp, tn, fp, fn = (np.asarray(x, dtype=np.float64) for x in (tp, tn, fp, fn))
+    total = tp + tn + fp + fn
+    with np.errstate(divide="ignore", invalid="ignore"):
+        accuracy = np.where(total > 0, (tp + tn) / total, 0.0)
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return accuracy, precision, recall, f1
+
+
+def wilson_interval(successes, n, z=1.96):
+    """
+    Vectorized Wilson score interval of binomial proportions.
+    Returns (low, high) arrays; (0, 1) where n == 0.
+    """
+    k, n = np.asarray(successes, dtype=np.float64), np.asarray(n, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = k / n
+        denom = 1 + z ** 2 / n
+        center = (p + z ** 2 / (2 * n)) / denom
+        half = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denom
+    low = np.where(n > 0, np.clip(center - half, 0.0, 1.0), 0.0)
+    high = np.where(n > 0, np.clip(center + half, 0.0, 1.0), 1.0)
+    return low, high
+
+
+def bootstrap_intervals(tp, tn, fp, fn, resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=BOOTSTRAP_SEED):
+    """
+    Percentile bootstrap intervals of the four metrics for every row at once.
+    Resampling a row's results with replacement only changes its confusion
+    counts, so each resample is one multinomial draw over the row's
+    (tp, tn, fp, fn) cells: (resamples, rows, 4) counts in a single call, and
+    the metrics and quantiles are computed over the resample axis.
+    Returns {metric: (low, high)}; rows without results get (0, 1).
+    """
+    cells = np.stack([tp, tn, fp, fn], axis=-1).astype(np.int64)
+    total = cells.sum(axis=-1)
+    pvals = np.where(total[:, None] > 0, cells / np.maximum(total, 1)[:, None], 0.25)
+    rng = np.random.default_rng(seed)
+    draws = rng.multinomial(total, pvals, size=(resamples, len(total)))
+    values = metrics_from_counts(draws[..., 0], draws[..., 1], draws[..., 2], draws[..., 3])
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for name, value in zip(METRIC_NAMES, values):
+        low, high = np.quantile(value, [alpha, 1 - alpha], axis=0)
+        intervals[name] = (np.where(total > 0, low, 0.0), np.where(total > 0, high, 1.0))
+    return intervals
+
+
+def metric_intervals(tp, tn, fp, fn, method="bootstrap", resamples=DEFAULT_RESAMPLES, confidence=0.95, seed=BOOTSTRAP_SEED):
+    """Confidence intervals {metric: (low, high)} of every row, by `method` (see CI_METHODS)."""
+    if method not in CI_METHODS:
+        raise ValueError(f"Unknown confidence interval method: {method}")
+    tp, tn, fp, fn = (np.asarray(x, dtype=np.int64) for x in (tp, tn, fp, fn))
+    if method == "bootstrap":
+        return bootstrap_intervals(tp, tn, fp, fn, resamples, confidence, seed)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return {
+        "accuracy": wilson_interval(tp + tn, tp + tn + fp + fn, z),
+        "precision": wilson_interval(tp, tp + fp, z),
+        "recall": wilson_interval(tp, tp + fn, z),
+        # F1 is not a proportion, so it keeps the bootstrap interval
+        "f1": bootstrap_intervals(tp, tn, fp, fn, resamples, confidence, seed)["f1"],
+    }
+
+
+def _fill_rows(rows, tp, tn, fp, fn, ci=None):
+    """
+    Adds the counts, metrics and their confidence intervals (`<metric>_ci`) to
+    every row (one per subset). `ci` holds the metric_intervals options.
+    """
+    accuracy, precision, recall, f1 = metrics_from_counts(tp, tn, fp, fn)
+    intervals = metric_intervals(tp, tn, fp, fn, **(ci or {})) if len(rows) else {}
+    for k, row in enumerate(rows):
+        row.update({
+            "total": int(tp[k] + tn[k] + fp[k] + fn[k]),
+            "tp": int(tp[k]), "tn": int(tn[k]), "fp": int(fp[k]), "fn": int(fn[k]),
+            "accuracy": float(accuracy[k]), "precision": float(precision[k]),
+            "recall": float(recall[k]), "f1": float(f1[k]),
+        })
+        for name, (low, high) in intervals.items():
+            row[f"{name}_ci"] = [float(low[k]), float(high[k])]
+    return rows
+
+
+def local_metrics_table(counts, ci=None):
+    """
+    Rows of the local pre-check tier (group LOCAL): the fixed subsets, scored on the
+    verdicts the pre-validation gave without an API call. Empty subsets are left out.
+    """
+    rows, masks = [], np.zeros((len(SUBSETS), len(SOURCE_NAMES)), dtype=np.int64)
+    for k, (group, label, sources) in enumerate(SUBSETS):
+        rows.append({"group": "LOCAL", "label": f"LOCAL PRE-CHECK: {label}", "country": None})
+        masks[k, [SOURCE_CODES[s] for s in sources]] = 1
+    # (subsets, truth, prediction)
+    per_subset = np.einsum("ka,aij->kij", masks, counts.sum(axis=1))
+    keep = np.flatnonzero(per_subset.sum(axis=(1, 2)) > 0)
+    rows, per_subset = [rows[k] for k in keep], per_subset[keep]
+    return _fill_rows(rows, per_subset[:, 1, 1], per_subset[:, 0, 0], per_subset[:, 0, 1], per_subset[:, 1, 0], ci)
+
+
+def metrics_table(counts, index, ci=None):
+    """Builds the metrics table (a list of dicts, one per subset) from confusion counts."""
+    rows, masks = _subset_masks(index)
+
+    # (subsets, truth, prediction)
+    per_subset = np.einsum("kac,acij->kij", masks, counts)
+    return _fill_rows(rows, per_subset[:, 1, 1], per_subset[:, 0, 0], per_subset[:, 0, 1], per_subset[:, 1, 0], ci)
+
+
+def domain_metrics_table(domains, counts, top=TOP_DOMAINS, ci=None):
+    """Metrics rows for the `top` most frequent email domains; `counts` is an int array (domains, truth, prediction)."""
+    if not len(domains):
+        return []
+    totals = counts.sum(axis=(1, 2))
+    # only the domains that can make the top are sorted (by count, then name)
+    cutoff = np.partition(totals, -top)[-top] if len(totals) > top else 0
+    candidates = np.flatnonzero(totals >= cutoff).tolist()
+    chosen = sorted(candidates, key=lambda k: (-int(totals[k]), domains[k]))[:top]
+    per_domain = counts[chosen]
+    rows = []
+    for k, cell in zip(chosen, per_domain):
+        real, fake = int(cell[1].sum()), int(cell[0].sum())
+        d = domains[k]
+        rows.append({"group": "DOMAIN", "label": f"Email: {d} ({real} Real, {fake} Fake)", "country": None, "domain": d})
+    return _fill_rows(rows, per_domain[:, 1, 1], per_domain[:, 0, 0], per_domain[:, 0, 1], per_domain[:, 1, 0], ci)
+
+
+def compute_metrics(results, index, ci=None):
+    """
+    Scores all subsets and countries at once.
+    Tags every result once, fills every confusion matrix with vectorized passes
+    and returns the metrics table (a list of dicts, one per subset).
+    """
+    accumulator = MetricsAccumulator(index.countries[:-1])
+    accumulator.add(results, index)
+    return accumulator.table(ci)
+
+
+class MetricsAccumulator:
+    """
+    Running confusion counts for results scored chunk by chunk (streaming mode).
+    Each chunk comes with its own LabelIndex, so memory stays bounded by the chunk size.
+    Verdicts of the local pre-check (rows with LocalCheck) are counted apart in
+    local_counts, so the other subsets score Loqate's verdicts only.
+    """
+    def __init__(self, countries):
+        self.countries = list(countries) + ["Unknown"]
+        self.country_codes = {c: i for i, c in enumerate(self.countries)}
+        self.input_counts = np.zeros((len(SOURCE_NAMES), len(self.countries)), dtype=np.int64)
+        self.counts = np.zeros((len(SOURCE_NAMES), len(self.countries), 2, 2), dtype=np.int64)
+        self.local_counts = np.zeros_like(self.counts)
+        # per-domain counts: names, name -> row, rows (grown by doubling)
+        self.domains = []
+        self._domain_codes = {}
+        self._domain_cells = np.zeros((0, 2, 2), dtype=np.int64)
+
+    def _domain_rows(self, domains):
+        """
+        Row of every (normalized) domain in the per-domain counts, adding the new ones.
+        May grow (replace) _domain_cells, so index it only after this returns.
+        """
+        codes = self._domain_codes
+        new = [d for d, row in zip(domains, map(codes.get, domains)) if row is None]
+        if new:
+            new = list(dict.fromkeys(new))
+            codes.update(zip(new, range(len(self.domains), len(self.domains) + len(new))))
+            self.domains.extend(new)
+            if len(self.domains) > len(self._domain_cells):
+                grown = np.zeros((max(len(self.domains), 2 * len(self._domain_cells)), 2, 2), dtype=np.int64)
+                grown[:len(self._domain_cells)] = self._domain_cells
+                self._domain_cells = grown
+        return np.fromiter(map(codes.__getitem__, domains), dtype=np.int64, count=len(domains))
+
+    def _add_domain_counts(self, inputs, domains, src, pred):
+        """
+        Adds the confusion counts per email domain of a tagged chunk. Email rows are
+        those with an email source; each distinct domain is normalized and looked up once.
+        """
+        rows = np.flatnonzero(SOURCE_IS_EMAIL[src] & (src >= 0) & (pred >= 0)).tolist()
+        # the Domain field, or the part of the input after the "@" when it is missing
+        raw = [domain or str(value).rpartition("@")[2] for domain, value in
+               zip(map(domains.__getitem__, rows), map(inputs.__getitem__, rows))]
+        distinct = list(set(raw))
+        table = dict(zip(distinct, self._domain_rows(list(map(str.strip, map(str.lower, map(str, distinct))))).tolist()))
+        codes = np.fromiter(map(table.__getitem__, raw), dtype=np.int64, count=len(raw))
+        cell = (codes * 2 + SOURCE_IS_REAL[src[rows]]) * 2 + pred[rows]
+        counts = np.bincount(cell, minlength=len(self.domains) * 4).reshape(-1, 2, 2)
+        self._domain_cells[:len(self.domains)] += counts
+
+    def add(self, results, index):
+        """
+        Scores results (a list or any iterable, e.g. a ResultJournal); `index` labels
+        their inputs (same countries). Rows are read column by column, TAG_CHUNK at a time.
+        """
+        rows = iter(results)
+        while True:
+            chunk = list(islice(rows, TAG_CHUNK))
+            if not chunk:
+                break
+            inputs, verdicts, domains, checks = _columns(chunk, "Input", "IsValid", "Domain", "LocalCheck")
+            src, ctry, pred = index.tag_columns(inputs, verdicts)
+            if any(checks):
+                local = np.fromiter(map(bool, checks), dtype=bool, count=len(checks))
+                self.local_counts += confusion_counts(np.where(local, src, -1), ctry, pred, len(self.countries))
+                src = np.where(local, -1, src)
+            self.counts += confusion_counts(src, ctry, pred, len(self.countries))
+            self._add_domain_counts(inputs, domains, src, pred)
+        self.input_counts += index.input_counts
+
+    def table(self, ci=None):
+        """Metrics table; `ci` holds the metric_intervals options (method, resamples, confidence)."""
+        domain_rows = domain_metrics_table(self.domains, self._domain_cells[:len(self.domains)], ci=ci)
+        return metrics_table(self.counts, self, ci) + local_metrics_table(self.local_counts, ci) + domain_rows
+
+    def merge(self, other):
+        """Adds the counts of another accumulator (e.g. another shard of the same run). Returns self."""
+        if other.countries != self.countries:
+            raise ValueError("Cannot merge metrics states with different country lists")
+        self.counts += other.counts
+        self.local_counts += other.local_counts
+        self.input_counts += other.input_counts
+        rows = self._domain_rows(other.domains)
+        self._domain_cells[rows] += other._domain_cells[:len(other.domains)]
+        return self
+
+    # mergeable state: raw counts, not ratios, so shards can simply be summed
+    def to_dict(self):
+        return {
+            "sources": SOURCE_NAMES,
+            "countries": self.countries[:-1],
+            "input_counts": self.input_counts.tolist(),
+            "counts": self.counts.tolist(),
+            "local_counts": self.local_counts.tolist(),
+            "domain_counts": dict(zip(self.domains, self._domain_cells[:len(self.domains)].tolist())),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data["sources"] != SOURCE_NAMES:
+            raise ValueError("Metrics state was saved with a different source list")
+        accumulator = cls(data["countries"])
+        accumulator.input_counts += np.array(data["input_counts"], dtype=np.int64)
+        accumulator.counts += np.array(data["counts"], dtype=np.int64)
+        if "local_counts" in data:
+            # states saved before the local tier was split off have none
+            accumulator.local_counts += np.array(data["local_counts"], dtype=np.int64)
+        domains = data["domain_counts"]
+        if domains:
+            cells = np.array(list(domains.values()), dtype=np.int64).reshape(-1, 2, 2)
+            rows = accumulator._domain_rows(list(domains))
+            accumulator._domain_cells[rows] += cells
+        return accumulator
+
+    def save(self, filename, results=None):
+        """Saves the state; `results` names the results files the run wrote next to it."""
+        data = self.to_dict()
+        if results is not None:
+            data["results"] = [os.path.basename(str(path)) for path in results]
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        logger.info(f"[File] Metrics state saved to {filename}")
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
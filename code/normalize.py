@@ -0,0 +1,57 @@
+"""
+Canonical identities for inputs, so every unique email / phone is verified once
+and the result is fanned back out to every input row that maps to it.
+
+- phones: E.164 ("+" and digits only; a leading "00" counts as "+")
+- emails: lower-cased, with the domain in its IDNA (ASCII) form
+"""
+import re
+
+from log_setup import get_logger
+
+logger = get_logger("normalize")
+
+_PHONE_SEPARATORS = re.compile(r"[\s\-(). /]")
+
+
+def normalize_phone(value):
+    """Returns the E.164 form of a phone; numbers without an international prefix keep only their digits."""
+    phone = _PHONE_SEPARATORS.sub("", str(value))
+    if phone.startswith("00"):
+        phone = "+" + phone[2:]
+    return phone
+
+
+def normalize_email(value):
+    """Returns the lower-cased address with an IDNA (punycode) domain."""
+    email = str(value).strip().lower()
+    local, at, domain = email.rpartition("@")
+    if not at:
+        return email
+    try:
+        domain = domain.rstrip(".").encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return f"{local}@{domain}"
+
+
+def group_by_identity(inputs, normalize):
+    """
+    Groups inputs by canonical identity (hash-based, O(n)).
+    Returns a dict canonical -> list of the original inputs, in first-seen order.
+    """
+    groups = {}
+    for value in inputs:
+        groups.setdefault(normalize(value), []).append(value)
+    return groups
+
+
+def fan_out(record, originals):
+    """Yields one copy of `record` (a typed result, see records.py) per original input, with Input set to that original."""
+    for original in originals:
+        yield record.replace(Input=original)
+
+
+def log_dedup(kind, total, unique):
+    if unique < total:
+        logger.info(f"[Normalize] {total} {kind} -> {unique} unique ({total - unique} duplicates verified once).")
@@ -0,0 +1,74 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class NumberPool:
+    """
+    Persistent pool of scraped phone numbers (JSON on disk).
+    Keeps first-seen / last-seen timestamps, status (active/inactive) and country
+    for every number, plus the ETag / Last-Modified validators, numbers and links
+    of every scraped page so unchanged pages don't have to be downloaded again.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.numbers = {}
+        self.pages = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.numbers = data.get("numbers", {})
+            self.pages = data.get("pages", {})
+
+    def page(self, url):
+        return self.pages.get(url, {})
+
+    def update_page(self, url, etag=None, last_modified=None, numbers=None, links=None):
+        self.pages[url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "numbers": numbers or [],
+            "links": links or [],
+            "fetched": _now(),
+        }
+
+    def merge(self, numbers, status, classify):
+        """
+        Adds/refreshes numbers seen now. `classify` maps a list of numbers to their
+        countries in one call (see calling_codes.classify_numbers); only numbers new
+        to the pool are classified. Returns the number of new ones.
+        """
+        now = _now()
+        new = [n for n in dict.fromkeys(numbers) if n not in self.numbers]
+        for number, country in zip(new, classify(new)):
+            self.numbers[number] = {"first_seen": now, "country": country}
+        for number in numbers:
+            entry = self.numbers[number]
+            entry["last_seen"] = now
+            entry["status"] = status
+        return len(new)
+
+    def numbers_by_country(self, status="active", max_age_days=None):
+        """Returns {country: [numbers]} for a status, most recently seen first."""
+        cutoff = None
+        if max_age_days is not None:
+            cutoff = (datetime.now() - timedelta(days=max_age_days)).strftime("%Y-%m-%d %H:%M:%S")
+        entries = sorted(self.numbers.items(), key=lambda x: x[1]["last_seen"], reverse=True)
+        result = {}
+        for number, entry in entries:
+            if entry.get("status") != status or entry.get("country") is None:
+                continue
+            if cutoff is not None and entry["last_seen"] < cutoff:
+                continue
+            result.setdefault(entry["country"], []).append(number)
+        return result
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"numbers": self.numbers, "pages": self.pages}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,357 @@
+"""
+Typed result records and streaming output writers.
+
+EmailResult / PhoneResult are __slots__ classes with a fixed field set, so a
+record costs a fraction of a dict and every output has a known schema up front.
+They keep a small dict-like interface (get, [], keys) so code written for the
+old dict records keeps working, and to_dict() gives the plain JSON form.
+
+Writers stream records to CSV, JSONL, JSON and - if pyarrow is
+installed - the columnar Parquet and Arrow IPC formats, in bounded batches.
+"""
+import csv
+import json
+import os
+from dataclasses import make_dataclass
+from itertools import chain
+from json.encoder import encode_basestring
+from operator import attrgetter
+
+from log_setup import get_logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for the columnar formats
+    pa = pa_ipc = pq = None
+
+logger = get_logger("records")
+
+EMAIL_FIELDS = ("Type", "Input", "Status", "IsValid", "Account", "Domain", "IsDisposable", "IsSystemMailbox")
+PHONE_FIELDS = (
+    "Type", "Input", "RequestProcessed", "IsValid", "NetworkCode", "NetworkName",
+    "NetworkCountry", "NationalFormat", "CountryPrefix", "NumberType",
+)
+# fields set on some records only (omitted from the JSON form when unset)
+OPTIONAL_FIELDS = ("GroundTruth", "LocalCheck", "DomainLevel")
+
+# output columns: the old CSV order (Type, Input, GroundTruth, Status, IsValid), then the rest sorted
+_LEADING = ["Type", "Input", "GroundTruth", "Status", "IsValid"]
+RESULT_FIELDS = tuple(_LEADING + sorted(set(EMAIL_FIELDS + PHONE_FIELDS + OPTIONAL_FIELDS) - set(_LEADING)))
+_BOOL_FIELDS = ("IsDisposable", "IsSystemMailbox", "RequestProcessed", "DomainLevel")
+
+_BOOL_VALUES = {"True": True, "False": False, "true": True, "false": False, "": None}
+
+# one attribute fetch for a whole CSV / columnar row
+_row_values = attrgetter(*RESULT_FIELDS)
+# one encoder for every JSON output: dumps() with options builds a new one per call
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+_JSON_CONSTANTS = {None: "null", True: "true", False: "false"}
+
+
+def _json_value(value):
+    if value.__class__ is str:
+        return encode_basestring(value)
+    if value is None or value is True or value is False:
+        return _JSON_CONSTANTS[value]
+    return _encode_json(value)
+
+
+def _json_template(fields):
+    """'{"A": %s, "B": %s}': the JSON form of a record with its values left to fill in."""
+    return "{" + ", ".join(f"{_encode_json(f)}: %s" for f in fields) + "}"
+
+
+def _set_type(self):
+    self.Type = self.TYPE
+
+
+# the slots with a generated __init__ (every field as an optional keyword, or
+# positional in RESULT_FIELDS order): several times faster than a setattr loop
+_Slots = make_dataclass(
+    "_Slots", [(name, object, None) for name in RESULT_FIELDS],
+    namespace={"__post_init__": _set_type}, slots=True, repr=False, eq=False,
+)
+
+
+class _Record(_Slots):
+    """
+    Both record types share one slot layout (all output columns), so rows can be
+    read with a single attrgetter; FIELDS lists the keys of the type's JSON form.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    TYPE = None
+
+    # dict-like interface
+    def keys(self):
+        return list(self.to_dict())
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if isinstance(key, str) else None
+        return default if value is None else value
+
+    def to_dict(self):
+        """The plain JSON form (optional fields only when set)."""
+        d = dict(zip(self.FIELDS, self._values(self)))
+        for f, value in zip(OPTIONAL_FIELDS, _optional_values(self)):
+            if value is not None:
+                d[f] = value
+        return d
+
+    def replace(self, **changes):
+        """Returns a copy with some fields changed."""
+        copy = type(self).__new__(type(self))
+        for f in RESULT_FIELDS:
+            setattr(copy, f, getattr(self, f))
+        for f, value in changes.items():
+            setattr(copy, f, value)
+        return copy
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class EmailResult(_Record):
+    __slots__ = ()
+    FIELDS = EMAIL_FIELDS
+    TYPE = "Email"
+    _values = attrgetter(*EMAIL_FIELDS)
+    _template = _json_template(EMAIL_FIELDS)
+
+
+class PhoneResult(_Record):
+    __slots__ = ()
+    FIELDS = PHONE_FIELDS
+    TYPE = "Phone"
+    _values = attrgetter(*PHONE_FIELDS)
+    _template = _json_template(PHONE_FIELDS)
+
+
+_optional_values = attrgetter(*OPTIONAL_FIELDS)
+_NO_OPTIONALS = (None,) * len(OPTIONAL_FIELDS)
+
+
+def record_from_dict(data):
+    """Builds the typed record for a dict record (unknown keys are dropped)."""
+    if isinstance(data, _Record):
+        return data
+    cls = PhoneResult if data.get("Type") == "Phone" else EmailResult
+    # positional in RESULT_FIELDS order: one C-level lookup per field, no **kwargs
+    return cls(*map(data.get, RESULT_FIELDS))
+
+
+def _json_line(record):
+    """
+    The JSON form of a record on one line. Typed records are filled into their
+    type's template instead of going through a dict (same text as encoding to_dict()).
+    """
+    if not isinstance(record, _Record):
+        return _encode_json(record)
+    line = record._template % tuple(map(_json_value, record._values(record)))
+    optional = _optional_values(record)
+    if optional != _NO_OPTIONALS:
+        extra = "".join(f", {_encode_json(f)}: {_json_value(v)}" for f, v in zip(OPTIONAL_FIELDS, optional) if v is not None)
+        line = line[:-1] + extra + "}"
+    return line
+
+
+class ResultWriter:
+    """
+    Streams records to one file as they come: "csv", "jsonl", "json" (an array
+    with one compact record per line), "parquet" or "arrow".
+    Columnar formats are written in batches of `batch_size` rows, the text
+    formats in one write per `line_batch` lines.
+    """
+    def __init__(self, path, fmt, batch_size=65536, line_batch=4096):
+        self.path = path
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.line_batch = line_batch
+        self.count = 0
+        self._batch = []
+        self._lines = []
+        self._flushed = 0
+        self._writer = None
+        if fmt in ("parquet", "arrow"):
+            if pa is None:
+                raise ImportError(f"pyarrow is required to write {fmt} files (pip install pyarrow)")
+            self._file = None
+        else:
+            self._file = open(path, "w", newline="" if fmt == "csv" else None, encoding="utf-8")
+            if fmt == "csv":
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(RESULT_FIELDS)
+            elif fmt == "json":
+                self._file.write("[")
+            elif fmt != "jsonl":
+                raise ValueError(f"Unknown output format: {fmt}")
+
+    def write(self, record):
+        fmt = self.fmt
+        if fmt == "csv":
+            # csv writes None as an empty field
+            self._lines.append(_row_values(record_from_dict(record)))
+        elif fmt in ("jsonl", "json"):
+            self._lines.append(_json_line(record))
+        else:
+            self._batch.append(record)
+            if len(self._batch) >= self.batch_size:
+                self._flush_batch()
+        if len(self._lines) >= self.line_batch:
+            self._flush_lines()
+        self.count += 1
+
+    def _flush_lines(self):
+        if not self._lines:
+            return
+        if self.fmt == "csv":
+            self._writer.writerows(self._lines)
+        elif self.fmt == "jsonl":
+            self._file.write("\n".join(self._lines) + "\n")
+        else:
+            self._file.write((",\n" if self._flushed else "\n") + ",\n".join(self._lines))
+        self._flushed += len(self._lines)
+        self._lines = []
+
+    def _flush_batch(self):
+        if not self._batch:
+            return
+        rows = [_row_values(record_from_dict(r)) for r in self._batch]
+        columns = {}
+        for f, values in zip(RESULT_FIELDS, zip(*rows)):
+            if f not in _BOOL_FIELDS:
+                values = [None if v is None else str(v) for v in values]
+            columns[f] = values
+        schema = pa.schema([(f, pa.bool_() if f in _BOOL_FIELDS else pa.string()) for f in RESULT_FIELDS])
+        table = pa.Table.from_pydict(columns, schema=schema)
+        if self._writer is None:
+            if self.fmt == "parquet":
+                self._writer = pq.ParquetWriter(self.path, schema)
+            else:
+                self._writer = pa_ipc.new_file(self.path, schema)
+        self._writer.write_table(table)
+        self._batch = []
+
+    def close(self):
+        if self.fmt in ("parquet", "arrow"):
+            self._flush_batch()
+            if self._writer is not None:
+                self._writer.close()
+            return
+        self._flush_lines()
+        if self.fmt == "json":
+            self._file.write("\n]")
+        self._file.close()
+
+
+def write_results(results, filename, formats=("json", "csv")):
+    """
+    Writes the records to every format in one streaming pass.
+    Files are named after `filename` with the format's extension. Returns the paths written.
+    """
+    base = os.path.splitext(filename)[0]
+    extensions = {"json": ".json", "csv": ".csv", "jsonl": ".jsonl", "parquet": ".parquet", "arrow": ".arrow"}
+    writers = [ResultWriter(f"{base}{extensions[fmt]}", fmt) for fmt in formats]
+    try:
+        for record in results:
+            for writer in writers:
+                writer.write(record)
+    finally:
+        for writer in writers:
+            writer.close()
+    for writer in writers:
+        logger.info(f"[File] Results saved to {writer.path}")
+    return [writer.path for writer in writers]
+
+
+def _csv_records(path):
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if tuple(header) != RESULT_FIELDS:
+            # files with another column set go through DictReader
+            for row in csv.DictReader(f, fieldnames=header):
+                yield record_from_dict({k: _BOOL_VALUES.get(v, v) if k in _BOOL_FIELDS else (v if v != "" else None) for k, v in row.items()})
+            return
+        bools = [RESULT_FIELDS.index(name) for name in _BOOL_FIELDS]
+        for values in reader:
+            values = [v or None for v in values]
+            for i in bools:
+                values[i] = _BOOL_VALUES.get(values[i], values[i])
+            yield (PhoneResult if values[0] == "Phone" else EmailResult)(*values)
+
+
+def _decode_lines(lines, batch_size=10000):
+    """Decodes JSON object lines in batches: one json.loads per batch instead of per line."""
+    batch = []
+    for line in lines:
+        line = line.strip().rstrip(",")
+        if not line or line == "]":
+            continue
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield from json.loads(f"[{','.join(batch)}]")
+            batch = []
+    if batch:
+        yield from json.loads(f"[{','.join(batch)}]")
+
+
+def _json_rows(path):
+    """Streams the rows of a JSON array written by ResultWriter; other layouts are loaded whole."""
+    with open(path, "r", encoding="utf-8") as f:
+        if f.readline().strip() == "[":
+            line = f.readline().strip()
+            if line == "]":
+                return
+            if line.startswith("{") and line.rstrip(",").endswith("}"):
+                yield from _decode_lines(chain([line], f))
+                return
+        f.seek(0)
+        yield from json.load(f)
+
+
+def read_results(path):
+    """Streams typed records back from a .jsonl, .csv, .json, .parquet or .arrow results file."""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in (".parquet", ".arrow"):
+        if pa is None:
+            raise ImportError(f"pyarrow is required to read {ext} files (pip install pyarrow)")
+        if ext == ".parquet":
+            batches = pq.ParquetFile(path).iter_batches()
+        else:
+            reader = pa_ipc.open_file(path)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        for batch in batches:
+            for row in batch.to_pylist():
+                yield record_from_dict(row)
+    elif ext == ".csv":
+        yield from _csv_records(path)
+    elif ext == ".json":
+        for row in _json_rows(path):
+            yield record_from_dict(row)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for row in _decode_lines(f):
+                yield record_from_dict(row)
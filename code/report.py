@@ -0,0 +1,48 @@
+"""
+Printing and loading of saved metrics tables. Free of numpy and the
+verification stack, so the `report` command starts fast.
+"""
+import json
+
+from log_setup import get_logger
+
+logger = get_logger("metrics")
+
+
+def print_metrics_table(table):
+    """Prints the metrics table, one block per subset."""
+    headers = {
+        "EMAIL": "\n--- EMAIL METRICS ---",
+        "COUNTRY": "\n--- PHONE METRICS PER COUNTRY ---",
+        "LOCAL": "\n--- LOCAL PRE-CHECK METRICS (verdicts not from Loqate) ---",
+        "DOMAIN": "\n--- EMAIL METRICS PER DOMAIN ---",
+    }
+    printed = set()
+    for row in table:
+        header = headers.get(row["group"])
+        if header and row["group"] not in printed:
+            logger.info(header)
+            printed.add(row["group"])
+        if row["total"] == 0:
+            continue
+        logger.info(f"\n--- Metrics: {row['label']} ---")
+        logger.info(f"Total: {row['total']} | TP: {row['tp']} | TN: {row['tn']} | FP: {row['fp']} | FN: {row['fn']}")
+        logger.info(f"Accuracy:  {row['accuracy']:.2%} | Precision: {row['precision']:.2f} | Recall: {row['recall']:.2f} | F1: {row['f1']:.2f}")
+        if "accuracy_ci" in row:
+            # tables saved before the intervals were added have none
+            ci = {name: row[f"{name}_ci"] for name in ("accuracy", "precision", "recall", "f1")}
+            logger.info(
+                f"CI:        [{ci['accuracy'][0]:.2%}, {ci['accuracy'][1]:.2%}] | [{ci['precision'][0]:.2f}, {ci['precision'][1]:.2f}]"
+                f" | [{ci['recall'][0]:.2f}, {ci['recall'][1]:.2f}] | [{ci['f1'][0]:.2f}, {ci['f1'][1]:.2f}]"
+            )
+
+
+def save_metrics_table(table, filename):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(table, f, indent=4)
+    logger.info(f"[File] Metrics saved to {filename}")
+
+
+def load_metrics_table(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
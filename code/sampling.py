@@ -0,0 +1,247 @@
+"""
+Adaptive stratified sampling: verifies in rounds instead of a fixed count per
+country, and spends the next lookups where the metrics are least certain.
+
+Every (country, source) pair is a stratum. Its ground truth is fixed, so its
+accuracy is a binomial proportion with a running Wilson interval. Each round
+goes to the strata with the widest intervals, and sampling stops once every
+interval is within the target half-width, the pools run out, or the credit
+budget is spent.
+"""
+import json
+from statistics import NormalDist
+
+import numpy as np
+
+from log_setup import get_logger
+from metrics import LabelIndex, SOURCE_IS_REAL, SOURCE_NAMES, wilson_interval
+
+logger = get_logger("sampling")
+
+_PREDICTIONS = {"yes": True, "true": True, "no": False, "false": False, "maybe": False}
+
+
+def _normalize(value):
+    return str(value).lower().strip()
+
+
+def strata_from_labels(inputs, labels):
+    """Groups inputs by their (country, source) label; unlabelled and duplicate inputs are dropped."""
+    strata, seen = {}, set()
+    for value in inputs:
+        key = _normalize(value)
+        label = labels.label(key)
+        if label is None or key in seen:
+            continue
+        seen.add(key)
+        src, ctry = label
+        strata.setdefault((labels.countries[ctry], SOURCE_NAMES[src]), []).append(value)
+    return strata
+
+
+class AdaptiveSampler:
+    """
+    Draws inputs from per-stratum pools (in random order, without replacement)
+    and tracks how many of each stratum's verdicts matched its ground truth.
+    """
+    def __init__(self, strata, target=0.05, confidence=0.95, min_per_stratum=5, seed=None):
+        rng = np.random.default_rng(seed)
+        self.keys = list(strata)
+        self.pools = [list(rng.permutation(np.array(strata[k], dtype=object))) for k in self.keys]
+        self.target = target
+        self.z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.min_per_stratum = min_per_stratum
+        self.truth = np.array([SOURCE_IS_REAL[SOURCE_NAMES.index(source)] for _, source in self.keys], dtype=bool)
+        self.n = np.zeros(len(self.keys), dtype=np.int64)
+        self.correct = np.zeros(len(self.keys), dtype=np.int64)
+        self.drawn = np.zeros(len(self.keys), dtype=np.int64)
+        self._stratum = {_normalize(v): i for i, k in enumerate(self.keys) for v in strata[k]}
+        self._drawn_inputs = []
+
+    def record(self, row):
+        """Counts one verified record (ignored if its input is not in a stratum)."""
+        i = self._stratum.get(_normalize(row.get("Input", "")))
+        pred = _PREDICTIONS.get(str(row.get("IsValid", "")).lower())
+        if i is None or pred is None:
+            return
+        self.n[i] += 1
+        self.correct[i] += pred == self.truth[i]
+
+    def resume(self, rows):
+        """Counts the records of an earlier (interrupted) run and takes their inputs out of the pools."""
+        done = {}
+        for row in rows:
+            self.record(row)
+            key = _normalize(row.get("Input", ""))
+            if key in self._stratum:
+                done[key] = row.get("Input", "")
+        for i, pool in enumerate(self.pools):
+            kept = [v for v in pool if _normalize(v) not in done]
+            self.drawn[i] += len(pool) - len(kept)
+            self.pools[i] = kept
+        self._drawn_inputs.extend((v, self._stratum[k]) for k, v in done.items())
+        return len(done)
+
+    def intervals(self):
+        return wilson_interval(self.correct, self.n, self.z)
+
+    def half_widths(self):
+        low, high = self.intervals()
+        return (high - low) / 2
+
+    def remaining(self):
+        return np.array([len(p) for p in self.pools], dtype=np.int64)
+
+    def open_strata(self):
+        """Strata that still need samples and have inputs left."""
+        return (self.half_widths() > self.target) & (self.remaining() > 0)
+
+    def next_round(self, size):
+        """
+        Picks the inputs of the next round: strata below `min_per_stratum` first,
+        the rest of the round split over the open strata in proportion to their
+        interval width. Never more than `size` inputs; returns a list of inputs
+        (empty when done).
+        """
+        remaining = self.remaining()
+        open_ = self.open_strata()
+        take = np.minimum(np.maximum(self.min_per_stratum - self.drawn, 0), remaining) * open_
+        if take.sum() > size:
+            take = self._spread(take, size)
+        budget = size - int(take.sum())
+        if budget > 0 and open_.any():
+            widths = np.where(open_, self.half_widths(), 0.0)
+            extra = np.floor(budget * widths / widths.sum()).astype(np.int64)
+            # rounding leftovers go to the widest strata
+            for i in np.argsort(-widths)[:budget - int(extra.sum())]:
+                extra[i] += open_[i]
+            take = np.minimum(take + extra, remaining)
+
+        batch = []
+        for i in np.flatnonzero(take):
+            k = int(take[i])
+            batch.extend(self.pools[i][:k])
+            self.pools[i] = self.pools[i][k:]
+            self.drawn[i] += k
+        self._drawn_inputs.extend((v, i) for v in batch for i in [self._stratum[_normalize(v)]])
+        return batch
+
+    def put_back(self, inputs):
+        """Returns the last drawn inputs (not verified after all) to their pools."""
+        if not inputs:
+            return
+        del self._drawn_inputs[-len(inputs):]
+        for value in reversed(inputs):
+            i = self._stratum[_normalize(value)]
+            self.pools[i].insert(0, value)
+            self.drawn[i] -= 1
+
+    def _spread(self, quota, size):
+        """
+        Fits the per-stratum quotas into a round of `size`: every stratum gets the
+        same number (up to its quota), the last few go to the strata furthest from
+        their quota, then to the widest intervals.
+        """
+        level = 0
+        while level < quota.max() and np.minimum(quota, level + 1).sum() <= size:
+            level += 1
+        take = np.minimum(quota, level)
+        left = size - int(take.sum())
+        if left > 0:
+            candidates = np.flatnonzero(quota > level)
+            order = np.lexsort((-self.half_widths()[candidates], -quota[candidates]))
+            take[candidates[order[:left]]] += 1
+        return take
+
+    def label_index(self, countries):
+        """LabelIndex of the inputs drawn so far (for the metrics of the sampled run)."""
+        index = LabelIndex(countries)
+        for value, i in self._drawn_inputs:
+            country, source = self.keys[i]
+            index.add([value], source, country)
+        return index
+
+    def summary(self):
+        """One dict per stratum: samples, accuracy and its interval."""
+        low, high = self.intervals()
+        rows = []
+        for i, (country, source) in enumerate(self.keys):
+            rows.append({
+                "country": country, "source": source, "samples": int(self.n[i]),
+                "accuracy": float(self.correct[i] / self.n[i]) if self.n[i] else None,
+                "ci_low": float(low[i]), "ci_high": float(high[i]),
+                "remaining": len(self.pools[i]),
+            })
+        return rows
+
+    def save(self, filename):
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump({"target": self.target, "strata": self.summary()}, f, indent=4)
+        logger.info(f"[File] Strata intervals saved to {filename}")
+
+    def print_summary(self):
+        logger.info("\n--- Adaptive sampling ---")
+        for row in sorted(self.summary(), key=lambda r: (r["country"], r["source"])):
+            accuracy = "n/a" if row["accuracy"] is None else f"{row['accuracy']:.2%}"
+            logger.info(f"   {row['country']:<8}{row['source']:<18} n={row['samples']:<6} accuracy {accuracy} [{row['ci_low']:.2%}, {row['ci_high']:.2%}]")
+
+
+def run_adaptive(sampler, verify, round_size=200, credit_budget=None, credits=None, reserve=0.1, submit_size=100, on_low_budget=None):
+    """
+    Verifies in rounds until every stratum's interval is within the target, the
+    pools are empty or `credit_budget` (as read from `credits()`) is spent.
+    `verify(inputs)` verifies some inputs and feeds the results to sampler.record.
+
+    Hedged duplicates and retries cost credits too, so with a budget a round only
+    takes the inputs that fit in what is left with `reserve` (a share of them)
+    held back, and is submitted `submit_size` inputs at a time with the budget
+    checked again before each. `on_low_budget()` is called once when what is left
+    no longer covers a full round (e.g. to turn hedging off).
+    """
+    start = credits() if credits else 0
+
+    def spent():
+        return credits() - start if credits else 0
+
+    def affordable():
+        """Inputs that fit in the budget left (None without a budget)."""
+        if credit_budget is None:
+            return None
+        return max(0, int((credit_budget - spent()) / (1 + reserve)))
+
+    rounds, low = 0, False
+    while True:
+        size = affordable()
+        if size is not None and size < round_size and not low:
+            low = True
+            if on_low_budget is not None:
+                on_low_budget()
+        if size == 0:
+            logger.info(f"[Adaptive] Credit budget reached ({spent()}/{credit_budget}).")
+            break
+        batch = sampler.next_round(round_size if size is None else min(round_size, size))
+        if not batch:
+            reason = "target precision reached" if not (sampler.half_widths() > sampler.target).any() else "inputs exhausted"
+            logger.info(f"[Adaptive] Done after {rounds} rounds: {reason}.")
+            break
+        if credit_budget is None:
+            verify(batch)
+            verified = len(batch)
+        else:
+            verified = 0
+            while verified < len(batch):
+                take = min(submit_size, affordable(), len(batch) - verified)
+                if take == 0:
+                    break
+                verify(batch[verified:verified + take])
+                verified += take
+            sampler.put_back(batch[verified:])
+        rounds += 1
+        widths = sampler.half_widths()
+        widest = int(np.argmax(widths))
+        done = int((widths <= sampler.target).sum())
+        logger.info(
+            f"[Adaptive] Round {rounds}: {verified} inputs | {done}/{len(widths)} strata within ±{sampler.target:.1%} | "
+            f"widest ±{widths[widest]:.1%} ({'/'.join(sampler.keys[widest])}) | credits {spent() if credits else 'n/a'}"
+        )
+    return sampler
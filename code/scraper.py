@@ -0,0 +1,165 @@
+import codecs
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urljoin, urlparse
+
+from calling_codes import classify_numbers
+from http_client import get_session
+from instrumentation import INSTRUMENTATION
+from log_setup import get_logger
+
+logger = get_logger("scraper")
+
+# headers to mimic a real Chrome browser to bypass 403s
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Referer': 'https://www.google.com/',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+}
+
+# look for patterns like +123456789 or +1 234 567 89 (optional spaces/dashes between digits)
+NUMBER_PATTERN = re.compile(r'\+(\d[\d\s-]{7,16})')
+LINK_PATTERN = re.compile(r'href=["\']([^"\'#]+)["\']', re.IGNORECASE)
+# listing subpages worth following: pagination and per-country listings
+SUBPAGE_PATTERN = re.compile(r'/page/\d+/?$|[?&]page=\d+|/(?:country|countries)/[\w-]+/?$', re.IGNORECASE)
+
+# characters kept between chunks so matches spanning a chunk border are not cut
+_CARRY = 256
+
+
+class _StreamParser:
+    """Extracts numbers and links from HTML as it streams in, chunk by chunk."""
+    def __init__(self):
+        self.buffer = ""
+        self.numbers = []
+        self.links = []
+
+    def feed(self, text, final=False):
+        self.buffer += text
+        patterns = ((NUMBER_PATTERN, self.numbers), (LINK_PATTERN, self.links))
+
+        # cut the buffer before the (possibly incomplete) tail, but never inside a match
+        cut = len(self.buffer) if final else max(0, len(self.buffer) - _CARRY)
+        moved = True
+        while moved and not final:
+            moved = False
+            for pattern, _ in patterns:
+                for m in pattern.finditer(self.buffer):
+                    if m.start() < cut < m.end():
+                        cut = m.start()
+                        moved = True
+
+        for pattern, out in patterns:
+            for m in pattern.finditer(self.buffer, 0, cut):
+                out.append(m.group(1))
+        self.buffer = self.buffer[cut:]
+
+    def close(self):
+        self.feed("", final=True)
+
+
+def _fetch_page(session, url, validators, timeout):
+    """
+    Conditional GET of one page, parsed while it streams in.
+    Returns (status_code, numbers, links, etag, last_modified).
+    """
+    headers = dict(BROWSER_HEADERS)
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    start = time.perf_counter()
+    try:
+        response = session.get(url, headers=headers, timeout=timeout, stream=True)
+    except Exception:
+        INSTRUMENTATION.observe("fetch_real_active_numbers", time.perf_counter() - start, items=0, error=True)
+        raise
+
+    with response:
+        if response.status_code != 200:
+            INSTRUMENTATION.observe(
+                "fetch_real_active_numbers", time.perf_counter() - start,
+                items=0, error=response.status_code != 304
+            )
+            return response.status_code, [], [], None, None
+
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        parser = _StreamParser()
+        for chunk in response.iter_content(chunk_size=16384):
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+
+        numbers = ["+" + re.sub(r"[\s-]", "", m) for m in parser.numbers]
+        INSTRUMENTATION.observe("fetch_real_active_numbers", time.perf_counter() - start, items=len(numbers))
+        host = urlparse(url).netloc
+        links = []
+        for href in parser.links:
+            link = urljoin(url, href)
+            if urlparse(link).netloc == host and SUBPAGE_PATTERN.search(link) and link not in links:
+                links.append(link)
+        return 200, numbers, links, response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+
+def scrape_sources(sources, pool, concurrency=8, max_pages=50, timeout=15):
+    """
+    Scrapes the source pages and their paginated / per-country subpages concurrently.
+    `sources` maps seed URL -> status ("active"/"inactive"); subpages inherit it.
+    Unchanged pages (304) cost nothing: their numbers and links come from the pool.
+    All numbers are merged into the pool. Returns the number of new numbers.
+    """
+    session = get_session(pool_size=concurrency)
+    queued = set(sources)
+    frontier = list(sources.items())
+    fetched = unchanged = new_total = 0
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while frontier or in_flight:
+            while frontier and len(in_flight) < concurrency:
+                url, status = frontier.pop(0)
+                future = executor.submit(_fetch_page, session, url, pool.page(url), timeout)
+                in_flight[future] = (url, status)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, status = in_flight.pop(future)
+                try:
+                    code, numbers, links, etag, last_modified = future.result()
+                except Exception as e:
+                    logger.warning(f"   [Warning] Error scraping {url}: {e}")
+                    continue
+
+                if code == 304:
+                    unchanged += 1
+                    cached = pool.page(url)
+                    numbers, links = cached.get("numbers", []), cached.get("links", [])
+                    pool.update_page(url, cached.get("etag"), cached.get("last_modified"), numbers, links)
+                elif code == 200:
+                    fetched += 1
+                    pool.update_page(url, etag, last_modified, numbers, links)
+                else:
+                    logger.warning(f"   [Warning] Status {code} from {url}")
+                    continue
+
+                new = pool.merge(numbers, status, classify_numbers)
+                new_total += new
+                logger.debug(f"   [Scraper] {url}: {len(numbers)} numbers ({new} new){' [unchanged]' if code == 304 else ''}")
+
+                for link in links:
+                    if link not in queued and len(queued) < max_pages * len(sources):
+                        queued.add(link)
+                        frontier.append((link, status))
+
+    logger.info(f"   [Scraper] Downloaded {fetched} pages, {unchanged} unchanged (304). {new_total} new numbers, {len(pool.numbers)} in pool.")
+    pool.save()
+    return new_total
@@ -0,0 +1,168 @@
+"""
+Sharded runs: `--shard i/N` verifies a deterministic 1/N slice of the inputs,
+so one big run can be spread over several processes or hosts (each with its
+own API key if needed). Every shard writes its own results and a mergeable
+metrics state (raw confusion counts); `--merge` combines them into the final
+verification_results files and the full metrics report.
+"""
+import hashlib
+import json
+import re
+
+from log_setup import get_logger
+from metrics import MetricsAccumulator, print_metrics_table, save_metrics_table
+from normalize import normalize_email, normalize_phone
+from records import read_results, write_results
+
+logger = get_logger("shard")
+
+# shard result files are read back in this order of preference
+MERGE_FORMATS = (".jsonl", ".parquet", ".arrow", ".csv", ".json")
+# results files of one run are written in a single pass, so their mtimes are this close
+SAME_RUN_SECONDS = 60
+
+
+def parse_shard(value):
+    """Parses "i/N" (0 <= i < N) into (i, N)."""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", str(value))
+    if not match:
+        raise ValueError(f"Invalid shard '{value}', expected i/N (e.g. 0/4)")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{value}', i must be in 0..N-1")
+    return index, count
+
+
+def shard_of(value, count):
+    """
+    Shard (0..count-1) of an input. Hashes the canonical identity, so the same
+    contact lands in the same shard on every host and duplicates stay together.
+    """
+    value = str(value)
+    key = normalize_email(value) if "@" in value else normalize_phone(value).lower()
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def in_shard(value, shard):
+    """True if the input belongs to `shard` ((i, N), or None for an unsharded run)."""
+    return shard is None or shard_of(value, shard[1]) == shard[0]
+
+
+def filter_shard(values, shard):
+    return [v for v in values if in_shard(v, shard)]
+
+
+def shard_generated_data(gen_data, shard):
+    """Returns the generated/loaded inputs of one shard (same layout as gen_data)."""
+    if shard is None:
+        return gen_data
+    sharded = {}
+    for key, values in gen_data.items():
+        if isinstance(values, dict):
+            sharded[key] = {code: filter_shard(v, shard) for code, v in values.items()}
+        else:
+            sharded[key] = filter_shard(values, shard)
+    return sharded
+
+
+def shard_path(path, shard):
+    """data/x.json -> data/x.shard-0-of-4.json (unchanged for an unsharded run)."""
+    if shard is None:
+        return path
+    return path.with_name(f"{path.stem}.shard-{shard[0]}-of-{shard[1]}{path.suffix}")
+
+
+def state_path(metrics_path, shard=None):
+    """Path of the mergeable metrics state next to the metrics file."""
+    return shard_path(metrics_path.with_name(f"{metrics_path.stem}_state.json"), shard)
+
+
+def find_shards(metrics_path):
+    """
+    Finds the shard states of one sharded run. Returns (count, {index: path});
+    raises ValueError if there are none or they belong to runs with different N.
+    """
+    base = state_path(metrics_path)
+    pattern = re.compile(rf"{re.escape(base.stem)}\.shard-(\d+)-of-(\d+){re.escape(base.suffix)}$")
+    found = {}
+    for path in base.parent.iterdir():
+        match = pattern.match(path.name)
+        if match:
+            found.setdefault(int(match.group(2)), {})[int(match.group(1))] = path
+    if not found:
+        raise ValueError(f"No shard states found next to {base}")
+    if len(found) > 1:
+        raise ValueError(f"Shard states of different runs found ({', '.join(f'N={n}' for n in sorted(found))}), remove the stale ones")
+    count, states = found.popitem()
+    return count, states
+
+
+def recorded_results(metrics_path, shard=None):
+    """Names of the results files recorded in a run's metrics state (None if it has no record)."""
+    try:
+        with open(state_path(metrics_path, shard), "r", encoding="utf-8") as f:
+            return json.load(f).get("results")
+    except FileNotFoundError:
+        return None
+
+
+def find_results_file(out_path, shard=None, metrics_path=None):
+    """
+    Results file of a run (or shard). Prefers the files recorded in the run's
+    metrics state; without a record, takes the existing files, which must all be
+    from the same run. Returns None if there is none; raises ValueError if the
+    recorded files are gone or the files on disk belong to different runs.
+    """
+    recorded = recorded_results(metrics_path, shard) if metrics_path is not None else None
+    if recorded is not None:
+        paths = [shard_path(out_path, shard).with_name(name) for name in recorded]
+        existing = [p for p in paths if p.exists()]
+        if paths and not existing:
+            raise ValueError(f"Results files of the run ({', '.join(recorded)}) are missing next to {out_path}")
+    else:
+        existing = [p for p in (shard_path(out_path.with_suffix(ext), shard) for ext in MERGE_FORMATS) if p.exists()]
+        mtimes = [p.stat().st_mtime for p in existing]
+        if existing and max(mtimes) - min(mtimes) > SAME_RUN_SECONDS:
+            raise ValueError(
+                f"Results files of different runs found ({', '.join(p.name for p in existing)}), "
+                "pass the one to use or remove the stale ones"
+            )
+    existing.sort(key=lambda p: MERGE_FORMATS.index(p.suffix) if p.suffix in MERGE_FORMATS else len(MERGE_FORMATS))
+    return existing[0] if existing else None
+
+
+def merge_shards(out_path, metrics_path, formats=("json", "csv"), allow_partial=False, ci=None):
+    """
+    Merges the shards of a run: sums their metrics states into the full metrics
+    report and streams their result files into the final results files.
+    Returns the merged MetricsAccumulator.
+    """
+    count, states = find_shards(metrics_path)
+    missing = [i for i in range(count) if i not in states]
+    if missing:
+        message = f"Shards {', '.join(map(str, missing))} of {count} have no metrics state yet"
+        if not allow_partial:
+            raise ValueError(message)
+        logger.warning(f"[Warning] {message}, merging the others.")
+
+    accumulator = None
+    result_files = []
+    for i in sorted(states):
+        state = MetricsAccumulator.load(states[i])
+        accumulator = state if accumulator is None else accumulator.merge(state)
+        results_file = find_results_file(out_path, (i, count), metrics_path)
+        if results_file is None:
+            logger.warning(f"[Warning] Shard {i}/{count} has no results file, its records are left out.")
+        else:
+            result_files.append(results_file)
+    logger.info(f"[Merge] {len(states)} of {count} shards merged.")
+
+    table = accumulator.table(ci)
+    print_metrics_table(table)
+    save_metrics_table(table, metrics_path)
+
+    records = (record for path in result_files for record in read_results(path))
+    written = write_results(records, out_path, formats)
+    accumulator.save(state_path(metrics_path), written)
+    return accumulator
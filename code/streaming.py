@@ -0,0 +1,135 @@
+"""
+Streaming input mode: verifies contacts read from a CSV / JSONL file (or stdin)
+chunk by chunk, so memory use depends on the chunk size, not on the input size.
+
+Every row needs the contact (email or phone) and may carry a ground-truth
+column (real/fake, true/false, 1/0, yes/no, valid/invalid).
+"""
+import csv
+import json
+import sys
+from itertools import islice
+
+from calling_codes import detect_country
+from inputs import label_from_ground_truth
+from log_setup import get_logger
+from metrics import LabelIndex, MetricsAccumulator
+from utils import verify_emails_batch, verify_emails_by_domain, verify_phones_concurrent
+
+logger = get_logger("streaming")
+
+TRUTH_VALUES = {
+    "real": True, "true": True, "1": True, "yes": True, "valid": True,
+    "fake": False, "false": False, "0": False, "no": False, "invalid": False,
+}
+
+
+def _open_input(path):
+    if path == "-":
+        return sys.stdin, False
+    return open(path, "r", encoding="utf-8", newline=""), True
+
+
+def read_contacts(path, fmt=None, input_column="Input", truth_column="GroundTruth"):
+    """
+    Yields (contact, is_real) for every row of a CSV / JSONL file, or of stdin if path is "-".
+    `fmt` is inferred from the extension (.jsonl/.ndjson -> jsonl, otherwise csv).
+    is_real is None if the row has no recognised ground truth.
+    """
+    if fmt is None:
+        fmt = "jsonl" if str(path).lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+    f, owned = _open_input(path)
+    try:
+        if fmt == "jsonl":
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for n, row in enumerate(rows, start=1):
+            contact = str(row.get(input_column) or "").strip()
+            if not contact:
+                logger.warning(f"   [Warning] Row {n} has no '{input_column}' value, skipping.")
+                continue
+            truth = TRUTH_VALUES.get(str(row.get(truth_column, "")).lower().strip())
+            yield contact, truth
+    finally:
+        if owned:
+            f.close()
+
+
+def chunked(iterable, size):
+    """Yields lists of up to `size` items."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _label_chunk(chunk, countries):
+    """Builds the LabelIndex of one chunk. Returns (index, emails, phones)."""
+    index = LabelIndex(countries)
+    emails, phones = [], []
+    for contact, is_real in chunk:
+        if "@" in contact:
+            emails.append(contact)
+            source, country = ("input_real_email" if is_real else "input_fake_email"), "Unknown"
+        else:
+            phones.append(contact)
+            source, country = ("input_real_phone" if is_real else "input_fake_phone"), detect_country(contact)
+        if is_real is not None:
+            index.add([contact], source, country)
+    return index, emails, phones
+
+
+def verify_stream(contacts, countries, chunk_size=10000, cache=None, on_result=None,
+                  email_batches_in_flight=4, concurrency=8, unverified=None, prevalidator=None,
+                  domain_index=None, domain_samples=0, phone_options=None):
+    """
+    Verifies (contact, is_real) pairs chunk by chunk and scores them incrementally.
+    `on_result` is called with every tagged record (GroundTruth set) as it arrives.
+    With domain_samples > 0, emails are verified in domain-level mode (see verify_emails_by_domain).
+    Returns the MetricsAccumulator with the confusion counts of the whole stream.
+    """
+    accumulator = MetricsAccumulator(countries)
+    total = 0
+    for chunk in chunked(contacts, chunk_size):
+        index, emails, phones = _label_chunk(chunk, countries)
+        results = []
+
+        def record_result(row):
+            row['GroundTruth'] = index.ground_truth(row.get('Input', ''))
+            results.append(row)
+            if on_result is not None:
+                on_result(row)
+
+        email_kwargs = dict(
+            cache=cache, max_in_flight=email_batches_in_flight, unverified=unverified,
+            on_result=record_result, prevalidator=prevalidator
+        )
+        if domain_samples > 0:
+            verify_emails_by_domain(emails, domain_index, samples=domain_samples, **email_kwargs)
+        else:
+            verify_emails_batch(emails, domain_index=domain_index, **email_kwargs)
+        verify_phones_concurrent(
+            phones, concurrency=concurrency, cache=cache, on_result=record_result, prevalidator=prevalidator,
+            **(phone_options or {})
+        )
+        accumulator.add(results, index)
+        total += len(chunk)
+        logger.info(f"[Stream] {total} rows verified ({len(emails)} emails, {len(phones)} phones in this chunk).")
+    return accumulator
+
+
+def score_journaled(records, countries, chunk_size=10000):
+    """
+    Confusion counts of already journaled records (e.g. the rows of an interrupted
+    run on --resume), scored chunk by chunk and labelled from their GroundTruth.
+    """
+    accumulator = MetricsAccumulator(countries)
+    for chunk in chunked(records, chunk_size):
+        index = LabelIndex(countries)
+        label_from_ground_truth(index, chunk)
+        accumulator.add(chunk, index)
+    return accumulator
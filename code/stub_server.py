@@ -0,0 +1,250 @@
+"""
+Offline stand-in for Loqate, Mail.tm and the SMS listing pages.
+
+Run it standalone and point the pipeline at it through the endpoint
+environment variables read in constants.py:
+
+    python stub_server.py --port 8080 --latency_ms 50 --error_rate 0.01 --rate_limit_rate 0.02
+
+or start it in-process with start_stub_server() (see benchmark.py).
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EMAIL_BATCH_PATH = "/EmailValidation/Batch/Validate/v1.20/json3.ws"
+PHONE_INDIVIDUAL_PATH = "/PhoneNumberValidation/Interactive/Validate/v2.20/json3.ws"
+# batch counterpart of the phone endpoint (same items, "Phones" is comma-separated)
+PHONE_BATCH_PATH = "/PhoneNumberValidation/Batch/Validate/v1.00/json3.ws"
+SMS_ACTIVE_PATH = "/sms-source/"
+SMS_INACTIVE_PATH = "/sms-source/inactive-numbers/"
+MAILTM_PREFIX = "/mailtm"
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 20.0        # base latency per request
+    jitter_ms: float = 10.0         # uniform extra latency on top
+    error_rate: float = 0.0         # probability of a 500 response
+    rate_limit_rate: float = 0.0    # probability of a 429 response
+    retry_after: float = 0.1        # Retry-After sent with 429s (seconds)
+    valid_rate: float = 0.6         # share of inputs judged valid
+    unprocessed_rate: float = 0.0   # share of phones answered with RequestProcessed: False
+    sms_pages: int = 3              # paginated listing pages per SMS source
+    sms_numbers_per_page: int = 50
+    mailtm_domains: int = 3
+
+
+def _score(value):
+    """Deterministic pseudo-random number in [0, 1) for an input."""
+    digest = hashlib.sha1(str(value).lower().encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+    config = StubConfig()
+    rng = random.Random()
+
+    def log_message(self, *args):
+        pass
+
+    # --- helpers ---
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _simulate(self):
+        """Applies latency and injected failures. Returns True if a failure was sent."""
+        cfg = self.config
+        time.sleep((cfg.latency_ms + self.rng.uniform(0, cfg.jitter_ms)) / 1000)
+        roll = self.rng.random()
+        if roll < cfg.rate_limit_rate:
+            self._send(429, {"error": "rate limited"}, headers={"Retry-After": str(cfg.retry_after)})
+            return True
+        if roll < cfg.rate_limit_rate + cfg.error_rate:
+            self._send(500, {"error": "injected failure"})
+            return True
+        return False
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8") if length else ""
+
+    # --- routes ---
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == PHONE_INDIVIDUAL_PATH:
+            return self._phone(parse_qs(url.query))
+        if url.path == f"{MAILTM_PREFIX}/domains":
+            return self._domains()
+        if url.path.startswith(SMS_ACTIVE_PATH):
+            return self._sms_page(url)
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_body()
+        if url.path == EMAIL_BATCH_PATH:
+            return self._email_batch(parse_qs(body))
+        if url.path == PHONE_BATCH_PATH:
+            return self._phone_batch(parse_qs(body))
+        if url.path == f"{MAILTM_PREFIX}/accounts":
+            return self._account(json.loads(body or "{}"))
+        self._send(404, {"error": "not found"})
+
+    def _email_batch(self, params):
+        if self._simulate():
+            return
+        emails = [e for e in params.get("Emails", [""])[0].split(",") if e]
+        items = []
+        for email in emails:
+            score = _score(email)
+            account, _, domain = email.partition("@")
+            valid = "@" in email and score < self.config.valid_rate
+            items.append({
+                "EmailAddress": email,
+                "Status": "Valid" if valid else ("Unknown" if score > 0.95 else "Invalid"),
+                "Account": account,
+                "Domain": domain,
+                "IsDisposible": False,
+                "IsSystemMailbox": account in ("admin", "info", "support"),
+            })
+        self._send(200, {"Items": items})
+
+    def _phone(self, params):
+        if self._simulate():
+            return
+        self._send(200, {"Items": [self._phone_item(params.get("Phone", [""])[0])]})
+
+    def _phone_batch(self, params):
+        if self._simulate():
+            return
+        phones = [p for p in params.get("Phones", [""])[0].split(",") if p]
+        self._send(200, {"Items": [self._phone_item(p) for p in phones]})
+
+    def _phone_item(self, phone):
+        score = _score(phone)
+        processed = self.rng.random() >= self.config.unprocessed_rate
+        valid = processed and score < self.config.valid_rate
+        return {
+            "PhoneNumber": phone,
+            "RequestProcessed": processed,
+            "IsValid": "Yes" if valid else ("Maybe" if not processed else "No"),
+            "NetworkCode": "01" if valid else "",
+            "NetworkName": "Stub Mobile" if valid else "",
+            "NetworkCountry": "",
+            "NationalFormat": phone.lstrip("+"),
+            "CountryPrefix": "",
+            "NumberType": "Mobile" if valid else "Unknown",
+        }
+
+    def _domains(self):
+        if self._simulate():
+            return
+        members = [{"domain": f"stub{i}.example", "isActive": True} for i in range(self.config.mailtm_domains)]
+        self._send(200, {"hydra:member": members})
+
+    def _account(self, payload):
+        if self._simulate():
+            return
+        self._send(201, {"address": payload.get("address"), "id": hashlib.md5(str(payload).encode()).hexdigest()})
+
+    def _sms_page(self, url):
+        cfg = self.config
+        inactive = url.path.startswith(SMS_INACTIVE_PATH)
+        base = SMS_INACTIVE_PATH if inactive else SMS_ACTIVE_PATH
+        page = 1
+        rest = url.path[len(base):].strip("/")
+        if rest.startswith("page/"):
+            page = int(rest.split("/")[1])
+        if page > cfg.sms_pages:
+            return self._send(404, "not found", content_type="text/html")
+
+        # pages never change, so the ETag is fixed per page
+        etag = f'"{"i" if inactive else "a"}{page}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", headers={"ETag": etag})
+        if self._simulate():
+            return
+
+        prefixes = ["+44 7700 9", "+33 6 12", "+49 151 2", "+61 4 12", "+1 212 55"]
+        rng = random.Random(f"{base}{page}")
+        rows = []
+        for _ in range(cfg.sms_numbers_per_page):
+            prefix = rng.choice(prefixes)
+            rows.append(f'<div class="number">{prefix}{rng.randint(10000, 99999)}</div>')
+        if page < cfg.sms_pages:
+            rows.append(f'<a href="{base}page/{page + 1}/">next</a>')
+        html = "<html><body>" + "\n".join(rows) + "</body></html>"
+        self._send(200, html, content_type="text/html; charset=utf-8", headers={"ETag": etag})
+
+
+def endpoint_env(base_url):
+    """Environment variables that point constants.py at a stub server."""
+    return {
+        "URL_EMAIL_BATCH": f"{base_url}{EMAIL_BATCH_PATH}",
+        "URL_PHONE_INDIVIDUAL": f"{base_url}{PHONE_INDIVIDUAL_PATH}",
+        "URL_PHONE_BATCH": f"{base_url}{PHONE_BATCH_PATH}",
+        "MAILTM_BASE_URL": f"{base_url}{MAILTM_PREFIX}",
+        "URL_PUBLIC_SMS_SOURCE": f"{base_url}{SMS_ACTIVE_PATH}",
+        "URL_PUBLIC_SMS_SOURCE_FALLBACK": f"{base_url}{SMS_INACTIVE_PATH}",
+    }
+
+
+def start_stub_server(config=None, host="127.0.0.1", port=0, seed=None):
+    """Starts the stub server on a background thread. Returns (server, base_url)."""
+    handler = type("StubHandler", (_Handler,), {"config": config or StubConfig(), "rng": random.Random(seed)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for Loqate, Mail.tm and the SMS sources")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency_ms", type=float, default=20.0)
+    parser.add_argument("--jitter_ms", type=float, default=10.0)
+    parser.add_argument("--error_rate", type=float, default=0.0)
+    parser.add_argument("--rate_limit_rate", type=float, default=0.0)
+    parser.add_argument("--retry_after", type=float, default=0.1)
+    parser.add_argument("--unprocessed_rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        unprocessed_rate=args.unprocessed_rate,
+    )
+    server, base_url = start_stub_server(config, host=args.host, port=args.port)
+    print(f"Stub server listening on {base_url}. Point the pipeline at it with:")
+    for key, value in endpoint_env(base_url).items():
+        print(f"  export {key}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Vectorized, seeded generator for synthetic (fake) phones and emails.
+
+Phones follow a simplified excerpt of each country's national numbering plan:
+national significant number length and mobile / landline prefixes, plus blocks
+that are not assigned to any operator, which make certain fakes. Numbers and
+addresses are built in NumPy batches, so millions take seconds, and the
+same seed always yields the same dataset.
+"""
+import numpy as np
+
+from constants import COUNTRY_PREFIXES
+
+# US area codes used for mobile and landline alike (NANP numbers carry no type)
+_US_AREA_CODES = (
+    "201", "202", "212", "213", "214", "305", "310", "312", "404", "415",
+    "512", "602", "617", "702", "713", "718", "805", "917", "929",
+)
+
+# country -> kind -> (national prefixes, NSN lengths); the rest of the number is random
+NUMBERING_PLANS = {
+    "US": {
+        "mobile": (_US_AREA_CODES, (10,)),
+        "landline": (_US_AREA_CODES, (10,)),
+        # 37X and 96X are reserved for future NANP expansion
+        "unassigned": (tuple(f"37{d}" for d in range(10)) + tuple(f"96{d}" for d in range(10)), (10,)),
+    },
+    "GB": {
+        "mobile": (("71", "73", "74", "75", "77", "78", "79"), (10,)),
+        "landline": (("20", "113", "114", "117", "121", "131", "141", "161"), (10,)),
+        "unassigned": (("4", "6"), (10,)),
+    },
+    "AU": {
+        "mobile": (("4",), (9,)),
+        "landline": (("2", "3", "7", "8"), (9,)),
+        "unassigned": (("6",), (9,)),
+    },
+    "FR": {
+        "mobile": (("6", "73", "74", "75", "76", "77", "78"), (9,)),
+        "landline": (("1", "2", "3", "4", "5"), (9,)),
+        "unassigned": (("70", "71"), (9,)),
+    },
+    "DE": {
+        "mobile": (("151", "152", "157", "159", "160", "162", "163", "170", "171", "172", "173", "175", "176", "177", "178", "179"), (10, 11)),
+        "landline": (("30", "40", "69", "89", "221"), (10, 11)),
+        "unassigned": (("11",), (10,)),
+    },
+    "IN": {
+        "mobile": (("6", "7", "8", "9"), (10,)),
+        "landline": (("11", "22", "33", "44", "80"), (10,)),
+        "unassigned": (("5",), (10,)),
+    },
+    "JP": {
+        "mobile": (("70", "80", "90"), (10,)),
+        "landline": (("3", "6"), (9,)),
+        "unassigned": (("10",), (10,)),
+    },
+    "CN": {
+        "mobile": (("130", "135", "138", "150", "158", "170", "180", "186", "189", "199"), (11,)),
+        "landline": (("10", "21"), (10,)),
+        "unassigned": (("12",), (11,)),
+    },
+    "BR": {
+        # two-digit area code, then 9 for mobiles / 2-5 for landlines
+        "mobile": (("119", "219", "319", "419", "519", "619", "719", "819", "919"), (11,)),
+        "landline": (("112", "113", "213", "313", "413", "513", "613"), (10,)),
+        # area codes (DDD) that are not in use
+        "unassigned": (("20", "23", "25", "26", "29", "30", "36", "39", "40", "50", "52", "56", "57", "58", "59", "70", "72", "76", "78", "80", "90"), (10,)),
+    },
+    "AT": {
+        "mobile": (("650", "660", "664", "676", "680", "681", "688", "699"), (10, 11)),
+        "landline": (("1",), (8, 9, 10)),
+        "unassigned": (("59",), (10,)),
+    },
+    "BE": {
+        "mobile": (("460", "465", "468", "470", "471", "472", "473", "474", "475", "476", "477", "478", "479", "483", "484", "485", "486", "487", "488", "489", "490", "491", "492", "493", "494", "495", "496", "497", "498", "499"), (9,)),
+        "landline": (("2", "3", "9"), (8,)),
+        "unassigned": (("45",), (9,)),
+    },
+    "CH": {
+        "mobile": (("75", "76", "77", "78", "79"), (9,)),
+        "landline": (("21", "22", "31", "43", "44", "61"), (9,)),
+        "unassigned": (("36",), (9,)),
+    },
+    "ES": {
+        "mobile": (("6", "71", "72", "73", "74"), (9,)),
+        "landline": (("91", "93", "95", "96"), (9,)),
+        "unassigned": (("50",), (9,)),
+    },
+    "IT": {
+        "mobile": (("320", "328", "329", "333", "338", "340", "347", "348", "349", "366", "380", "388", "391", "392"), (10,)),
+        # Italian landlines keep their leading 0 after the calling code
+        "landline": (("02", "06", "011", "055", "081"), (9, 10)),
+        "unassigned": (("5",), (10,)),
+    },
+    "NL": {
+        "mobile": (("61", "62", "63", "64", "65"), (9,)),
+        "landline": (("10", "20", "30", "70"), (9,)),
+        "unassigned": (("60", "69"), (9,)),
+    },
+    "RU": {
+        "mobile": (("9",), (10,)),
+        "landline": (("495", "499", "812"), (10,)),
+        "unassigned": (("2",), (10,)),
+    },
+    "SE": {
+        "mobile": (("70", "72", "73", "76", "79"), (9,)),
+        "landline": (("8",), (8, 9)),
+        "unassigned": (("75",), (9,)),
+    },
+    "ZA": {
+        "mobile": (("60", "61", "62", "63", "64", "65", "66", "71", "72", "73", "74", "76", "78", "79", "81", "82", "83", "84"), (9,)),
+        "landline": (("10", "11", "21", "31"), (9,)),
+        "unassigned": (("5",), (9,)),
+    },
+    "MX": {
+        # one 10-digit plan for mobiles and landlines since 2019
+        "mobile": (("55", "33", "81", "222", "442", "664", "998"), (10,)),
+        "landline": (("55", "33", "81", "222", "442", "664", "998"), (10,)),
+        "unassigned": (("11", "12"), (10,)),
+    },
+}
+
+# NANP: the exchange (first digit after the area code) never starts with 0 or 1
+_FIRST_DIGITS = {"US": "23456789"}
+
+# share of each kind among the generated fake numbers
+DEFAULT_PHONE_MIX = {"mobile": 0.5, "landline": 0.3, "unassigned": 0.2}
+
+FIRST_NAMES = (
+    "james", "mary", "john", "patricia", "robert", "jennifer", "michael", "linda", "david", "elizabeth",
+    "william", "susan", "richard", "jessica", "thomas", "sarah", "daniel", "karen", "matthew", "nancy",
+    "lucas", "emma", "noah", "olivia", "liam", "sofia", "mateo", "chloe", "luca", "giulia",
+    "hans", "anna", "pierre", "marie", "jan", "eva", "wei", "li", "hiroshi", "yuki",
+    "raj", "priya", "ivan", "olga", "pedro", "ana", "erik", "ingrid", "sipho", "thandi",
+)
+LAST_NAMES = (
+    "smith", "johnson", "williams", "brown", "jones", "garcia", "miller", "davis", "rodriguez", "martinez",
+    "wilson", "anderson", "taylor", "thomas", "moore", "martin", "jackson", "white", "harris", "clark",
+    "muller", "schmidt", "dubois", "lefebvre", "rossi", "russo", "jansen", "devries", "wang", "zhang",
+    "sato", "suzuki", "sharma", "patel", "ivanov", "petrov", "silva", "santos", "lopez", "fernandez",
+    "andersson", "johansson", "peeters", "maes", "gruber", "huber", "meier", "nkosi", "dlamini", "hernandez",
+)
+# TLDs of the random fake domains; the labels are random, so the domains are not registered
+FAKE_EMAIL_TLDS = ("com", "net", "org", "io", "co")
+# length of the random tags in fake local parts and domain labels (36^10 values each)
+TAG_LENGTH = 10
+_TAG_LETTERS = np.frombuffer(b"abcdefghijklmnopqrstuvwxyz", dtype=np.uint8)
+_TAG_CHARS = np.frombuffer(b"abcdefghijklmnopqrstuvwxyz0123456789", dtype=np.uint8)
+
+
+def _digits(rng, count, length, first=None):
+    """`count` random digit strings (bytes) of `length` (>= 1); `first` limits the first digit."""
+    digits = rng.integers(0, 10, size=(count, length), dtype=np.uint8)
+    if first:
+        allowed = np.frombuffer(first.encode("ascii"), dtype=np.uint8) - 48
+        digits[:, 0] = allowed[rng.integers(0, len(allowed), count)]
+    digits += 48
+    return digits.view(f"S{length}").ravel()
+
+
+def generate_fake_phones(country, count, rng, mix=None):
+    """
+    Generates `count` E.164 fake numbers for `country` following its numbering plan.
+    `mix` weighs the kinds (mobile / landline / unassigned, see DEFAULT_PHONE_MIX).
+    """
+    if count <= 0:
+        return []
+    plan = NUMBERING_PLANS[country]
+    mix = mix or DEFAULT_PHONE_MIX
+    calling_code = COUNTRY_PREFIXES[country].encode("ascii")
+
+    # one cell per (kind, prefix, length); numbers are spread over the cells in one multinomial draw
+    cells, weights = [], []
+    for kind, share in mix.items():
+        if kind not in plan or share <= 0:
+            continue
+        prefixes, lengths = plan[kind]
+        for prefix in prefixes:
+            for length in lengths:
+                cells.append((prefix, length))
+                weights.append(share / (len(prefixes) * len(lengths)))
+    weights = np.asarray(weights) / np.sum(weights)
+
+    parts = []
+    for (prefix, length), n in zip(cells, rng.multinomial(count, weights)):
+        if n == 0:
+            continue
+        tails = _digits(rng, n, length - len(prefix), _FIRST_DIGITS.get(country))
+        parts.append(np.char.add(calling_code + prefix.encode("ascii"), tails))
+    numbers = rng.permutation(np.concatenate(parts))
+    return numbers.astype("U").tolist()
+
+
+def random_tags(rng, count, length=TAG_LENGTH):
+    """`count` random lowercase tags (a letter, then letters and digits), too random to be in use."""
+    chars = _TAG_CHARS[rng.integers(0, len(_TAG_CHARS), size=(count, length))]
+    chars[:, 0] = _TAG_LETTERS[rng.integers(0, len(_TAG_LETTERS), count)]
+    return chars.view(f"S{length}").ravel().astype("U")
+
+
+def fake_domains(rng, count):
+    """`count` random, unregistered domains (e.g. kq3v8zr1xm.net)."""
+    tlds = np.array(FAKE_EMAIL_TLDS)[rng.integers(0, len(FAKE_EMAIL_TLDS), count)]
+    return np.char.add(np.char.add(random_tags(rng, count), "."), tlds)
+
+
+def generate_fake_emails(count, rng, domains=None, addresses_per_domain=10):
+    """
+    Generates `count` fake addresses that cannot exist: a name pattern (first.last,
+    flast, first_last42, ...) with a random tag, e.g. maria.rossi.k3x9qz7wpa@kq3v8zr1xm.net.
+    Domains are drawn from `domains` if given, otherwise from random unregistered
+    domains (about `addresses_per_domain` addresses each).
+    """
+    if count <= 0:
+        return []
+    first = np.array(FIRST_NAMES)[rng.integers(0, len(FIRST_NAMES), count)]
+    last = np.array(LAST_NAMES)[rng.integers(0, len(LAST_NAMES), count)]
+    number = rng.integers(1, 10000, count).astype("U")
+    initial = first.astype("U1")
+
+    patterns = [
+        np.char.add(np.char.add(first, "."), last),
+        np.char.add(first, last),
+        np.char.add(initial, last),
+        np.char.add(np.char.add(np.char.add(first, "_"), last), number),
+        np.char.add(first, number),
+        np.char.add(np.char.add(last, "."), first),
+    ]
+    local = np.choose(rng.integers(0, len(patterns), count), patterns)
+    # the tag keeps the mailbox nonexistent even on real domains (--email_domains)
+    local = np.char.add(np.char.add(local, "."), random_tags(rng, count))
+
+    domains = np.array(list(domains)) if domains else fake_domains(rng, -(-count // addresses_per_domain))
+    domain = domains[rng.integers(0, len(domains), count)]
+    return np.char.add(np.char.add(local, "@"), domain).tolist()
+
+
+def generate_synthetic_data(num_standard, phones_per_country, seed=None, countries=None, email_domains=None, phone_mix=None):
+    """
+    Builds a fully synthetic dataset (same layout as utils.generate_data, without
+    Mail.tm inboxes or scraped numbers), reproducible by seed.
+    """
+    rng = np.random.default_rng(seed)
+    countries = list(countries or COUNTRY_PREFIXES)
+    return {
+        "std_emails": generate_fake_emails(num_standard, rng, email_domains),
+        "pro_emails": [],
+        "scraped_real_phones_by_country": {code: [] for code in countries},
+        "fake_phones_by_country": {code: generate_fake_phones(code, phones_per_country, rng, phone_mix) for code in countries},
+        "scraped_inactive_phones_by_country": {code: [] for code in countries},
+    }
@@ -1,22 +1,37 @@
-import csv
+import asyncio
 import requests
-import json
-import re
 import os
 import random
-from faker import Faker
-from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import time
 import secrets
 import string
+import threading
 from constants import (
-    LOQATE_API_KEY, URL_EMAIL_BATCH, URL_PHONE_INDIVIDUAL, 
-    MAILTM_BASE_URL, URL_PUBLIC_SMS_SOURCE, 
-    URL_PUBLIC_SMS_SOURCE_FALLBACK, COUNTRY_PREFIXES
+    LOQATE_API_KEY, URL_EMAIL_BATCH, URL_PHONE_INDIVIDUAL, URL_PHONE_BATCH,
+    MAILTM_BASE_URL, URL_PUBLIC_SMS_SOURCE,
+    URL_PUBLIC_SMS_SOURCE_FALLBACK, COUNTRY_PREFIXES,
+    MAILTM_DOMAINS_PATH, PRO_EMAILS_PARTIAL_PATH, NUMBER_POOL_PATH
 )
+import numpy as np
+from batching import AdaptiveChunkSize, RequestCoalescer
+from number_pool import NumberPool
+from scraper import scrape_sources
+from synthetic import generate_fake_emails, generate_fake_phones
+from instrumentation import INSTRUMENTATION
+from http_client import get_session, hedger_for, request_with_retry, parse_retry_after, RateLimiter
+from log_setup import get_logger
+from domain_index import email_domain
+from records import EmailResult, PhoneResult, record_from_dict, write_results
+from normalize import normalize_email, normalize_phone, group_by_identity, fan_out, log_dedup
+from inputs import save_list_to_json
 
-# initialize faker
-fake = Faker()
+logger = get_logger("utils")
+
+
+# Mail.tm domains, fetched once per run
+_mailtm_domains = None
 
 def _random_local_part(length: int = 10) -> str:
     """Generate a random local part for the email address."""
@@ -24,137 +39,188 @@ def _random_local_part(length: int = 10) -> str:
     return "".join(secrets.choice(alphabet) for _ in range(length))
 
 
-def get_professional_fake_email(retries=3):
+def fetch_mailtm_domains(session=None, refresh=False):
     """
-    Creates a working disposable email.
-    Retries on failure. Falls back to 1secmail if Mail.tm fails completely.
+    Returns the list of active Mail.tm domains.
+    Fetched once per run and saved to disk, so other stages can reuse it.
+    """
+    global _mailtm_domains
+    if _mailtm_domains is not None and not refresh:
+        return _mailtm_domains
+
+    http = session or requests
+    try:
+        resp = request_with_retry(
+            http, "GET", f"{MAILTM_BASE_URL}/domains", retries=3, timeout=5, stage="get_professional_fake_email"
+        )
+        if resp.status_code == 200:
+            domains = [d["domain"] for d in resp.json().get("hydra:member", []) if d.get("isActive", True)]
+            if domains:
+                _mailtm_domains = domains
+                save_list_to_json(domains, MAILTM_DOMAINS_PATH)
+                return domains
+        logger.warning(f"   [Mail.tm] Could not fetch domains (status {resp.status_code}).")
+    except Exception as e:
+        logger.warning(f"   [Mail.tm] Error fetching domains: {e}")
+    return []
+
+def get_professional_fake_email(retries=3, domain=None, session=None, limiter=None):
     """
+    Creates a working disposable email on Mail.tm.
+    Uses the given domain (or a random active one) and retries on failure.
+    With a shared RateLimiter, 429s slow down all workers instead of sleeping here.
+    """
+    http = session or requests
     for attempt in range(retries):
         try:
-            # 1. Get Domains
-            domains_resp = requests.get(f"{MAILTM_BASE_URL}/domains", timeout=5)
-            if domains_resp.status_code != 200:
-                time.sleep(1)
-                continue
-                
-            data = domains_resp.json()
-            domains = data.get("hydra:member", [])
-            if not domains:
-                time.sleep(1)
-                continue
-
-            domain = domains[0]["domain"]
+            if domain is None:
+                # 1. Get Domains (cached)
+                domains = fetch_mailtm_domains(session=session)
+                if not domains:
+                    time.sleep(1)
+                    continue
+                use_domain = random.choice(domains)
+            else:
+                use_domain = domain
+
             local_part = _random_local_part()
-            address = f"{local_part}@{domain}"
+            address = f"{local_part}@{use_domain}"
             password = secrets.token_urlsafe(12)
 
             # 2. Create Account
-            acc_resp = requests.post(
+            if limiter is not None:
+                limiter.acquire()
+            start = time.perf_counter()
+            acc_resp = http.post(
                 f"{MAILTM_BASE_URL}/accounts",
                 json={"address": address, "password": password},
                 timeout=5
             )
+            created = acc_resp.status_code in (200, 201)
+            INSTRUMENTATION.observe(
+                "get_professional_fake_email", time.perf_counter() - start, items=int(created), error=not created
+            )
+            if not created and attempt + 1 < retries:
+                INSTRUMENTATION.count_retry("get_professional_fake_email")
             
-            if acc_resp.status_code in (200, 201):
+            if created:
+                if limiter is not None:
+                    limiter.on_success()
                 return address
             elif acc_resp.status_code == 429:
-                secs = round(random.uniform(2, 5), 2)
-                print(f"   [Mail.tm] Rate limited (429). Retrying in {secs}s...")
-                time.sleep(secs)
+                retry_after = parse_retry_after(acc_resp.headers.get("Retry-After"))
+                if limiter is not None:
+                    limiter.on_throttled(retry_after)
+                    logger.warning(f"   [Mail.tm] Rate limited (429). Slowing down to {limiter.rate:.2f} req/s...")
+                else:
+                    secs = retry_after if retry_after is not None else round(random.uniform(2, 5), 2)
+                    logger.warning(f"   [Mail.tm] Rate limited (429). Retrying in {secs}s...")
+                    time.sleep(secs)
             else:
                 # e.g. 422 Unprocessable Entity
                 pass
 
         except Exception as e:
-            print(f"   [Mail.tm] Error on attempt {attempt+1}: {e}")
-            time.sleep(1)
-    
-        except Exception:
-            print("   [Warning] Failed to generate professional fake email.")
+            logger.warning(f"   [Mail.tm] Error on attempt {attempt+1}: {e}")
             time.sleep(1)
-            pass
     
-    print("   [Warning] Mail.tm failed.")
+    logger.warning("   [Warning] Mail.tm failed.")
     return None
 
-def extract_numbers_from_text(text):
-    """Helper to find international format numbers in raw HTML text."""
-    # look for patterns like +123456789 or +1 234 567 89
-    # allows for optional spaces between digits
-    matches = re.findall(r'\+(\d[\d\s]{7,16})', text)
-    cleaned_matches = []
-    for m in matches:
-        # remove spaces to check against prefixes
-        clean_num = "+" + m.replace(" ", "").replace("-", "")
-        cleaned_matches.append(clean_num)
-    return cleaned_matches
-
-def fetch_real_active_numbers(active=True):
+def generate_professional_fake_emails(count, concurrency=4, rate=4.0, out_path=None):
     """
-    Scrapes public SMS receiver sites to find ACTUAL, REAL, ACTIVE phone numbers.
-    Returns a dict: {'US': ['+1...', ...], 'GB': ['+44...', ...]}
+    Creates `count` disposable Mail.tm inboxes concurrently.
+    Accounts are spread round-robin across all active domains, all workers share
+    one rate limiter, and each address is appended to `out_path` as soon as it
+    exists. Addresses already in `out_path` (from an interrupted run) are reused.
+    """
+    addresses = []
+    if out_path is not None and os.path.exists(out_path):
+        with open(out_path, "r", encoding="utf-8") as f:
+            addresses = [line.strip() for line in f if line.strip()][:count]
+        if addresses:
+            logger.info(f"   [Mail.tm] Reusing {len(addresses)} addresses from {out_path}")
+
+    missing = count - len(addresses)
+    if missing <= 0:
+        return addresses
+
+    session = get_session(pool_size=concurrency)
+    domains = fetch_mailtm_domains(session=session)
+    if not domains:
+        logger.warning("   [Warning] Mail.tm failed.")
+        return addresses
+
+    limiter = RateLimiter(rate=rate)
+    out_file = open(out_path, "a", encoding="utf-8") if out_path is not None else None
+    lock = threading.Lock()
+
+    def create(i):
+        address = get_professional_fake_email(domain=domains[i % len(domains)], session=session, limiter=limiter)
+        if address:
+            with lock:
+                addresses.append(address)
+                if out_file is not None:
+                    out_file.write(address + "\n")
+                    out_file.flush()
+        return address
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(create, range(missing)))
+    finally:
+        if out_file is not None:
+            out_file.close()
+
+    logger.info(f"   [Mail.tm] Created {len(addresses)}/{count} addresses across {len(domains)} domains ({limiter.throttled} rate limits).")
+    return addresses
+
+def refresh_number_pool(active=True, pool=None):
+    """
+    Scrapes the active SMS source (or the inactive one with active=False, both
+    with active=None) into the persistent number pool and returns the pool.
+    Pages and their subpages are fetched concurrently and only when changed.
     """
-    found_numbers = {code: [] for code in COUNTRY_PREFIXES}
-    
-    # headers to mimic a real Chrome browser to bypass 403s
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate',
-        'Referer': 'https://www.google.com/',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Sec-Fetch-User': '?1',
-    }
-    
-    session = requests.Session()
-    session.headers.update(headers)
-    
     if active is None:
-        sources = [URL_PUBLIC_SMS_SOURCE, URL_PUBLIC_SMS_SOURCE_FALLBACK]
+        sources = {URL_PUBLIC_SMS_SOURCE: "active", URL_PUBLIC_SMS_SOURCE_FALLBACK: "inactive"}
     else:
-        sources = [URL_PUBLIC_SMS_SOURCE] if active else [URL_PUBLIC_SMS_SOURCE_FALLBACK]
-    
-    for url in sources:
-        print(f"--- Fetching Numbers from {url} ---")
-        try:
-            response = session.get(url, timeout=15)
-            
-            if response.status_code == 200:
-                raw_numbers = extract_numbers_from_text(response.text)
-                
-                # sort prefixes by length (desc) to match +44 before +4
-                sorted_prefixes = sorted(COUNTRY_PREFIXES.items(), key=lambda x: len(x[1]), reverse=True)
-
-                count_new = 0
-                for full_num in raw_numbers:
-                    for code, prefix in sorted_prefixes:
-                        if full_num.startswith(prefix):
-                            if full_num not in found_numbers[code]:
-                                found_numbers[code].append(full_num)
-                                count_new += 1 
-                
-                print(f"   [Success] Found {count_new} numbers from this source.")
-            else:
-                print(f"   [Warning] Status {response.status_code} from {url}")
+        sources = {URL_PUBLIC_SMS_SOURCE: "active"} if active else {URL_PUBLIC_SMS_SOURCE_FALLBACK: "inactive"}
 
-        except Exception as e:
-            print(f"   [Warning] Error scraping {url}: {e}")
+    pool = pool or NumberPool(NUMBER_POOL_PATH)
+    logger.info(f"--- Fetching Numbers from {', '.join(sources)} ---")
+    scrape_sources(sources, pool)
+    return pool
 
-        total_found = sum(len(x) for x in found_numbers.values())
-        print(f"   [Total] Collected {total_found} numbers across all countries.")
+def fetch_real_active_numbers(active=True, pool=None, max_age_days=None):
+    """
+    Scrapes public SMS receiver sites to find ACTUAL, REAL, ACTIVE phone numbers
+    (or inactive ones with active=False, both with active=None).
+    All numbers are merged into the persistent number pool (see refresh_number_pool).
+    Returns a dict: {'US': ['+1...', ...], 'GB': ['+44...', ...]}
+    """
+    pool = refresh_number_pool(active, pool)
+    statuses = ["active", "inactive"] if active is None else ["active" if active else "inactive"]
+
+    found_numbers = {code: [] for code in COUNTRY_PREFIXES}
+    for status in statuses:
+        for code, numbers in pool.numbers_by_country(status, max_age_days=max_age_days).items():
+            found_numbers.setdefault(code, []).extend(numbers)
+
+    total_found = sum(len(x) for x in found_numbers.values())
+    logger.info(f"   [Total] Collected {total_found} numbers across all countries.")
     return found_numbers
 
-def generate_data(num_standard=2, num_pro=2, phones_per_country=2):
+def generate_data(num_standard=2, num_pro=2, phones_per_country=2, pro_concurrency=4, pro_rate=4.0, active_max_age_days=7,
+                  seed=None, email_domains=None):
     """
     Generates data:
-    - Standard Emails
+    - Standard Emails (synthetic, see synthetic.py)
     - Pro Emails
-    - Phones (per country)
+    - Phones (per country): scraped real numbers first, then scraped inactive ones,
+      then synthetic numbers that follow the country's numbering plan
+    `seed` makes the synthetic part reproducible.
     """
+    rng = np.random.default_rng(seed)
     data = {
         "std_emails": [],
         "pro_emails": [],
@@ -163,251 +229,491 @@ def generate_data(num_standard=2, num_pro=2, phones_per_country=2):
         "scraped_inactive_phones_by_country": {code: [] for code in COUNTRY_PREFIXES}
     }
     
-    print(f"--- Generating Data: {num_standard} Std Email, {num_pro} Pro Email, {phones_per_country} Phones/Country ---")
+    logger.info(f"--- Generating Data: {num_standard} Std Email, {num_pro} Pro Email, {phones_per_country} Phones/Country ---")
     
     # emails
-    for _ in range(num_standard):
-        data["std_emails"].append(fake.email())
+    data["std_emails"] = generate_fake_emails(num_standard, rng, email_domains)
 
-    for _ in range(num_pro):
-        pro_email = get_professional_fake_email()
-        if pro_email:
-            data["pro_emails"].append(pro_email)
+    data["pro_emails"] = generate_professional_fake_emails(
+        num_pro, concurrency=pro_concurrency, rate=pro_rate, out_path=PRO_EMAILS_PARTIAL_PATH
+    )
         
     # phones per country
 
-    # try to get real numbers cache
-    real_numbers_cache = fetch_real_active_numbers()
-    inactive_numbers_cache = fetch_real_active_numbers(active=False)
-
-    for code, prefix in COUNTRY_PREFIXES.items():
-        # get real numbers available for this country
-        real_available = real_numbers_cache.get(code, [])
-        inactive_available = inactive_numbers_cache.get(code, [])
-
-        country_list = []
-        for i in range(phones_per_country):
-            # if we have a real number available, use it
-            # this prioritizes "real" testing if available
-            if real_available:
-                # pop one to use
-                real_num = real_available.pop(0)
-                data["scraped_real_phones_by_country"][code].append(real_num)
-                print(f"   [{code}] Using scraped real active number: {real_num}")
-                continue
-                
-            # fallback to inactive / fake generation
-            # if secrets.choice([True, False]):
-            if inactive_available: # real but inactive --> not reachable, thus "fake"
-                # pop one to use
-                inactive_num = inactive_available.pop(0)
-                data["scraped_inactive_phones_by_country"][code].append(inactive_num)
-                print(f"   [{code}] Using scraped real inactive number: {inactive_num}")
-                continue
-            else:
-                # basic structured fake
-                base_num = fake.basic_phone_number().replace("-", "").replace("(", "").replace(")", "").replace(" ", "").replace(".", "")
-                if base_num.startswith("0"): 
-                    base_num = base_num[1:]
-                full_num = f"{prefix}{base_num}"
-                print(f"   [{code}] Using structured fake number: {full_num}")
-                
-            # else:
-            #     # random phone number
-            #     full_num = fake.phone_number()
-            
-            country_list.append(full_num)
-        
-        data["fake_phones_by_country"][code] = country_list
+    # refresh the number pool once (active + inactive sources), then draw from it
+    pool = refresh_number_pool(active=None)
+    # only recently seen active numbers are trusted to still be active
+    real_numbers_cache = pool.numbers_by_country("active", max_age_days=active_max_age_days)
+    inactive_numbers_cache = pool.numbers_by_country("inactive")
+
+    for code in COUNTRY_PREFIXES:
+        # real numbers first, this prioritizes "real" testing if available
+        real = real_numbers_cache.get(code, [])[:phones_per_country]
+        # real but inactive --> not reachable, thus "fake"
+        inactive = inactive_numbers_cache.get(code, [])[:phones_per_country - len(real)]
+        data["scraped_real_phones_by_country"][code] = real
+        data["scraped_inactive_phones_by_country"][code] = inactive
+
+        # the rest are structured fakes that follow the numbering plan
+        fakes = generate_fake_phones(code, phones_per_country - len(real) - len(inactive), rng)
+        data["fake_phones_by_country"][code] = fakes
+        logger.debug(f"   [{code}] {len(real)} scraped active, {len(inactive)} scraped inactive, {len(fakes)} structured fake numbers")
         
     return data
 
-def verify_emails_batch(emails):
-    """Verifies a list of emails and returns the results."""
+def _email_record(item):
+    """Builds the "clean" email record for our CSV from a Loqate item."""
+    # valid means status starts with "valid", but not if disposable ("Unknown" is treated as invalid)
+    isValid = item.get('Status', '').lower().startswith("valid") and not item.get('IsDisposible', False)
+    return EmailResult(
+        Input=item.get('EmailAddress'),
+        Status=item.get('Status'),
+        IsValid="Yes" if isValid else "No",
+        Account=item.get('Account'),
+        Domain=item.get('Domain'),
+        IsDisposable=item.get('IsDisposible'),
+        IsSystemMailbox=item.get('IsSystemMailbox'),
+        # "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+def _submit_email_chunk(session, chunk, retries):
+    """
+    Sends one chunk to the batch endpoint (with retries).
+    Returns (items, latency, error); `error` is None on success.
+    """
+    params = {"Key": LOQATE_API_KEY, "Emails": ",".join(chunk)}
+    logger.debug(f"[Email Batch] Verifying {len(chunk)} emails...")
+    start = time.perf_counter()
+    try:
+        response = request_with_retry(
+            session, "POST", URL_EMAIL_BATCH, retries=retries, stage="verify_emails_batch", data=params
+        )
+        response.raise_for_status()
+        items = response.json().get("Items", [])
+        latency = time.perf_counter() - start
+        INSTRUMENTATION.observe("verify_emails_batch", latency, items=len(items), credits=len(chunk))
+        return items, latency, None
+    except Exception as e:
+        latency = time.perf_counter() - start
+        INSTRUMENTATION.observe("verify_emails_batch", latency, items=0, error=True)
+        return [], latency, e
+
+def verify_emails_batch(emails, cache=None, max_in_flight=4, chunk_size=100, retries=4, unverified=None, on_result=None,
+                        prevalidator=None, domain_index=None):
+    """
+    Verifies a list of emails and returns the results (in input order, one per input).
+    Inputs are normalized first, so each unique address is verified once and its
+    result is fanned back out to every input that maps to it.
+    Keeps up to `max_in_flight` chunks in flight, retries failed chunks and
+    adapts the chunk size to the observed latency and error rate.
+    If a PreValidator is given, emails it rejects get a local verdict and are never sent.
+    If a ResultCache is given, cached emails are served from it and only the misses are sent.
+    Inputs that never got a result are reported and appended to `unverified` (if given).
+    Fresh API results are added to `domain_index` (an EmailDomainIndex, if given).
+    `on_result` (if given) is called with each record as soon as it arrives.
+    """
     if not emails:
         return []
 
-    # prepare results list
-    results = []
-    
-    chunk_size = 100
-    for i in range(0, len(emails), chunk_size):
-        chunk = emails[i:i + chunk_size]
-        params = {"Key": LOQATE_API_KEY, "Emails": ",".join(chunk)}
-        
-        print(f"[Email Batch] Verifying {len(chunk)} emails...")
-    
-        try:
-            response = requests.post(URL_EMAIL_BATCH, data=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if "Items" in data:
-                for item in data["Items"]:
-                    # specific "clean" dict for our CSV
-
-                    # valid means status starts with "valid", but not if disposable ("Unknown" is treated as invalid)
-                    isValid = item.get('Status', '').lower().startswith("valid") and not item.get('IsDisposible', False)
-                    record = {
-                        "Type": "Email",
-                        "Input": item.get('EmailAddress'),
-                        "Status": item.get('Status'),
-                        "IsValid": "Yes" if isValid else "No",
-                        "Account": item.get('Account'),
-                        "Domain": item.get('Domain'),
-                        "IsDisposable": item.get('IsDisposible'),
-                        "IsSystemMailbox": item.get('IsSystemMailbox'),
-                        # "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    if record not in results:
-                        results.append(record)
-                    print(f"   Processed: {record['Input']} -> {record['Status']}")
-        except Exception as e:
-            print(f"[Email Batch] Error: {e}")
-        
-    return results
+    # canonical address -> original inputs
+    groups = group_by_identity(emails, normalize_email)
+    log_dedup("emails", len(emails), len(groups))
+    results = {}
+
+    def record_result(record):
+        key = normalize_email(record["Input"])
+        if key in results or key not in groups:
+            return False
+        results[key] = record
+        if on_result is not None:
+            for row in fan_out(record, groups[key]):
+                on_result(row)
+        return True
+
+    pending = list(groups)
+    if prevalidator is not None:
+        remaining = []
+        for email in pending:
+            record = prevalidator.check_email(email)
+            if record is None:
+                remaining.append(email)
+            else:
+                record_result(record)
+        if len(remaining) < len(pending):
+            INSTRUMENTATION.count_local_hit("verify_emails_batch", len(pending) - len(remaining))
+            logger.info(f"[Email Batch] {len(pending) - len(remaining)} emails rejected by pre-validation.")
+        pending = remaining
+
+    if cache is not None:
+        uncached = []
+        for email in pending:
+            record = cache.get(URL_EMAIL_BATCH, email)
+            if record is None:
+                uncached.append(email)
+            else:
+                record_result(record_from_dict(record).replace(Input=email))
+        if len(uncached) < len(pending):
+            INSTRUMENTATION.count_cache_hit("verify_emails_batch", len(pending) - len(uncached))
+            logger.info(f"[Email Batch] {len(pending) - len(uncached)} emails served from cache.")
+        pending = uncached
+
+    session = get_session(pool_size=max_in_flight)
+    sizer = AdaptiveChunkSize(initial=chunk_size, maximum=chunk_size)
+    failed = []
+    retry_chunks = deque()
+    offset = 0
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        while offset < len(pending) or retry_chunks or in_flight:
+            # top up the pipeline
+            while len(in_flight) < max_in_flight and (retry_chunks or offset < len(pending)):
+                if retry_chunks:
+                    chunk = retry_chunks.popleft()
+                else:
+                    chunk = pending[offset:offset + sizer.size]
+                    offset += len(chunk)
+                future = executor.submit(_submit_email_chunk, session, chunk, retries)
+                in_flight[future] = chunk
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = in_flight.pop(future)
+                items, latency, error = future.result()
+                sizer.record(latency, error is None)
+
+                if error is not None:
+                    logger.warning(f"[Email Batch] Error: {error}")
+                    # a 4xx may be caused by one bad input, so split the chunk to isolate it
+                    status = getattr(getattr(error, "response", None), "status_code", None)
+                    if status is not None and 400 <= status < 500 and status != 429 and len(chunk) > 1:
+                        half = len(chunk) // 2
+                        retry_chunks.extend([chunk[:half], chunk[half:]])
+                    else:
+                        failed.extend(chunk)
+                    continue
+
+                for item in items:
+                    record = _email_record(item)
+                    if record_result(record):
+                        if cache is not None:
+                            cache.put(URL_EMAIL_BATCH, record["Input"], record)
+                        if domain_index is not None:
+                            domain_index.add(record)
+                    logger.debug(f"   Processed: {record['Input']} -> {record['Status']}")
+
+    # report inputs that never got a result (failed chunks or missing from the response)
+    missing = [e for e in pending if e not in results]
+    if missing:
+        logger.warning(f"[Email Batch] [Warning] {len(missing)} emails got no result ({len(failed)} from failed chunks).")
+        if unverified is not None:
+            unverified.extend(original for e in missing for original in groups[e])
+    logger.info(f"[Email Batch] Final chunk size: {sizer.size} | Chunk error rate: {sizer.error_rate:.2%}")
+
+    key_of = {}
+    for key, originals in groups.items():
+        for original in originals:
+            key_of.setdefault(original, key)
+    return [results[key_of[e]].replace(Input=e) for e in emails if key_of[e] in results]
+
+def verify_emails_by_domain(emails, domain_index, samples=3, on_result=None, prevalidator=None, **kwargs):
+    """
+    Domain-level mode of verify_emails_batch: only up to `samples` addresses per domain
+    are looked up. Once a domain's samples agree (in this run or an earlier one, see
+    EmailDomainIndex), its remaining addresses get a record with the domain's
+    properties instead (see EmailDomainIndex.inferred_record).
+    Other keyword arguments are passed to verify_emails_batch.
+    """
+    if not emails:
+        return []
 
-def verify_phone_individual(phone):
-    """Verifies a single phone and returns the result."""
+    groups = group_by_identity(emails, normalize_email)
+    by_domain = {}
+    for key in groups:
+        by_domain.setdefault(email_domain(key), []).append(key)
+
+    # 1) look up the samples of domains without a settled verdict
+    sampled, deferred = [], []
+    for domain, keys in by_domain.items():
+        known = domain_index.samples(domain)
+        if domain_index.consensus(domain, samples) is not None:
+            deferred.extend(keys)
+        elif known >= samples:
+            # the samples disagree, so every address needs its own lookup
+            sampled.extend(keys)
+        else:
+            sampled.extend(keys[:samples - known])
+            deferred.extend(keys[samples - known:])
+
+    def originals(keys):
+        return [e for key in keys for e in groups[key]]
+
+    results = verify_emails_batch(
+        originals(sampled), on_result=on_result, prevalidator=prevalidator, domain_index=domain_index, **kwargs
+    )
+
+    # 2) the rest get a domain-level record where the samples agree
+    rest = []
+    inferred = 0
+    for key in deferred:
+        record = None
+        if prevalidator is None or prevalidator.email_reason(key) is None:
+            record = domain_index.inferred_record(key, samples)
+        if record is None:
+            rest.append(key)
+            continue
+        inferred += 1
+        for row in fan_out(record, groups[key]):
+            results.append(row)
+            if on_result is not None:
+                on_result(row)
+    logger.info(f"[Email Batch] Domain-level: {len(by_domain)} domains, {inferred} emails inferred from their domain.")
+
+    results.extend(verify_emails_batch(
+        originals(rest), on_result=on_result, prevalidator=prevalidator, domain_index=domain_index, **kwargs
+    ))
+
+    by_input = {r["Input"]: r for r in results}
+    return [by_input[e] for e in emails if e in by_input]
+
+# phone micro-batching defaults: keys per batch request and the longest a lookup waits for its batch (seconds)
+DEFAULT_PHONE_BATCH_SIZE = 100
+DEFAULT_PHONE_BATCH_WINDOW = 0.02
+# retries of lookups answered with RequestProcessed: False, and the first backoff (seconds)
+DEFAULT_UNPROCESSED_RETRIES = 2
+UNPROCESSED_BACKOFF = 0.5
+
+def _phone_record(phone, item):
+    """Builds the "clean" phone record for our CSV from a Loqate item."""
+    return PhoneResult(
+        Input=phone,
+        RequestProcessed=item.get('RequestProcessed'),
+        IsValid=item.get('IsValid'), # "Yes"/"No"
+        NetworkCode=item.get('NetworkCode'),
+        NetworkName=item.get('NetworkName'),
+        NetworkCountry=item.get('NetworkCountry'),
+        NationalFormat=item.get('NationalFormat'),
+        CountryPrefix=item.get('CountryPrefix'),
+        NumberType=item.get('NumberType'),
+        # "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    )
+
+def _lookup_phone(phone, session=None):
+    """
+    One lookup of a phone (retried on errors, hedged if it is slower than usual).
+    Returns the record, or None if the lookup failed.
+    """
     params = {
         "Key": LOQATE_API_KEY,
         "Phone": phone
     }
-    
+    http = session or requests
+
+    def send():
+        return request_with_retry(http, "GET", URL_PHONE_INDIVIDUAL, retries=2, stage="verify_phone_individual", params=params)
+
+    hedger = hedger_for("verify_phone_individual")
+    start = time.perf_counter()
     try:
-        response = requests.get(URL_PHONE_INDIVIDUAL, params=params)
+        response = hedger.call(send, credits=1) if hedger is not None else send()
         response.raise_for_status()
         data = response.json()
-        
-        if "Items" in data and len(data["Items"]) > 0:
-            item = data["Items"][0]
-            record = {
-                "Type": "Phone",
-                "Input": phone,
-                "RequestProcessed": item.get('RequestProcessed'),
-                "IsValid": item.get('IsValid'), # "Yes"/"No"
-                "NetworkCode": item.get('NetworkCode'),
-                "NetworkName": item.get('NetworkName'),
-                "NetworkCountry": item.get('NetworkCountry'),
-                "NationalFormat": item.get('NationalFormat'),
-                "CountryPrefix": item.get('CountryPrefix'),
-                "NumberType": item.get('NumberType'),
-                # "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            print(f"   Processed: {record['Input']} -> {record['IsValid']}")
+        has_items = "Items" in data and len(data["Items"]) > 0
+        INSTRUMENTATION.observe(
+            "verify_phone_individual", time.perf_counter() - start,
+            items=1 if has_items else 0, error=not has_items, credits=1
+        )
+        if has_items:
+            record = _phone_record(phone, data["Items"][0])
+            logger.debug(f"   Processed: {record['Input']} -> {record['IsValid']}")
             return record
-            
+
     except Exception as e:
-        print(f"[Phone] Error verifying {phone}: {e}")
-    
-    return None
+        INSTRUMENTATION.observe("verify_phone_individual", time.perf_counter() - start, items=0, error=True)
+        logger.warning(f"[Phone] Error verifying {phone}: {e}")
 
-def detect_country(phone_str):
-    """Matches a real phone number string to a country code based on prefix."""
-    if not phone_str: return None
-    # sort prefixes by length desc to match +44 before +4
-    sorted_prefixes = sorted(COUNTRY_PREFIXES.items(), key=lambda x: len(x[1]), reverse=True)
-    
-    for code, prefix in sorted_prefixes:
-        if phone_str.startswith(prefix):
-            return code
-    return "Unknown"
+    return None
 
-def calculate_metrics_subset(results, real_inputs, fake_inputs, label="Overall"):
+def verify_phone_individual(phone, session=None, cache=None, unprocessed_retries=DEFAULT_UNPROCESSED_RETRIES):
     """
-    Calculates metrics for a specific subset of data.
+    Verifies a single phone and returns the result.
+    If a ResultCache is given, a cached record is returned without calling the API.
+    Lookups answered with RequestProcessed: False failed on Loqate's side (they show
+    up as "Maybe"), so they are retried up to `unprocessed_retries` times with backoff.
     """
-    real_set = {str(x).lower().strip() for x in real_inputs if x}
-    fake_set = {str(x).lower().strip() for x in fake_inputs if x}
-    
-    tp, tn, fp, fn = 0, 0, 0, 0
-    processed_count = 0
+    if cache is not None:
+        cached = cache.get(URL_PHONE_INDIVIDUAL, phone)
+        if cached is not None:
+            INSTRUMENTATION.count_cache_hit("verify_phone_individual")
+            return record_from_dict(cached)
+
+    for attempt in range(unprocessed_retries + 1):
+        record = _lookup_phone(phone, session)
+        if record is None or record["RequestProcessed"] is not False or attempt == unprocessed_retries:
+            break
+        INSTRUMENTATION.count_retry("verify_phone_individual")
+        logger.debug(f"   [Phone] {phone} not processed by Loqate, retrying ({attempt + 1}/{unprocessed_retries})...")
+        time.sleep(UNPROCESSED_BACKOFF * 2 ** attempt)
+
+    # lookups that failed on Loqate's side are not worth caching
+    if record is not None and cache is not None and record["RequestProcessed"] is not False:
+        cache.put(URL_PHONE_INDIVIDUAL, phone, record)
+    return record
+
+def _submit_phone_batch(session, phones, cache=None, retries=4, unprocessed_retries=DEFAULT_UNPROCESSED_RETRIES):
+    """
+    Verifies a batch of (normalized) phones through the batch endpoint.
+    Returns {phone: record}. If the batch fails, its numbers are looked up one by one instead;
+    numbers answered with RequestProcessed: False are retried one by one.
+    """
+    params = {"Key": LOQATE_API_KEY, "Phones": ",".join(phones)}
+    start = time.perf_counter()
+    try:
+        response = request_with_retry(
+            session, "POST", URL_PHONE_BATCH, retries=retries, stage="verify_phones_batch", data=params
+        )
+        response.raise_for_status()
+        items = response.json().get("Items", [])
+    except Exception as e:
+        INSTRUMENTATION.observe("verify_phones_batch", time.perf_counter() - start, items=0, error=True)
+        logger.warning(f"[Phone Batch] Error: {e}. Verifying its {len(phones)} numbers individually.")
+        return {phone: verify_phone_individual(phone, session, cache, unprocessed_retries) for phone in phones}
+    INSTRUMENTATION.observe("verify_phones_batch", time.perf_counter() - start, items=len(items), credits=len(phones))
+
+    wanted = set(phones)
+    records = {}
+    for item in items:
+        phone = normalize_phone(item.get("PhoneNumber", ""))
+        if phone not in wanted:
+            continue
+        record = records[phone] = _phone_record(phone, item)
+        if record["RequestProcessed"] is False and unprocessed_retries > 0:
+            INSTRUMENTATION.count_retry("verify_phones_batch")
+            record = records[phone] = verify_phone_individual(phone, session, cache, unprocessed_retries - 1) or record
+            continue
+        # same cache entries as individual lookups, so both modes share them
+        if cache is not None and record["RequestProcessed"] is not False:
+            cache.put(URL_PHONE_INDIVIDUAL, phone, record)
+        logger.debug(f"   Processed: {phone} -> {record['IsValid']}")
+    return records
+
+async def _verify_phones_batched_async(phones, concurrency, batch_size, batch_window, cache, on_result, unprocessed_retries):
+    """
+    Like _verify_phones_async, but lookups are coalesced into batch requests of up
+    to `batch_size` numbers (or whatever arrived within `batch_window` seconds),
+    with up to `concurrency` batches in flight.
+    """
+    session = get_session(pool_size=concurrency)
+    coalescer = RequestCoalescer(
+        lambda batch: _submit_phone_batch(session, batch, cache, unprocessed_retries=unprocessed_retries),
+        max_size=batch_size, window=batch_window, max_in_flight=concurrency
+    )
+    # enough lookups waiting to fill every batch in flight
+    semaphore = asyncio.Semaphore(concurrency * batch_size)
+
+    async def verify_one(phone):
+        record = None
+        if cache is not None:
+            cached = cache.get(URL_PHONE_INDIVIDUAL, phone)
+            if cached is not None:
+                INSTRUMENTATION.count_cache_hit("verify_phones_batch")
+                record = record_from_dict(cached)
+        if record is None:
+            async with semaphore:
+                record = await asyncio.wrap_future(coalescer.submit(phone))
+        if record and on_result is not None:
+            on_result(record)
+        return record
 
-    for row in results:
-        val = str(row.get('Input', '')).lower().strip()
-        
-        # determine ground truth
-        if val in real_set:
-            actual = "Real"
-        elif val in fake_set:
-            actual = "Fake"
-        else:
-            continue # not in this subset
-        
-        processed_count += 1
-        
-        # determine prediction
-        predicted_valid = False
-        valid_str = str(row.get('IsValid', '')).lower()
-        if valid_str in ["yes", "true"]:
-            predicted_valid = True
-        elif not valid_str in ["no", "false", "maybe"]:
-            print(f"   [Warning] Unknown IsValid value for {val}: {row.get('IsValid')}")
-            continue # skip unknowns
-        
-        # Confusion matrix
-        if actual == "Real":
-            if predicted_valid: tp += 1
-            else: fn += 1
-        else: # actual is fake
-            if predicted_valid: fp += 1
-            else: tn += 1
-
-    if processed_count == 0:
-        return # skip print if empty
-
-    total = tp + tn + fp + fn
-    accuracy = (tp + tn) / total if total > 0 else 0
-    precision = tp / (tp + fp) if (tp + fp) > 0 else 0
-    recall = tp / (tp + fn) if (tp + fn) > 0 else 0
-    f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-    
-    print(f"\n--- Metrics: {label} ---")
-    print(f"Total: {total} | TP: {tp} | TN: {tn} | FP: {fp} | FN: {fn}")
-    print(f"Accuracy:  {accuracy:.2%} | Precision: {precision:.2f} | Recall: {recall:.2f} | F1: {f1:.2f}")
+    try:
+        return await asyncio.gather(*(verify_one(p) for p in phones))
+    finally:
+        await asyncio.get_running_loop().run_in_executor(None, coalescer.close)
+        stats = coalescer.stats()
+        if stats["batches"]:
+            logger.info(
+                f"[Phone Batch] {stats['items']} numbers in {stats['batches']} batches | size mean {stats['mean']:.1f}, "
+                f"min {stats['min']}, p50 {stats['p50']}, max {stats['max']} | {stats['full']} full ({batch_size})"
+            )
 
-def save_list_to_json(data_list, filename):
-    """Helper to save a simple list to a JSON file."""
-    if not data_list: 
-        return
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data_list, f, indent=4)
-    print(f"[File] Saved {len(data_list)} items to {filename}")
+async def _verify_phones_async(phones, concurrency, cache, on_result, unprocessed_retries):
+    """Runs verify_phone_individual with at most `concurrency` lookups in flight."""
+    # room for the hedged duplicates of slow lookups
+    session = get_session(pool_size=2 * concurrency)
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        async def verify_one(phone):
+            async with semaphore:
+                record = await loop.run_in_executor(executor, verify_phone_individual, phone, session, cache, unprocessed_retries)
+            if record and on_result is not None:
+                on_result(record)
+            return record
 
-def save_final_results(results, filename):
-    if not results: 
-        return
+        # gather keeps the results in input order
+        return await asyncio.gather(*(verify_one(p) for p in phones))
 
-    # save JSON
-    filename_base = os.path.splitext(filename)[0]
-    json_file = f"{filename_base}.json"
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=4)
-    print(f"\n[File] Results saved to {json_file}")
+def verify_phones_concurrent(phones, concurrency=8, cache=None, on_result=None, prevalidator=None,
+                             batch_size=DEFAULT_PHONE_BATCH_SIZE, batch_window=DEFAULT_PHONE_BATCH_WINDOW,
+                             unprocessed_retries=DEFAULT_UNPROCESSED_RETRIES):
+    """
+    Verifies a list of phones with up to `concurrency` lookups in flight.
+    If a batch endpoint is configured (URL_PHONE_BATCH) and `batch_size` > 1, lookups
+    are coalesced into batches of up to `batch_size` numbers, sent once full or after
+    `batch_window` seconds, with up to `concurrency` batches in flight.
+    Lookups answered with RequestProcessed: False are retried up to `unprocessed_retries` times.
+    Numbers are normalized to E.164 first, so each unique number is looked up once
+    and its result is fanned back out to every input that maps to it.
+    If a PreValidator is given, numbers it rejects get a local verdict and are never looked up.
+    All lookups share one pooled keep-alive session.
+    Returns the records in input order (failed lookups are dropped).
+    `on_result` (if given) is called with each record as soon as it arrives.
+    """
+    if not phones:
+        return []
 
-    # save CSV
-    csv_file = f"{filename_base}.csv"
-    
-    # collect all possible keys from the results dictionary
-    keys = set()
-    for item in results:
-        keys.update(item.keys())
-    
-    # organize keys: Type, Input, GroundTruth first, then the rest
-    ordered_keys = ['Type', 'Input', 'GroundTruth', 'Status', 'IsValid']
-    remaining_keys = [k for k in keys if k not in ordered_keys]
-    fieldnames = ordered_keys + sorted(remaining_keys)
-
-    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
-    print(f"[File] Results saved to {csv_file}")
-
-def load_json_file(filepath):
-    if os.path.exists(filepath):
-        with open(filepath, "r", encoding="utf-8") as f:
-            return json.load(f)
+    # E.164 number -> original inputs
+    groups = group_by_identity(phones, normalize_phone)
+    log_dedup("phones", len(phones), len(groups))
+
+    def record_result(record):
+        if on_result is not None:
+            for row in fan_out(record, groups.get(normalize_phone(record["Input"]), [])):
+                on_result(row)
+
+    local = {}
+    if prevalidator is not None:
+        for phone in groups:
+            record = prevalidator.check_phone(phone)
+            if record is not None:
+                local[phone] = record
+                record_result(record)
+        if local:
+            INSTRUMENTATION.count_local_hit("verify_phone_individual", len(local))
+            logger.info(f"[Phone] {len(local)} numbers rejected by pre-validation.")
+
+    concurrency = max(1, concurrency)
+    pending = [p for p in groups if p not in local]
+    if not pending:
+        results = []
+    elif URL_PHONE_BATCH and batch_size > 1:
+        results = asyncio.run(_verify_phones_batched_async(
+            pending, concurrency, batch_size, batch_window, cache, record_result, unprocessed_retries
+        ))
     else:
-        print(f"[Warning] File not found: {filepath}. Using empty data.")
-        return {}
\ No newline at end of file
+        results = asyncio.run(_verify_phones_async(pending, concurrency, cache, record_result, unprocessed_retries))
+    by_number = {normalize_phone(r["Input"]): r for r in results if r}
+    by_number.update(local)
+    return [by_number[normalize_phone(p)].replace(Input=p) for p in phones if normalize_phone(p) in by_number]
+
+def save_final_results(results, filename, formats=("json", "csv")):
+    """
+    Saves results in every requested format (json, csv, jsonl, parquet, arrow).
+    `results` can be a list or any iterable (e.g. a ResultJournal); it is
+    streamed once into all the writers instead of being held in memory.
+    """
+    if not results: 
+        return
+
+    return write_results(results, filename, formats)
@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# the modules live flat in code/ and import each other by name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "code"))
+
+# keep anything a test writes out of data/
+os.environ.setdefault("LOQATE_DATA_PATH", tempfile.mkdtemp(prefix="loqate-tests-"))
+
+
+@pytest.fixture
+def dead_url():
+    """URL of a local port nothing listens on (connections are refused)."""
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+@pytest.fixture
+def endpoints():
+    """Restores the default endpoint settings (deadlines, breakers, hedging) after a test."""
+    import http_client
+    timeouts, breaker, quantile = dict(http_client.TIMEOUTS), dict(http_client.BREAKER_SETTINGS), http_client.HEDGE_QUANTILE
+    yield http_client
+    http_client.TIMEOUTS.clear()
+    http_client.TIMEOUTS.update(timeouts)
+    http_client.configure_endpoints(
+        breaker_threshold=breaker["threshold"], breaker_cooldown=breaker["cooldown"], hedge_quantile=quantile
+    )
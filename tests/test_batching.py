@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from batching import AdaptiveChunkSize, RequestCoalescer
+
+
+def test_full_batches_go_out_without_waiting_for_the_window():
+    sent = []
+
+    def send(keys):
+        sent.append(list(keys))
+        return {k: k.upper() for k in keys if k != "lost"}
+
+    coalescer = RequestCoalescer(send, max_size=4, window=10.0, max_in_flight=2)
+    futures = [coalescer.submit(k) for k in ["a", "b", "c", "lost", "e", "f", "g", "h"]]
+    start = time.monotonic()
+    assert [f.result(timeout=5) for f in futures[:4]] == ["A", "B", "C", None]
+    assert time.monotonic() - start < 5
+    coalescer.close()
+    assert [f.result() for f in futures[4:]] == ["E", "F", "G", "H"]
+    assert sorted(map(len, sent)) == [4, 4]
+    assert coalescer.stats()["full"] == 2
+
+
+def test_window_flushes_a_partial_batch():
+    coalescer = RequestCoalescer(lambda keys: {k: len(keys) for k in keys}, max_size=100, window=0.05)
+    futures = [coalescer.submit(i) for i in range(3)]
+    assert [f.result(timeout=2) for f in futures] == [3, 3, 3]
+    assert coalescer.batch_sizes == [3]
+    coalescer.close()
+
+
+def test_concurrent_callers_share_batches_and_errors_reach_every_caller():
+    calls = []
+
+    def send(keys):
+        calls.append(len(keys))
+        if "bad" in keys:
+            raise RuntimeError("batch failed")
+        return {k: True for k in keys}
+
+    coalescer = RequestCoalescer(send, max_size=50, window=0.05)
+    results = {}
+
+    def caller(key):
+        results[key] = coalescer.submit(key).result(timeout=5)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {i: True for i in range(20)}
+    assert sum(calls) == 20 and len(calls) < 20
+
+    failed = coalescer.submit("bad")
+    coalescer.close()
+    with pytest.raises(RuntimeError, match="batch failed"):
+        failed.result()
+    with pytest.raises(RuntimeError, match="closed"):
+        coalescer.submit("late")
+
+
+def test_chunk_size_grows_while_fast_and_halves_on_errors():
+    sizer = AdaptiveChunkSize(initial=40, minimum=5, maximum=60, step=10, target_latency=1.0)
+    assert sizer.record(0.1, True) == 50
+    assert sizer.record(0.1, True) == 60
+    assert sizer.record(0.1, True) == 60
+    assert sizer.record(2.0, True) == 45
+    assert sizer.record(0.1, False) == 22
+    assert sizer.error_rate == pytest.approx(0.2)
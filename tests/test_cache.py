@@ -0,0 +1,68 @@
+import sqlite3
+import time
+
+from cache import ResultCache
+
+URL = "https://api.example/verify"
+
+
+def last_access(path):
+    with sqlite3.connect(str(path)) as conn:
+        return dict(conn.execute("SELECT input, last_access FROM results"))
+
+
+def test_hits_update_access_times_in_batches(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = ResultCache(path, touch_batch=3)
+    for value in ("a@x.com", "b@x.com", "c@x.com"):
+        cache.put(URL, value, {"Input": value, "IsValid": "Yes"})
+    stored = last_access(path)
+
+    time.sleep(0.01)
+    assert cache.get(URL, "A@x.com ") == {"Input": "a@x.com", "IsValid": "Yes"}
+    assert cache.get(URL, "b@x.com")
+    assert last_access(path) == stored
+    assert cache.get(URL, "c@x.com")
+    touched = last_access(path)
+    assert all(touched[k] > stored[k] for k in stored)
+
+    time.sleep(0.01)
+    cache.get(URL, "a@x.com")
+    cache.close()
+    assert last_access(path)["a@x.com"] > touched["a@x.com"]
+    assert cache.hits == 4 and cache.misses == 0
+
+
+def test_expired_entries_are_purged_on_open_and_before_eviction(tmp_path):
+    path = tmp_path / "cache.db"
+    cache = ResultCache(path, ttl=3600, max_entries=3)
+    for value in ("old1", "old2", "new1"):
+        cache.put(URL, value, {"Input": value})
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("UPDATE results SET created = created - 7200, last_access = last_access + 60 WHERE input LIKE 'old%'")
+    # the expired entries go first, though they were used more recently
+    cache.put(URL, "new2", {"Input": "new2"})
+    assert sorted(last_access(path)) == ["new1", "new2"]
+    assert cache.evictions == 0
+    cache.close()
+
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("UPDATE results SET created = created - 7200 WHERE input = 'new1'")
+    cache = ResultCache(path, ttl=3600)
+    assert sorted(last_access(path)) == ["new2"]
+    assert cache._count == 1
+    cache.close()
+
+
+def test_lru_eviction_sees_unflushed_hits(tmp_path):
+    cache = ResultCache(tmp_path / "cache.db", max_entries=2)
+    cache.put(URL, "first", {"Input": "first"})
+    time.sleep(0.01)
+    cache.put(URL, "second", {"Input": "second"})
+    time.sleep(0.01)
+    cache.get(URL, "first")
+    cache.put(URL, "third", {"Input": "third"})
+    assert cache.get(URL, "first") is not None
+    assert cache.get(URL, "second") is None
+    assert cache.evictions == 1
+    cache.close()
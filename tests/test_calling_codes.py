@@ -0,0 +1,19 @@
+from calling_codes import classify_numbers, detect_country, lookup_country
+
+
+def test_longest_prefix_wins():
+    assert lookup_country("+12025550123") == "US"
+    assert lookup_country("+77011234567") == "KZ"
+    assert lookup_country("+74951234567") == "RU"
+    assert lookup_country("+447700900123") == "GB"
+
+
+def test_detect_country_normalizes_and_falls_back():
+    assert detect_country("+44 (0)20 7946 0000") == "GB"
+    assert detect_country("0049 30 123456") == "DE"
+    assert detect_country("+999") == "Unknown"
+    assert detect_country("") is None
+
+
+def test_classify_numbers_keeps_order():
+    assert classify_numbers(["+33123456789", "+4930123456", "+33123456789", "+999"]) == ["FR", "DE", "FR", None]
@@ -0,0 +1,46 @@
+import logging
+
+from domain_index import EmailDomainIndex
+from metrics import LabelIndex, MetricsAccumulator
+from records import EmailResult
+
+
+def sample(email, valid, disposable=False):
+    return EmailResult(Input=email, Status="Valid" if valid else "Invalid", IsValid="Yes" if valid else "No",
+                       Domain=email.rpartition("@")[2], IsDisposable=disposable, IsSystemMailbox=False)
+
+
+def test_inferred_records_leave_mailbox_validity_unknown(tmp_path):
+    index = EmailDomainIndex(tmp_path / "domains.json")
+    for i in range(3):
+        index.add(sample(f"real{i}@gmail.com", valid=True))
+    assert index.inferred_record("made.up.fake@gmail.com", 4) is None
+
+    record = index.inferred_record("Made.Up.Fake@gmail.com", 3)
+    assert record.IsValid == "Unknown"
+    assert record.Status is None and record.IsSystemMailbox is None
+    assert (record.Domain, record.IsDisposable, record.DomainLevel) == ("gmail.com", False, True)
+    assert record.Account == "Made.Up.Fake"
+
+
+def test_disposable_domains_infer_invalid(tmp_path):
+    index = EmailDomainIndex(tmp_path / "domains.json")
+    for i in range(2):
+        index.add(sample(f"x{i}@mailinator.com", valid=False, disposable=True))
+    record = index.inferred_record("anyone@mailinator.com", 2)
+    assert (record.IsValid, record.IsDisposable) == ("No", True)
+
+
+def test_unknown_verdicts_are_left_out_of_the_metrics_quietly(tmp_path, caplog):
+    labels = LabelIndex(["GB"])
+    labels.add(["real0@gmail.com"], "real_email")
+    labels.add(["fake0@gmail.com"], "std_email")
+    index = EmailDomainIndex(tmp_path / "domains.json")
+    index.add(sample("real0@gmail.com", valid=True))
+    rows = [sample("real0@gmail.com", valid=True), index.inferred_record("fake0@gmail.com", 1)]
+
+    accumulator = MetricsAccumulator(["GB"])
+    with caplog.at_level(logging.WARNING):
+        accumulator.add(rows, labels)
+    assert int(accumulator.counts.sum()) == 1
+    assert "Unknown IsValid" not in caplog.text
@@ -0,0 +1,203 @@
+import time
+
+import pytest
+import requests
+
+from http_client import CircuitBreaker, CircuitOpenError, Hedger, close_sessions, get_session, request_with_retry
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+class FakeSession:
+    """Answers with the given status codes in turn (200 once they run out)."""
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.sent = 0
+
+    def request(self, method, url, **kwargs):
+        self.sent += 1
+        status = self.statuses.pop(0) if self.statuses else 200
+        if isinstance(status, Exception):
+            raise status
+        return FakeResponse(status)
+
+
+def open_breaker(cooldown=0.05):
+    breaker = CircuitBreaker("test", threshold=2, cooldown=cooldown)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.is_open
+    return breaker
+
+
+def test_open_circuit_fails_fast():
+    breaker = open_breaker(cooldown=60)
+    start = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    assert time.monotonic() - start < 0.1
+    assert breaker.rejected == 1
+
+
+def test_one_probe_at_a_time_and_success_closes():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    probe = breaker.acquire()
+    assert probe is not None
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+    breaker.record(True, probe)
+    assert not breaker.is_open
+    assert breaker.acquire() is None
+
+
+def test_failed_probe_doubles_cooldown():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    probe = breaker.acquire()
+    breaker.record(False, probe)
+    assert breaker.is_open
+    assert breaker.cooldown == pytest.approx(0.1)
+
+
+def test_late_failure_is_not_a_failed_probe():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    probe = breaker.acquire()
+    # a request sent before the circuit opened fails while the probe is in flight
+    breaker.record(False)
+    assert breaker.cooldown == pytest.approx(0.05)
+    breaker.record(True, probe)
+    assert not breaker.is_open
+
+
+def test_released_probe_lets_the_next_one_through():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    probe = breaker.acquire()
+    breaker.release(probe)
+    assert breaker.acquire() is not None
+
+
+def test_throttled_probe_is_released(endpoints):
+    endpoints.configure_endpoints(breaker_threshold=2, breaker_cooldown=0.05)
+    breaker = endpoints.breaker_for("test_stage")
+    breaker.record(False)
+    breaker.record(False)
+    time.sleep(0.06)
+    session = FakeSession([429])
+    response = request_with_retry(session, "GET", "http://x", retries=0, stage="test_stage")
+    assert response.status_code == 429
+    # the 429 probe did not count, but the next caller may probe again
+    assert request_with_retry(session, "GET", "http://x", retries=0, stage="test_stage").status_code == 200
+    assert not breaker.is_open
+
+
+def test_unexpected_error_releases_probe(endpoints):
+    endpoints.configure_endpoints(breaker_threshold=2, breaker_cooldown=0.05)
+    breaker = endpoints.breaker_for("test_stage")
+    breaker.record(False)
+    breaker.record(False)
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        request_with_retry(FakeSession([ValueError("boom")]), "GET", "http://x", retries=0, stage="test_stage")
+    assert breaker.acquire() is not None
+
+
+def test_open_circuit_is_not_retried(endpoints):
+    endpoints.configure_endpoints(breaker_threshold=2, breaker_cooldown=60)
+    session = FakeSession([requests.ConnectionError()] * 10)
+    start = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        request_with_retry(session, "GET", "http://x", retries=5, backoff=0.01, stage="test_stage")
+    assert session.sent == 2
+    assert time.monotonic() - start < 1
+
+
+def test_dead_endpoint_fails_fast(endpoints, dead_url, monkeypatch):
+    import utils
+    monkeypatch.setattr(utils, "URL_PHONE_INDIVIDUAL", dead_url)
+    monkeypatch.setattr(utils, "URL_PHONE_BATCH", "")
+    endpoints.configure_endpoints(breaker_threshold=5, breaker_cooldown=5, hedge_quantile=0)
+    phones = [f"+4420794600{n:02d}" for n in range(76)]
+    start = time.monotonic()
+    results = utils.verify_phones_concurrent(phones, concurrency=8, unprocessed_retries=0)
+    assert results == []
+    # the first lookups back off once or twice before the circuit opens, the rest fail fast
+    assert time.monotonic() - start < 10
+    assert endpoints.breaker_for("verify_phone_individual").rejected > 0
+
+
+def test_sessions_are_closed_once_at_exit(monkeypatch):
+    import http_client
+    registered = []
+    monkeypatch.setattr(http_client.atexit, "register", registered.append)
+    monkeypatch.setattr(http_client.atexit, "unregister", lambda fn: registered.remove(fn) if fn in registered else None)
+    close_sessions()
+
+    session = get_session(pool_size=3)
+    assert get_session(pool_size=3) is session
+    get_session(pool_size=5)
+    assert registered == [close_sessions]
+
+    closed = []
+    monkeypatch.setattr(session, "close", lambda: closed.append(session))
+    close_sessions()
+    assert closed == [session] and registered == []
+    assert get_session(pool_size=3) is not session
+    close_sessions()
+
+
+def warmed_hedger(**kwargs):
+    hedger = Hedger("test-hedge", quantile=0.5, min_samples=5, **kwargs)
+    for _ in range(5):
+        hedger.call(lambda: time.sleep(0.01))
+    return hedger
+
+
+def test_slow_call_is_hedged_and_the_faster_copy_wins():
+    from instrumentation import INSTRUMENTATION
+    hedger = warmed_hedger(max_share=1.0)
+    credits = INSTRUMENTATION.total_credits()
+    attempts = []
+
+    def lookup():
+        attempts.append(len(attempts))
+        time.sleep(2.0 if len(attempts) == 1 else 0.01)
+        return len(attempts)
+
+    start = time.monotonic()
+    assert hedger.call(lookup, credits=1) == 2
+    assert time.monotonic() - start < 1.0
+    assert (hedger.hedges, hedger.hedge_wins) == (1, 1)
+    assert INSTRUMENTATION.total_credits() == credits + 1
+
+
+def test_no_hedging_before_enough_samples_or_above_the_share():
+    hedger = Hedger("test-hedge", quantile=0.5, min_samples=5)
+    assert hedger.delay() is None
+    assert hedger.call(lambda: "ok") == "ok"
+    assert hedger.hedges == 0
+
+    hedger = warmed_hedger(max_share=0.0)
+    assert hedger.call(lambda: time.sleep(0.1) or "slow") == "slow"
+    assert hedger.hedges == 0
+
+
+def test_failed_first_call_falls_back_to_the_hedge():
+    hedger = warmed_hedger(max_share=1.0)
+    attempts = []
+
+    def lookup():
+        attempts.append(None)
+        if len(attempts) == 1:
+            time.sleep(0.2)
+            raise requests.ConnectionError("dropped")
+        time.sleep(0.3)
+        return "hedge"
+
+    assert hedger.call(lookup) == "hedge"
@@ -0,0 +1,40 @@
+from journal import ResultJournal
+from records import EmailResult, PhoneResult
+
+
+def test_resume_keeps_earlier_records_and_skips_a_torn_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = ResultJournal(path)
+    journal.append(EmailResult(Input="A@Example.com", IsValid="Yes"))
+    journal.append({"Type": "Phone", "Input": "+447700900123", "IsValid": "No"})
+    journal.close()
+    # a crash in the middle of the next line
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"Type": "Email", "Input": "torn@exa')
+
+    journal = ResultJournal(path, resume=True)
+    assert len(journal) == 2
+    assert journal.done_inputs() == {"a@example.com", "+447700900123"}
+    journal.append(EmailResult(Input="b@example.com", IsValid="No"))
+    journal.close()
+
+    journal = ResultJournal(path, resume=True)
+    records = list(journal)
+    journal.close()
+    assert [r.Input for r in records] == ["A@Example.com", "+447700900123", "b@example.com"]
+    assert isinstance(records[1], PhoneResult) and records[1].IsValid == "No"
+
+
+def test_a_new_run_starts_a_fresh_journal(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = ResultJournal(path)
+    journal.append(EmailResult(Input="old@example.com", IsValid="Yes"))
+    journal.close()
+
+    journal = ResultJournal(path)
+    assert len(journal) == 0 and list(journal) == []
+    journal.close()
+
+    journal = ResultJournal(tmp_path / "missing.jsonl", resume=True)
+    assert len(journal) == 0 and list(journal) == []
+    journal.close()
@@ -0,0 +1,102 @@
+import random
+
+import numpy as np
+
+from metrics import SOURCE_IS_REAL, LabelIndex, MetricsAccumulator, compute_metrics
+from records import record_from_dict
+
+COUNTRIES = ["GB", "US"]
+VERDICTS = ["Yes", "No", "Maybe", "true", "FALSE", None, "weird"]
+
+
+def make_run(seed=0, n=3000):
+    """A labelled run with the awkward cases: unnormalized inputs, unknown verdicts,
+    missing domains, unlabelled rows, dict and typed rows mixed."""
+    rng = random.Random(seed)
+    index = LabelIndex(COUNTRIES)
+    rows = []
+    for i in range(n):
+        if i % 2:
+            value = f"user{i}@Example{rng.randrange(30)}.com"
+            source = rng.choice(["real_email", "std_email", "pro_email"])
+            index.add([value], source)
+            row = {"Type": "Email", "Input": value.upper() if i % 7 == 0 else value, "IsValid": rng.choice(VERDICTS)}
+            if i % 5:
+                row["Domain"] = value.rpartition("@")[2].upper()
+        else:
+            value = f"+44770090{i:04d}"
+            source = rng.choice(["manual_phone", "scraped_active", "generated_phone"])
+            index.add([value], source, rng.choice(COUNTRIES))
+            row = {"Type": "Phone", "Input": f" {value}" if i % 9 == 0 else value, "IsValid": rng.choice(VERDICTS)}
+        rows.append(row if i % 3 else record_from_dict(row))
+    # results for inputs that were never labelled are ignored
+    rows.append({"Type": "Email", "Input": "stranger@nowhere.org", "IsValid": "Yes", "Domain": "nowhere.org"})
+    return index, rows
+
+
+def reference_counts(index, rows):
+    """The per-row loop the vectorized scoring replaced."""
+    predictions = {"yes": 1, "true": 1, "no": 0, "false": 0, "maybe": 0}
+    counts = np.zeros((len(SOURCE_IS_REAL), len(index.countries), 2, 2), dtype=np.int64)
+    domains = {}
+    for row in rows:
+        label = index.label(str(row.get("Input", "")).lower().strip())
+        pred = predictions.get(str(row.get("IsValid", "")).lower(), -1)
+        if label is None or pred < 0:
+            continue
+        src, ctry = label
+        counts[src, ctry, SOURCE_IS_REAL[src], pred] += 1
+        if row.get("Type") == "Email":
+            domain = str(row.get("Domain") or row.get("Input").rpartition("@")[2]).lower().strip()
+            cell = domains.setdefault(domain, np.zeros((2, 2), dtype=np.int64))
+            cell[SOURCE_IS_REAL[src], pred] += 1
+    return counts, domains
+
+
+def test_counts_match_per_row_loop():
+    index, rows = make_run()
+    accumulator = MetricsAccumulator(COUNTRIES)
+    accumulator.add(rows, index)
+    counts, domains = reference_counts(index, rows)
+    np.testing.assert_array_equal(accumulator.counts, counts)
+    state = accumulator.to_dict()["domain_counts"]
+    assert set(state) == set(domains)
+    for domain, cell in domains.items():
+        assert state[domain] == cell.tolist()
+
+
+def test_iterables_are_scored_in_chunks(monkeypatch):
+    import metrics
+    monkeypatch.setattr(metrics, "TAG_CHUNK", 100)
+    index, rows = make_run(seed=1)
+    chunked = MetricsAccumulator(COUNTRIES)
+    chunked.add(iter(rows), index)
+    whole = MetricsAccumulator(COUNTRIES)
+    monkeypatch.setattr(metrics, "TAG_CHUNK", 10 ** 6)
+    whole.add(rows, index)
+    assert chunked.to_dict() == whole.to_dict()
+
+
+def test_merged_shards_equal_one_run():
+    index, rows = make_run(seed=2)
+    whole = MetricsAccumulator(COUNTRIES)
+    whole.add(rows, index)
+    first, second = MetricsAccumulator(COUNTRIES), MetricsAccumulator(COUNTRIES)
+    first.add(rows[:1000], index)
+    second.add(rows[1000:], index)
+    merged = MetricsAccumulator.from_dict(first.to_dict()).merge(MetricsAccumulator.from_dict(second.to_dict()))
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    assert merged.to_dict()["domain_counts"] == whole.to_dict()["domain_counts"]
+
+
+def test_table_rows():
+    index, rows = make_run(seed=3)
+    table = compute_metrics(rows, index, ci={"method": "wilson"})
+    overall = table[0]
+    assert overall["label"] == "OVERALL"
+    assert overall["total"] == overall["tp"] + overall["tn"] + overall["fp"] + overall["fn"] > 0
+    assert 0 <= overall["accuracy_ci"][0] <= overall["accuracy"] <= overall["accuracy_ci"][1] <= 1
+    domains = [row for row in table if row["group"] == "DOMAIN"]
+    totals = [row["total"] for row in domains]
+    assert totals == sorted(totals, reverse=True)
+    assert all(row["domain"] == row["domain"].lower() for row in domains)
@@ -0,0 +1,46 @@
+from normalize import fan_out, group_by_identity, normalize_email, normalize_phone
+from records import EmailResult
+
+
+def test_phones_normalize_to_e164():
+    assert normalize_phone("+44 (0)7700-900.123") == "+4407700900123"
+    assert normalize_phone("0044 7700 900123") == "+447700900123"
+    assert normalize_phone("07700 900123") == "07700900123"
+
+
+def test_emails_normalize_case_and_idn_domains():
+    assert normalize_email("  John.Doe@Example.COM ") == "john.doe@example.com"
+    assert normalize_email("jürgen@Bücher.de.") == "jürgen@xn--bcher-kva.de"
+    assert normalize_email("jürgen@xn--bcher-kva.de") == normalize_email("Jürgen@bücher.de")
+    assert normalize_email("not-an-email") == "not-an-email"
+
+
+def test_duplicates_are_grouped_in_first_seen_order_and_fanned_out():
+    inputs = ["B@x.com", "a@x.com", "b@X.com ", "A@x.com"]
+    groups = group_by_identity(inputs, normalize_email)
+    assert groups == {"b@x.com": ["B@x.com", "b@X.com "], "a@x.com": ["a@x.com", "A@x.com"]}
+
+    record = EmailResult(Input="b@x.com", IsValid="Yes", Domain="x.com")
+    copies = list(fan_out(record, groups["b@x.com"]))
+    assert [c.Input for c in copies] == ["B@x.com", "b@X.com "]
+    assert all(c.IsValid == "Yes" and c is not record for c in copies)
+    assert record.Input == "b@x.com"
+
+
+def test_duplicate_emails_are_looked_up_once(monkeypatch):
+    import utils
+    sent = []
+
+    def submit(session, chunk, retries):
+        sent.extend(chunk)
+        return [{"EmailAddress": e, "Status": "Valid", "Domain": e.rpartition("@")[2]} for e in chunk], 0.01, None
+
+    monkeypatch.setattr(utils, "_submit_email_chunk", submit)
+    inputs = ["Ann@Bücher.de", "ann@xn--bcher-kva.de", " bob@example.com", "BOB@example.com", "ann@bücher.de"]
+    streamed = []
+    results = utils.verify_emails_batch(inputs, on_result=streamed.append)
+
+    assert sorted(sent) == ["ann@xn--bcher-kva.de", "bob@example.com"]
+    assert [r.Input for r in results] == inputs
+    assert sorted(r.Input for r in streamed) == sorted(inputs)
+    assert {r.IsValid for r in results} == {"Yes"}
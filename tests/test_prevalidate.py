@@ -0,0 +1,69 @@
+from metrics import LabelIndex, MetricsAccumulator
+from prevalidate import DomainIndex, PreValidator
+from records import EmailResult
+
+
+def make_validator(**kwargs):
+    return PreValidator(DomainIndex(["mailinator.com", "dcctb.com"]), **kwargs)
+
+
+def test_rejects_only_certain_cases():
+    validator = make_validator()
+    assert validator.email_reason("no-at-sign") == "email_syntax"
+    assert validator.email_reason("someone@example.com") == "reserved_domain"
+    assert validator.email_reason("someone@mailinator.com") == "disposable_domain"
+    assert validator.email_reason("someone@eu.mailinator.com") == "disposable_domain"
+    assert validator.email_reason("someone@gmail.com") is None
+    assert validator.phone_reason("+4420794600") is None
+    assert validator.phone_reason("+44207946") == "phone_length"
+    assert validator.phone_reason("+10123456789") == "numbering_plan"
+    assert validator.phone_reason("02079460000") is None
+
+
+def test_exempt_domains_reach_the_api():
+    validator = make_validator(exempt_domains=["DCCTB.com"])
+    assert validator.check_email("pro.fake@dcctb.com") is None
+    assert validator.check_email("someone@mailinator.com")["LocalCheck"] == "disposable_domain"
+
+
+def test_local_verdicts_are_scored_as_their_own_tier():
+    index = LabelIndex([])
+    index.add(["a@dcctb.com", "b@dcctb.com"], "pro_email")
+    local = make_validator().check_email("a@dcctb.com")
+    api = EmailResult(Input="b@dcctb.com", Status="Valid", IsValid="Yes", Domain="dcctb.com")
+    accumulator = MetricsAccumulator([])
+    accumulator.add([local, api], index)
+    table = {row["label"]: row for row in accumulator.table({"method": "wilson"})}
+    # Loqate's subset holds only the API verdict (a false positive)
+    assert (table["EMAILS (Pro Fakes)"]["total"], table["EMAILS (Pro Fakes)"]["fp"]) == (1, 1)
+    assert (table["LOCAL PRE-CHECK: EMAILS (Pro Fakes)"]["total"], table["LOCAL PRE-CHECK: EMAILS (Pro Fakes)"]["tn"]) == (1, 1)
+    # the domain breakdown is about Loqate's verdicts too
+    assert table["Email: dcctb.com (0 Real, 1 Fake)"]["total"] == 1
+
+
+def test_rejected_phones_get_a_local_record_and_are_counted():
+    validator = make_validator()
+    assert validator.check_phone("+442079460000") is None
+    record = validator.check_phone("+44207946")
+    assert (record.IsValid, record.LocalCheck, record.NetworkCountry, record.CountryPrefix) == ("No", "phone_length", "GB", "44")
+    validator.check_phone("+10123456789")
+    validator.check_email("x@mailinator.com")
+    assert validator.to_dict() == {"phone_length": 1, "numbering_plan": 1, "disposable_domain": 1}
+
+
+def test_pre_validated_emails_are_not_sent(monkeypatch):
+    import utils
+    sent = []
+
+    def submit(session, chunk, retries):
+        sent.extend(chunk)
+        return [{"EmailAddress": e, "Status": "Valid"} for e in chunk], 0.01, None
+
+    monkeypatch.setattr(utils, "_submit_email_chunk", submit)
+    inputs = ["a@gmail.com", "b@mailinator.com", "no-at-sign", "B@Mailinator.com"]
+    results = utils.verify_emails_batch(inputs, prevalidator=make_validator())
+    assert sent == ["a@gmail.com"]
+    assert [(r.Input, r.LocalCheck) for r in results] == [
+        ("a@gmail.com", None), ("b@mailinator.com", "disposable_domain"),
+        ("no-at-sign", "email_syntax"), ("B@Mailinator.com", "disposable_domain"),
+    ]
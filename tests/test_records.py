@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from records import EmailResult, PhoneResult, ResultWriter, read_results, record_from_dict, write_results
+
+
+def make_records():
+    return [
+        EmailResult(Input="jürgen@bücher.de", Status="Valid", IsValid="Yes", Account="jürgen", Domain="bücher.de",
+                    IsDisposable=False, IsSystemMailbox=False),
+        EmailResult(Input='odd"name\\@example.com', Status="Invalid", IsValid="No", GroundTruth="fake", LocalCheck="syntax"),
+        PhoneResult(Input="+447700900123", RequestProcessed=True, IsValid="Yes", NetworkName="O2 – UK",
+                    CountryPrefix="44", NumberType="Mobile"),
+        record_from_dict({"Type": "Email", "Input": "x@y.com", "IsValid": "Maybe", "DomainLevel": True, "Unknown": 1}),
+    ]
+
+
+def as_dicts(records):
+    return [r.to_dict() for r in records]
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "json", "csv"])
+def test_text_formats_round_trip(tmp_path, fmt):
+    records = make_records()
+    path, = write_results(records, tmp_path / "results.json", (fmt,))
+    assert as_dicts(read_results(path)) == as_dicts(records)
+
+
+def test_json_and_jsonl_encode_records_alike(tmp_path):
+    records = make_records()
+    write_results(records, tmp_path / "results.json", ("json", "jsonl"))
+    jsonl = (tmp_path / "results.jsonl").read_text(encoding="utf-8").splitlines()
+    json_lines = (tmp_path / "results.json").read_text(encoding="utf-8").splitlines()[1:-1]
+    assert [line.rstrip(",") for line in json_lines] == jsonl
+    assert "bücher.de" in jsonl[0]
+    assert [json.loads(line) for line in jsonl] == as_dicts(records)
+
+
+def test_text_writers_flush_in_batches(tmp_path):
+    records = [EmailResult(Input=f"user{i}@example.com", IsValid="Yes") for i in range(25)]
+    for fmt in ("jsonl", "json", "csv"):
+        writer = ResultWriter(str(tmp_path / f"results.{fmt}"), fmt, line_batch=4)
+        for record in records:
+            writer.write(record)
+        writer.close()
+        assert as_dicts(read_results(writer.path)) == as_dicts(records)
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_formats_round_trip(tmp_path, fmt):
+    pytest.importorskip("pyarrow")
+    records = make_records() * 3
+    writer = ResultWriter(str(tmp_path / f"results.{fmt}"), fmt, batch_size=5)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    assert as_dicts(read_results(writer.path)) == as_dicts(records)
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from sampling import AdaptiveSampler, run_adaptive
+
+
+def make_strata(n=400):
+    return {
+        ("GB", "real_email"): [f"real{i}@example.com" for i in range(n)],
+        ("GB", "std_email"): [f"fake{i}@example.com" for i in range(n)],
+    }
+
+
+class FakeApi:
+    """Answers 80% correctly and, like hedges and retries, sometimes bills a lookup twice."""
+    def __init__(self, sampler, extra_share=0.1, seed=0):
+        self.sampler = sampler
+        self.extra_share = extra_share
+        self.rng = random.Random(seed)
+        self.credits = 0
+        self.submits = []
+
+    def verify(self, inputs):
+        self.submits.append(len(inputs))
+        for value in inputs:
+            self.credits += 1 + (self.rng.random() < self.extra_share)
+            real = value.startswith("real")
+            verdict = real if self.rng.random() < 0.8 else not real
+            self.sampler.record({"Input": value, "IsValid": "Yes" if verdict else "No"})
+
+
+@pytest.mark.parametrize("budget", [7, 120, 350])
+def test_budget_is_not_exceeded_by_extra_credits(budget):
+    sampler = AdaptiveSampler(make_strata(), target=0.01, seed=1)
+    api = FakeApi(sampler)
+    low = []
+    run_adaptive(sampler, api.verify, round_size=100, credit_budget=budget, credits=lambda: api.credits,
+                 submit_size=20, on_low_budget=lambda: low.append(api.credits))
+    assert api.credits <= budget
+    assert api.credits >= budget * 0.8
+    assert len(low) == 1
+    assert max(api.submits) <= 20
+    # inputs drawn but not submitted went back to the pools
+    assert int(sampler.drawn.sum()) == int(sampler.n.sum()) == sum(api.submits)
+
+
+def test_unlimited_run_submits_whole_rounds():
+    sampler = AdaptiveSampler(make_strata(50), target=0.01, seed=1)
+    api = FakeApi(sampler)
+    run_adaptive(sampler, api.verify, round_size=40, credits=lambda: api.credits)
+    assert api.submits and max(api.submits) == 40
+    assert int(sampler.remaining().sum()) == 0
+
+
+def test_put_back_restores_the_pools():
+    sampler = AdaptiveSampler(make_strata(10), min_per_stratum=3, seed=2)
+    before = [list(p) for p in sampler.pools]
+    batch = sampler.next_round(6)
+    sampler.put_back(batch[2:])
+    assert int(sampler.drawn.sum()) == 2
+    assert sorted(sum(sampler.pools, [])) == sorted(set(sum(before, [])) - set(batch[:2]))
+    assert len(sampler.label_index(["GB"]).labels) == 2
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from metrics import LabelIndex, MetricsAccumulator
+from records import read_results, write_results
+from shard import find_results_file, in_shard, merge_shards, shard_path, state_path
+
+COUNTRIES = ["GB", "US"]
+
+
+def make_rows(n=40):
+    rows, index = [], LabelIndex(COUNTRIES)
+    for i in range(n):
+        value = f"user{i}@example{i % 3}.com"
+        index.add([value], "real_email" if i % 2 else "std_email")
+        rows.append({"Type": "Email", "Input": value, "IsValid": "Yes" if i % 4 else "No", "Domain": f"example{i % 3}.com"})
+    return index, rows
+
+
+def save_run(rows, index, out_path, metrics_path, formats, shard=None):
+    """What finish_run saves: the results, then the state recording them."""
+    accumulator = MetricsAccumulator(COUNTRIES)
+    accumulator.add(rows, index)
+    written = write_results(rows, shard_path(out_path, shard), formats)
+    accumulator.save(state_path(metrics_path, shard), written)
+    return accumulator
+
+
+def age(path, seconds):
+    mtime = path.stat().st_mtime - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_find_results_file_uses_the_recorded_formats(tmp_path):
+    out_path, metrics_path = tmp_path / "results.json", tmp_path / "metrics.json"
+    index, rows = make_rows()
+    # a stale jsonl from an older run must not win over this run's csv
+    write_results(rows[:3], out_path, ("jsonl",))
+    age(out_path.with_suffix(".jsonl"), 3600)
+    save_run(rows, index, out_path, metrics_path, ("json", "csv"))
+
+    path = find_results_file(out_path, metrics_path=metrics_path)
+    assert path == out_path.with_suffix(".csv")
+    assert len(list(read_results(path))) == len(rows)
+
+
+def test_find_results_file_errors_on_missing_recorded_files(tmp_path):
+    out_path, metrics_path = tmp_path / "results.json", tmp_path / "metrics.json"
+    index, rows = make_rows()
+    save_run(rows, index, out_path, metrics_path, ("csv",))
+    out_path.with_suffix(".csv").unlink()
+    with pytest.raises(ValueError, match="missing"):
+        find_results_file(out_path, metrics_path=metrics_path)
+
+
+def test_find_results_file_without_record_refuses_files_of_different_runs(tmp_path):
+    out_path = tmp_path / "results.json"
+    _, rows = make_rows()
+    write_results(rows, out_path, ("jsonl", "csv"))
+    assert find_results_file(out_path) == out_path.with_suffix(".jsonl")
+
+    age(out_path.with_suffix(".jsonl"), 3600)
+    with pytest.raises(ValueError, match="different runs"):
+        find_results_file(out_path)
+    assert find_results_file(tmp_path / "other.json") is None
+
+
+def test_merge_shards_combines_results_and_metrics(tmp_path):
+    out_path, metrics_path = tmp_path / "results.json", tmp_path / "metrics.json"
+    index, rows = make_rows(200)
+    whole = MetricsAccumulator(COUNTRIES)
+    whole.add(rows, index)
+    for i in range(3):
+        shard = (i, 3)
+        save_run([r for r in rows if in_shard(r["Input"], shard)], index, out_path, metrics_path, ("jsonl",), shard)
+
+    merged = merge_shards(out_path, metrics_path, formats=("csv",))
+    assert (merged.counts == whole.counts).all()
+    assert merged.table() == whole.table()
+    merged_inputs = sorted(r["Input"] for r in read_results(out_path.with_suffix(".csv")))
+    assert merged_inputs == sorted(r["Input"] for r in rows)
+    assert find_results_file(out_path, metrics_path=metrics_path) == out_path.with_suffix(".csv")
+
+
+def test_merge_shards_requires_every_shard_unless_partial(tmp_path):
+    out_path, metrics_path = tmp_path / "results.json", tmp_path / "metrics.json"
+    index, rows = make_rows()
+    save_run(rows, index, out_path, metrics_path, ("jsonl",), (0, 2))
+    with pytest.raises(ValueError, match="no metrics state"):
+        merge_shards(out_path, metrics_path)
+    merged = merge_shards(out_path, metrics_path, formats=("jsonl",), allow_partial=True)
+    assert int(merged.counts.sum()) == len(rows)